@@ -0,0 +1,132 @@
+import json
+import os
+import random
+import sys
+import time
+
+# Stand-in for the maigret CLI that prints the same kind of output without sending a request.
+# It takes maigret's arguments (usernames, --site, --print-not-found, --print-errors, the rest is
+# ignored) and is tuned with environment variables:
+#
+#   FAKE_MAIGRET_SITES        sites checked when no --site is given (default 500)
+#   FAKE_MAIGRET_RATE         output lines per second, 0 prints as fast as possible (default 0)
+#   FAKE_MAIGRET_FOUND        share of sites with an account (default 0.05)
+#   FAKE_MAIGRET_ERRORS       share of sites failing with an error (default 0.05)
+#   FAKE_MAIGRET_SLOW         share of sites that stall before answering (default 0)
+#   FAKE_MAIGRET_SLOW_DELAY   seconds a slow site stalls (default 0.5)
+#   FAKE_MAIGRET_START_DELAY  seconds spent "loading the database" before the first line (default 0)
+#   FAKE_MAIGRET_SEED         random seed, the same seed prints the same output (default 1)
+#   FAKE_MAIGRET_TIMES        file to write the wall-clock time every line was flushed at, as JSON
+
+ERRORS = ["Request timeout error: timed out", "Connecting failure: refused", "Rate limited: HTTP 429"]
+
+def setting(name, default, kind=float):
+    value = os.environ.get(f"FAKE_MAIGRET_{name}")
+    return kind(value) if value not in (None, '') else default
+
+class Output:
+    # Paces the lines to the configured rate and keeps the time each one left the process
+    def __init__(self, rate, times_path):
+        self.rate = rate
+        self.times_path = times_path
+        self.times = [] if times_path else None
+        self.pending = 0
+        self.count = 0
+        self.started = time.monotonic()
+
+    def line(self, text):
+        sys.stdout.write(text + "\n")
+        self.count += 1
+        self.pending += 1
+        if self.rate > 0:
+            delay = self.started + self.count / self.rate - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            self.flush()
+        elif self.pending >= 100:
+            # Unpaced output goes out in pipe-sized blocks, like a busy maigret process
+            self.flush()
+
+    def flush(self):
+        sys.stdout.flush()
+        if self.times is not None:
+            self.times.extend([time.time()] * self.pending)
+        self.pending = 0
+
+    def close(self):
+        self.flush()
+        if self.times_path:
+            with open(self.times_path, "w") as times_file:
+                json.dump(self.times, times_file)
+
+def parse_args(argv):
+    usernames = []
+    sites = []
+    flags = set()
+    index = 0
+    while index < len(argv):
+        argument = argv[index]
+        if argument == "--":
+            usernames += argv[index + 1:]
+            break
+        if argument == "--site" and index + 1 < len(argv):
+            sites.append(argv[index + 1])
+            index += 2
+            continue
+        if argument.startswith("--"):
+            flags.add(argument)
+            # Options with a value: skip the value too
+            if index + 1 < len(argv) and not argv[index + 1].startswith("--") and argument not in (
+                "--print-not-found", "--print-errors", "--no-recursion", "--no-extracting", "--permute",
+                "--all-sites", "--use-disabled-sites", "--self-check", "--stats", "--csv", "--pdf",
+                "--txt", "--html", "--verbose", "--info", "--debug",
+            ):
+                index += 1
+        elif not flags:
+            usernames.append(argument)
+        index += 1
+    return usernames or ["user"], sites, flags
+
+def main(argv):
+    usernames, sites, flags = parse_args(argv)
+    random.seed(setting("SEED", 1, int))
+    if not sites:
+        sites = [f"Site{number:05d}" for number in range(setting("SITES", 500, int))]
+    found_share = setting("FOUND", 0.05)
+    error_share = setting("ERRORS", 0.05)
+    slow_share = setting("SLOW", 0.0)
+    slow_delay = setting("SLOW_DELAY", 0.5)
+    print_not_found = "--print-not-found" in flags
+    print_errors = "--print-errors" in flags
+
+    time.sleep(setting("START_DELAY", 0.0))
+    out = Output(setting("RATE", 0.0), os.environ.get("FAKE_MAIGRET_TIMES"))
+    out.line(f"[-] Starting a search on top {len(sites)} sites from the Maigret database...")
+    out.line("[!] You can run search by full list of sites with flag `-a`")
+    for username in usernames:
+        out.line(f"[*] Checking username {username} on:")
+        found = 0
+        for number, site in enumerate(sites, 1):
+            if random.random() < slow_share:
+                out.flush()
+                time.sleep(slow_delay)
+            # The progress bar redraws in place, piped output keeps its frames inside the next line
+            progress = f"\r[{'#' * (20 * number // len(sites)):<20}] {number}/{len(sites)}\r" if number % 10 == 0 else ""
+            roll = random.random()
+            if roll < found_share:
+                found += 1
+                out.line(f"{progress}[+] {site}: https://{site.lower()}.example/{username}")
+                out.line(f" ├─uid: {random.randrange(10 ** 8)}")
+                out.line(f" ├─username: {username}")
+                out.line(" └─links: ")
+                out.line(f"   └─ https://links.example/{username}")
+            elif roll < found_share + error_share:
+                if print_errors:
+                    out.line(f"{progress}[?] {site}: {random.choice(ERRORS)}")
+            elif print_not_found:
+                out.line(f"{progress}[-] {site}: Not found!")
+        out.line(f"[*] Search by username {username} returned {found} accounts.")
+    out.close()
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
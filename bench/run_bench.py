@@ -0,0 +1,378 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+# Drives the output path of maigret night with the stand-in maigret in fake_maigret.py, headless on
+# the offscreen Qt platform, and reports throughput, emit-to-render latency, event-loop stalls and
+# memory growth. The stand-in is seeded, so two runs at the same --scale print the same output and
+# their reports can be compared:
+#
+#   python bench/run_bench.py --json before.json
+#   python bench/run_bench.py --compare before.json > bench_output.txt
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+FAKE_MAIGRET = os.path.join(HERE, 'fake_maigret.py')
+
+# A gap this long between two ticks of the event loop is a stall the user would notice
+STALL = 0.05
+TICK_MS = 5
+
+# kind "worker" runs MaigretWorker without a view, "view" a whole run in the window, "settings" the
+# settings and command pipeline. sites and iterations are multiplied by --scale.
+SCENARIOS = [
+    {'name': 'worker-flood', 'kind': 'worker', 'sites': 100000, 'rate': 0},
+    {'name': 'view-flood', 'kind': 'view', 'sites': 50000, 'rate': 0},
+    {'name': 'view-steady', 'kind': 'view', 'sites': 3000, 'rate': 2000, 'repeat': 3},
+    {'name': 'view-trickle', 'kind': 'view', 'sites': 300, 'rate': 100, 'slow': 0.02},
+    {'name': 'settings', 'kind': 'settings', 'iterations': 500},
+]
+
+# Whether a larger value of a metric is an improvement, for --compare
+HIGHER_IS_BETTER = {'lines_per_second', 'lines'}
+
+def prepare_environment(directory):
+    # A private home keeps the logs, caches and checkpoints of the runs out of the real one, and a
+    # "maigret" on the front of PATH makes every command the GUI builds start the stand-in. Reports
+    # are written relative to the working directory, so the runs work from the private one too.
+    os.environ['HOME'] = directory
+    os.chdir(directory)
+    os.environ['USERPROFILE'] = directory
+    bin_dir = os.path.join(directory, 'bin')
+    os.makedirs(bin_dir)
+    shim = os.path.join(bin_dir, 'maigret')
+    with open(shim, 'w') as shim_file:
+        shim_file.write(f"#!{sys.executable}\nimport runpy\nrunpy.run_path({FAKE_MAIGRET!r}, run_name='__main__')\n")
+    os.chmod(shim, 0o755)
+    os.environ['PATH'] = bin_dir + os.pathsep + os.environ.get('PATH', '')
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    sys.path.insert(0, ROOT)
+
+def percentile(values, fraction):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+def git_revision():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                                text=True, check=True).stdout.strip()
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=ROOT,
+                               capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return commit + ('-dirty' if dirty else '')
+
+class Bench:
+    def __init__(self, directory, scale):
+        from PyQt6.QtCore import QEvent, QEventLoop, QObject, Qt, QTimer
+        from PyQt6.QtWidgets import QApplication, QTabWidget
+        import maigret_night
+        import night_metrics
+
+        self.directory = directory
+        self.scale = scale
+        self.app = QApplication.instance() or QApplication(sys.argv)
+        self.maigret_night = maigret_night
+        self.night_metrics = night_metrics
+        self.QTimer = QTimer
+        self.QEventLoop = QEventLoop
+        self.window = None
+
+        # Ticks every few milliseconds, a late tick means the GUI thread was busy for that long
+        class LoopMonitor:
+            def __init__(self):
+                self.timer = QTimer()
+                self.timer.setTimerType(Qt.TimerType.PreciseTimer)
+                self.timer.setInterval(TICK_MS)
+                self.timer.timeout.connect(self.tick)
+
+            def start(self):
+                self.gaps = []
+                self.last = time.perf_counter()
+                self.timer.start()
+
+            def tick(self):
+                now = time.perf_counter()
+                self.gaps.append(now - self.last)
+                self.last = now
+
+            def stop(self):
+                self.timer.stop()
+                stalls = [gap for gap in self.gaps if gap > STALL]
+                return {
+                    'stalls': len(stalls),
+                    'stall_seconds': sum(stalls),
+                    'max_gap_ms': max(self.gaps, default=0.0) * 1000,
+                    'p99_gap_ms': (percentile(self.gaps, 0.99) or 0.0) * 1000,
+                }
+
+        # Stamps lines with the time of the first paint of the output view after they were inserted
+        class RenderProbe(QObject):
+            def __init__(self):
+                super().__init__()
+                self.reset()
+
+            def reset(self):
+                self.inserted = 0
+                self.rendered = []
+
+            def eventFilter(self, watched, event):
+                if event.type() == QEvent.Type.Paint and len(self.rendered) < self.inserted:
+                    now = time.time()
+                    self.rendered.extend([now] * (self.inserted - len(self.rendered)))
+                return False
+
+        self.monitor = LoopMonitor()
+        self.probe = RenderProbe()
+        self.QTabWidget = QTabWidget
+
+    def environment(self, scenario, times_path):
+        os.environ['FAKE_MAIGRET_SITES'] = str(max(1, int(scenario['sites'] * self.scale)))
+        os.environ['FAKE_MAIGRET_RATE'] = str(scenario.get('rate', 0))
+        os.environ['FAKE_MAIGRET_SLOW'] = str(scenario.get('slow', 0))
+        os.environ['FAKE_MAIGRET_SLOW_DELAY'] = str(scenario.get('slow_delay', 0.2))
+        os.environ['FAKE_MAIGRET_SEED'] = '1'
+        os.environ['FAKE_MAIGRET_TIMES'] = times_path
+
+    def emit_times(self, times_path):
+        with open(times_path) as times_file:
+            return json.load(times_file)
+
+    def latency(self, emitted, received):
+        latencies = [(received[index] - emitted[index]) * 1000 for index in range(min(len(emitted), len(received)))]
+        return {
+            'latency_p50_ms': percentile(latencies, 0.5),
+            'latency_p95_ms': percentile(latencies, 0.95),
+            'latency_max_ms': max(latencies, default=None),
+        }
+
+    def wait(self, done):
+        # A local loop, QApplication.quit() would close the window as well
+        loop = self.QEventLoop()
+        poll = self.QTimer()
+        poll.timeout.connect(lambda: done() and loop.quit())
+        poll.start(20)
+        loop.exec()
+        poll.stop()
+
+    def rss(self):
+        return self.night_metrics.process_rss(os.getpid())
+
+    def run_worker(self, scenario):
+        # The worker alone: how fast lines get from the process to a slot on the GUI thread
+        times_path = os.path.join(self.directory, f"{scenario['name']}.times")
+        self.environment(scenario, times_path)
+        settings = {'username': 'bench', 'print_not_found': True, 'print_errors': True}
+        worker = self.maigret_night.MaigretWorker(self.maigret_night.build_command(settings))
+        received = []
+        finished = []
+        worker.output_signal.connect(lambda lines: received.extend([time.time()] * len(lines)))
+        worker.finished_signal.connect(lambda: finished.append(time.time()))
+        rss_before = self.rss()
+        self.monitor.start()
+        started = time.time()
+        worker.start()
+        self.wait(lambda: bool(finished))
+        worker.wait()
+        loop = self.monitor.stop()
+        emitted = self.emit_times(times_path)
+        duration = finished[0] - started
+        result = {
+            'lines': len(received),
+            'lines_per_second': len(received) / duration if duration > 0 else None,
+            'duration_seconds': duration,
+            'batches': worker.batcher.batches,
+        }
+        result.update(self.latency(emitted, received))
+        result.update(loop)
+        result['rss_growth_bytes'] = (self.rss() or 0) - (rss_before or 0)
+        return result
+
+    def open_window(self):
+        if self.window is None:
+            self.window = self.maigret_night.MaigretGUI()
+            window = self.window
+            window.username_input.setText('bench')
+            window.print_not_found_checkbox.setChecked(True)
+            window.print_errors_checkbox.setChecked(True)
+            window.incremental_checkbox.setChecked(False)
+            window.shards_spinbox.setValue(1)
+            window.engine_combobox.setCurrentText('cli')
+            tabs = window.findChild(self.QTabWidget)
+            for index in range(tabs.count()):
+                if tabs.tabText(index) == "Output":
+                    tabs.setCurrentIndex(index)
+            window.resize(1000, 700)
+            window.show()
+
+            # Count every chunk the window inserts, then let the probe see the view's paints
+            append_output = window.append_output
+            probe = self.probe
+
+            def counted_append_output(lines):
+                append_output(lines)
+                probe.inserted += len(lines)
+
+            window.append_output = counted_append_output
+            # Runs replace the view's model, not the view, so the filter stays in place
+            window.output_area.viewport().installEventFilter(probe)
+
+            # Showing the window the first time is slow, that is not what any scenario measures
+            shown = time.monotonic() + 0.5
+            self.wait(lambda: time.monotonic() > shown)
+        return self.window
+
+    def run_view(self, scenario):
+        # A whole run through the window: worker, output view, results table, cache and health stores
+        window = self.open_window()
+        rss_before = self.rss()
+        repetitions = []
+        for repetition in range(scenario.get('repeat', 1)):
+            times_path = os.path.join(self.directory, f"{scenario['name']}-{repetition}.times")
+            self.environment(scenario, times_path)
+            self.probe.reset()
+            self.monitor.start()
+            started = time.time()
+            window.run_maigret()
+            self.wait(window.run_button.isEnabled)
+            self.app.processEvents()
+            finished = time.time()
+            loop = self.monitor.stop()
+            emitted = self.emit_times(times_path)
+            rendered = self.probe.rendered + [finished] * (self.probe.inserted - len(self.probe.rendered))
+            duration = finished - started
+            result = {
+                'lines': self.probe.inserted,
+                'lines_per_second': self.probe.inserted / duration if duration > 0 else None,
+                'duration_seconds': duration,
+            }
+            result.update(self.latency(emitted, rendered))
+            result.update(loop)
+            result['rss_bytes'] = self.rss()
+            repetitions.append(result)
+
+        # The median repetition stands for the scenario, memory is compared between the first and the last
+        result = sorted(repetitions, key=lambda entry: entry['duration_seconds'])[len(repetitions) // 2]
+        result = {key: value for key, value in result.items() if key != 'rss_bytes'}
+        result['rss_growth_bytes'] = (repetitions[-1]['rss_bytes'] or 0) - (rss_before or 0)
+        if len(repetitions) > 1:
+            result['rss_growth_per_repeat_bytes'] = (
+                ((repetitions[-1]['rss_bytes'] or 0) - (repetitions[0]['rss_bytes'] or 0)) / (len(repetitions) - 1)
+            )
+        return result
+
+    def run_settings(self, scenario):
+        # Reading the widgets into settings, building the command and a save/load round trip
+        window = self.open_window()
+        iterations = max(1, int(scenario['iterations'] * self.scale))
+        path = os.path.join(self.directory, 'settings.json')
+        result = {}
+
+        started = time.perf_counter()
+        for _ in range(iterations):
+            settings = window.collect_settings()
+        result['collect_settings_us'] = (time.perf_counter() - started) / iterations * 1e6
+
+        started = time.perf_counter()
+        for _ in range(iterations):
+            self.maigret_night.build_command(settings, track_all=True)
+        result['build_command_us'] = (time.perf_counter() - started) / iterations * 1e6
+
+        round_trips = max(1, iterations // 10)
+        started = time.perf_counter()
+        for _ in range(round_trips):
+            window.save_settings(path)
+            window.load_settings(path)
+        result['save_load_settings_us'] = (time.perf_counter() - started) / round_trips * 1e6
+        return result
+
+    def run(self, scenario):
+        return getattr(self, f"run_{scenario['kind']}")(scenario)
+
+    def close(self):
+        if self.window is not None:
+            self.window.close()
+
+def format_value(name, value):
+    if value is None:
+        return "-"
+    if name.endswith('_bytes'):
+        return f"{value / 2 ** 20 + 0.0:.1f} MiB"
+    if isinstance(value, float):
+        return f"{value:.3f}" if abs(value) < 100 else f"{value:.0f}"
+    return str(value)
+
+def print_report(report, baseline=None):
+    meta = report['meta']
+    print(f"maigret night benchmark, commit {meta['commit'] or 'unknown'}, scale {meta['scale']}, "
+          f"Python {meta['python']}, Qt {meta['qt']}, {meta['platform']}")
+    if baseline:
+        print(f"compared with commit {baseline['meta']['commit'] or 'unknown'}, scale {baseline['meta']['scale']}")
+    for name, metrics in report['scenarios'].items():
+        print()
+        print(name)
+        base = (baseline or {}).get('scenarios', {}).get(name, {})
+        for metric, value in metrics.items():
+            line = f"  {metric:<28} {format_value(metric, value):>14}"
+            previous = base.get(metric)
+            if previous is not None and value is not None:
+                line += f"  was {format_value(metric, previous):>14}"
+                if previous:
+                    change = (value - previous) / abs(previous)
+                    better = change > 0 if metric in HIGHER_IS_BETTER else change < 0
+                    verdict = "" if abs(change) < 0.05 else (" better" if better else " worse")
+                    line += f"  {change:+.0%}{verdict}"
+            print(line)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Synthetic-load benchmark of the maigret night output path.")
+    parser.add_argument('--scale', type=float, default=1.0, help="multiplies the site counts and iterations")
+    parser.add_argument('--only', action='append', help="run only this scenario, may be repeated")
+    parser.add_argument('--json', help="also write the report to this file")
+    parser.add_argument('--compare', help="a report written with --json earlier to compare with")
+    args = parser.parse_args(argv)
+    # Given relative to where the bench was started, it runs from its temporary directory
+    json_path = os.path.abspath(args.json) if args.json else None
+    compare_path = os.path.abspath(args.compare) if args.compare else None
+
+    directory = tempfile.mkdtemp(prefix='maigret-night-bench-')
+    prepare_environment(directory)
+    bench = Bench(directory, args.scale)
+    from PyQt6.QtCore import QT_VERSION_STR
+
+    report = {
+        'meta': {
+            'commit': git_revision(),
+            'date': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'scale': args.scale,
+            'python': platform.python_version(),
+            'qt': QT_VERSION_STR,
+            'platform': platform.platform(),
+        },
+        'scenarios': {},
+    }
+    for scenario in SCENARIOS:
+        if args.only and scenario['name'] not in args.only:
+            continue
+        print(f"running {scenario['name']}...", file=sys.stderr, flush=True)
+        report['scenarios'][scenario['name']] = bench.run(scenario)
+    bench.close()
+
+    if json_path:
+        with open(json_path, 'w', encoding='utf-8') as json_file:
+            json.dump(report, json_file, indent=4)
+    baseline = None
+    if compare_path:
+        with open(compare_path, encoding='utf-8') as baseline_file:
+            baseline = json.load(baseline_file)
+    print_report(report, baseline)
+
+if __name__ == '__main__':
+    main()
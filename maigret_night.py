@@ -1,34 +1,1201 @@
 import sys
 import subprocess
 import json
+import asyncio
+import bisect
+import collections
+import os
+import queue
+import time
 from PyQt6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, 
-                             QLabel, QLineEdit, QPushButton, QTextEdit, QCheckBox, 
-                             QGroupBox, QFormLayout, QSpinBox, QComboBox, QTabWidget, QToolButton,QFileDialog, QMessageBox)
-from PyQt6.QtCore import Qt, QThread, pyqtSignal
+                             QLabel, QLineEdit, QPushButton, QCheckBox, 
+                             QGroupBox, QFormLayout, QSpinBox, QComboBox, QTabWidget, QToolButton,QFileDialog, QMessageBox,
+                             QListView, QPlainTextEdit, QTableWidget, QTableWidgetItem, QProgressBar, QHeaderView,
+                             QAbstractItemView, QTableView, QStyledItemDelegate, QStyleOptionViewItem, QStyle)
+from PyQt6.QtCore import Qt, QThread, QObject, QTimer, pyqtSignal, QAbstractListModel, QAbstractTableModel, QModelIndex
+from night_cache import DEFAULT_TTL, ResultCache, format_change
+from night_agents import MAX_ATTEMPTS, AgentChecker, AgentPool, parse_agents
+from night_checkpoint import Checkpoint, latest_checkpoint
+from night_client import DEFAULT_ADDRESS, DaemonClient, DaemonError
+from night_concurrency import ConcurrencyController
+from night_crawl import Crawl, VisitedStore
+from night_command import build_command, format_command, split_usernames
+from night_health import DEAD_AFTER, SiteHealthStore, order_sites
+from night_log import LOG_DIR, LogSpool
+from night_metrics import RunMetrics, write_json, write_prometheus
+from night_permute import PermutationPlan, PermutationStats, generate_variants, rank_variants
+from night_proxy import HealthChecker, ProxyPool, parse_pool
+from night_report import ReportStream
+from night_results import AVAILABLE, CLAIMED, ILLEGAL, UNKNOWN, STATUSES, ResultParser, SiteResult, format_result_lines
+from night_runner import OutputBatcher, pump_output, split_chunk
+from night_search import LineIndex, LogLibrary, LogQuery
+import night_engine
+import night_sites
 
 # Worker class that handles executing the Maigret command in a separate thread
 class MaigretWorker(QThread):
-    output_signal = pyqtSignal(str)
+    output_signal = pyqtSignal(list)  # Emits chunks of lines rather than single lines
+    results_signal = pyqtSignal(list)  # SiteResult objects parsed from the same chunk
+    stats_signal = pyqtSignal(dict)
     finished_signal = pyqtSignal()  # Add this signal to indicate completion
 
-    def __init__(self, command):
+    def __init__(self, command, max_lines=500, max_delay=0.05, hidden_statuses=()):
         super().__init__()
         self.command = command
         self.process = None
+        self.batcher = OutputBatcher(max_lines, max_delay)
+        self.parser = ResultParser()
+        self.hidden_statuses = set(hidden_statuses)
+        self.metrics = RunMetrics("maigret", "process")
+        self.cancelled = False
 
     def run(self):
-        self.process = subprocess.Popen(self.command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, shell=True)
-        for line in self.process.stdout:
-            self.output_signal.emit(line.strip())
-        self.process.wait()
+        self.process = subprocess.Popen(self.command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, shell=isinstance(self.command, str))
+        if self.cancelled:
+            # terminate() came before there was a process to stop
+            self.process.terminate()
+        self.metrics.mark_spawned()
+        pump_output(self.process, self.batcher, self.flush_output)
+        self.metrics.finish(self.process.returncode)
 
+        self.stats_signal.emit(self.batcher.stats())
         self.finished_signal.emit()  # Emit when the process finishes
 
+    def description(self):
+        return f"Running command: {format_command(self.command)}"
+
+    @property
+    def returncode(self):
+        return self.process.returncode if self.process else None
+
+    def flush_output(self, final=False):
+        chunk = self.batcher.take()
+        self.metrics.observe_lines(len(chunk))
+        # VmHWM is the peak so far, it is gone once the process has exited, so it is sampled as we go
+        self.metrics.sample_rss(self.process.pid)
+        lines, results = split_chunk(chunk, self.parser, self.batcher, self.hidden_statuses, final)
+        if lines:
+            self.output_signal.emit(lines)
+        if results:
+            self.metrics.observe_results(results)
+            self.results_signal.emit(results)
+
     def terminate(self):
+        self.cancelled = True
         if self.process:
             self.process.terminate()
             self.process.wait()
 
+# Runs searches on the warm in-process engine, with the same signals as MaigretWorker
+class EngineWorker(QObject):
+    output_signal = pyqtSignal(list)
+    results_signal = pyqtSignal(list)
+    stats_signal = pyqtSignal(dict)
+    finished_signal = pyqtSignal()
+
+    def __init__(self, engine, settings, username=None, max_connections=None, sites=None, proxy=None,
+                 reports=True, track_all=False, max_delay=0.05, hidden_statuses=()):
+        super().__init__()
+        self.engine = engine
+        self.settings = settings
+        self.usernames = night_engine.usernames_for(settings, username)
+        self.search_options = {'sites': sites, 'max_connections': max_connections, 'proxy': proxy}
+        self.reports = reports
+        self.hidden_statuses = set(hidden_statuses)
+        # The equivalent CLI command, only used to describe the run
+        self.command = build_command(settings, username=username, max_connections=max_connections,
+                                     sites=sites, proxy=proxy, reports=reports)
+        self.items = queue.Queue()  # Output lines and SiteResult objects coming from the engine thread
+        self.future = None
+        self.returncode = None
+        self.batcher = OutputBatcher()
+        self.metrics = RunMetrics("maigret", "engine")
+
+        # Results are collected on the engine thread and delivered in chunks, like the CLI worker does
+        self.timer = QTimer(self)
+        self.timer.setInterval(int(max_delay * 1000))
+        self.timer.timeout.connect(self.drain)
+
+    def description(self):
+        return f"Running in-process: {format_command(self.command)}"
+
+    def start(self):
+        self.future = self.engine.submit(self.search_all())
+        self.metrics.mark_spawned()
+        self.timer.start()
+
+    async def search_all(self):
+        raw_by_username = {}
+        id_type = self.settings.get('id_type', 'username')
+        for username in self.usernames:
+            self.items.put(f"[*] Checking {id_type} {username} on:")
+            raw_by_username[username] = await self.engine.search(username, self.settings, self.items.put,
+                                                                 **self.search_options)
+            # The finished search also carries HTTP status codes, these update the rows already sent
+            self.items.put(night_engine.site_results(username, raw_by_username[username]))
+        if self.reports:
+            # Report rendering can be slow, it runs off the loop so other searches keep going
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(None, night_engine.save_reports, self.settings, raw_by_username, self.items.put)
+
+    def drain(self):
+        done = self.future.done()
+        lines = []
+        results = []
+        while True:
+            try:
+                item = self.items.get_nowait()
+            except queue.Empty:
+                break
+            if isinstance(item, str):
+                lines.append(item)
+                continue
+            if isinstance(item, list):
+                results.extend(item)
+                continue
+            results.append(item)
+            if item.status in self.hidden_statuses:
+                self.batcher.dropped += 1
+            else:
+                lines.extend(format_result_lines(item))
+
+        if lines:
+            self.batcher.lines += len(lines)
+            self.batcher.batches += 1
+            self.metrics.observe_lines(len(lines))
+            self.output_signal.emit(lines)
+        if results:
+            # The engine knows how long each check took
+            self.metrics.observe_results(results, timed=True)
+            self.results_signal.emit(results)
+        if done:
+            self.finish()
+
+    def finish(self):
+        self.timer.stop()
+        if self.future.cancelled():
+            self.returncode = -1
+        elif self.future.exception():
+            self.returncode = 1
+            self.output_signal.emit([f"In-process search failed: {self.future.exception()}"])
+        else:
+            self.returncode = 0
+        self.metrics.finish(self.returncode)
+        self.stats_signal.emit(self.batcher.stats())
+        self.finished_signal.emit()
+
+    def terminate(self):
+        if self.future and not self.future.done():
+            self.future.cancel()
+
+    def wait(self):
+        # Nothing to join, the engine thread outlives its searches
+        pass
+
+# Runs the search on a maigret night daemon and streams its events back, with the same signals as
+# MaigretWorker. The daemon builds the same command from the same settings.
+class DaemonWorker(QThread):
+    output_signal = pyqtSignal(list)
+    results_signal = pyqtSignal(list)
+    stats_signal = pyqtSignal(dict)
+    finished_signal = pyqtSignal()
+
+    def __init__(self, address, settings, hidden_statuses=(), **overrides):
+        super().__init__()
+        self.client = DaemonClient(address)
+        self.settings = settings
+        self.overrides = overrides
+        self.hidden_statuses = set(hidden_statuses)
+        self.command = build_command(settings, **overrides)
+        self.job_id = None
+        self.cancelled = False
+        self.returncode = None
+        self.stats = {'lines': 0, 'batches': 0, 'merged': 0, 'dropped': 0}  # Until the daemon sends its own
+        self.metrics = RunMetrics("maigret", "daemon")
+
+    def description(self):
+        return f"Running on daemon {self.client.address}: {format_command(self.command)}"
+
+    def run(self):
+        try:
+            job = self.client.submit(self.settings, self.hidden_statuses, **self.overrides)
+            self.job_id = job['id']
+            self.metrics.mark_spawned()
+            if self.cancelled:
+                self.client.cancel(self.job_id)
+            for event in self.client.events(self.job_id):
+                self.handle_event(event)
+        except (OSError, ValueError, DaemonError) as error:
+            if not self.cancelled:
+                self.output_signal.emit([f"Daemon at {self.client.address} failed: {error}"])
+        if self.returncode is None:
+            # The stream broke off before the job ended
+            self.returncode = -1 if self.cancelled else 1
+        self.metrics.finish(self.returncode)
+        self.stats_signal.emit(self.stats)
+        self.finished_signal.emit()
+
+    def handle_event(self, event):
+        kind = event.get('event')
+        if kind == 'lines':
+            self.metrics.observe_lines(len(event['lines']))
+            self.output_signal.emit(event['lines'])
+        elif kind == 'results':
+            results = [SiteResult(**result) for result in event['results']]
+            self.metrics.observe_results(results)
+            self.results_signal.emit(results)
+        elif kind == 'end':
+            self.returncode = event['returncode'] if event['returncode'] is not None else 1
+            self.stats = event.get('stats') or self.stats
+            if event.get('error'):
+                self.output_signal.emit([event['error']])
+
+    def terminate(self):
+        self.cancelled = True
+        if self.job_id is not None:
+            try:
+                self.client.cancel(self.job_id)
+            except (OSError, DaemonError):
+                # Unreachable daemon, the stream is broken off instead so the thread can end
+                self.client.abort()
+        self.wait()
+
+def hidden_statuses(settings):
+    # Runs that print every check for tracking only show what the user asked to see
+    hidden = set()
+    if not settings.get('print_not_found'):
+        hidden.update((AVAILABLE, ILLEGAL))
+    if not settings.get('print_errors'):
+        hidden.add(UNKNOWN)
+    return hidden
+
+def make_worker(settings, engine=None, hidden_statuses=(), **overrides):
+    # The in-process engine runs the search when it is warm and supports the settings, the CLI otherwise
+    if settings.get('engine') == 'daemon':
+        return DaemonWorker(settings.get('daemon_address') or DEFAULT_ADDRESS, settings,
+                            hidden_statuses=hidden_statuses, **overrides)
+    if engine is not None and night_engine.can_run(settings):
+        return EngineWorker(engine, settings, hidden_statuses=hidden_statuses, **overrides)
+    return MaigretWorker(build_command(settings, **overrides), hidden_statuses=hidden_statuses)
+
+# Indexes the earlier run logs on a thread of its own. Searches over all logs don't wait for it, they
+# cover the logs indexed so far and are run again once it has picked up new ones.
+class LogIndexer(QThread):
+    def __init__(self, library, exclude):
+        super().__init__()
+        self.library = library
+        self.exclude = set(exclude)
+        self.changed = False
+
+    def run(self):
+        self.changed = self.library.refresh(self.exclude)
+
+# Renders a closed stream's HTML and PDF reports in a night_render.py process, so the scan goes on meanwhile
+class ReportRenderer(QThread):
+    message_signal = pyqtSignal(str)
+
+    def __init__(self, path, settings):
+        super().__init__()
+        self.command = [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), "night_render.py"),
+                        path, "--id-type", settings.get('id_type', 'username')]
+        if settings.get('html'):
+            self.command.append("--html")
+        if settings.get('pdf'):
+            self.command.append("--pdf")
+        if settings.get('report_sorting') and settings.get('report_sorting_type') == 'data':
+            self.command += ["--sorting", "data"]
+
+    def run(self):
+        try:
+            process = subprocess.run(self.command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                                     text=True, errors='replace')
+        except OSError as error:
+            self.message_signal.emit(f"Could not start the report renderer: {error}")
+            return
+        for line in process.stdout.splitlines():
+            self.message_signal.emit(line)
+        if process.returncode and not process.stdout.strip():
+            self.message_signal.emit(f"Report renderer failed with exit code {process.returncode}.")
+
+# The report streams of a run or a batch, one per username, opened when its first result arrives
+class ReportStreams:
+    def __init__(self, settings, notify, renderers):
+        self.settings = settings
+        self.notify = notify
+        self.streams = {}
+        self.failed = False
+        self.renderers = renderers  # Owned by the window, renderers outlive the run that started them
+
+    def add(self, results):
+        if self.failed:
+            return
+        by_username = collections.defaultdict(list)
+        for result in results:
+            by_username[result.username].append(result)
+        try:
+            for username, user_results in by_username.items():
+                stream = self.streams.get(username)
+                if stream is None:
+                    stream = self.streams[username] = ReportStream(username, self.settings, night_sites.site_url_main)
+                stream.add(user_results)
+        except OSError as error:
+            # The scan goes on, only its reports are lost
+            self.failed = True
+            self.notify(f"Report write failed ({error}), no more results are written to the reports.")
+
+    def close(self, username=None, render=True, settings=None, notify=None):
+        # Closes one username's stream, or all of them, and renders HTML and PDF from what they hold
+        notify = notify or self.notify
+        settings = settings or self.settings
+        for name in [username] if username is not None else list(self.streams):
+            stream = self.streams.pop(name, None)
+            if stream is None:
+                continue
+            try:
+                stream.close()
+            except OSError as error:
+                notify(f"Report write failed ({error}).")
+                continue
+            for path in stream.paths():
+                notify(f"Report saved to {path} ({stream.count} results, {stream.found} found).")
+            if render and (settings.get('html') or settings.get('pdf')):
+                renderer = ReportRenderer(stream.ndjson_path, settings)
+                renderer.message_signal.connect(self.notify)
+                renderer.finished.connect(lambda renderer=renderer: self.renderers.remove(renderer))
+                self.renderers.append(renderer)
+                renderer.start()
+
+# Table of site results as they stream in. Rows are indexed by status and by site tag when they
+# arrive, so filters and counters never have to walk the whole table again.
+class ResultTableModel(QAbstractTableModel):
+    COLUMNS = ["Username", "Site", "URL", "Status", "HTTP", "Extracted IDs", "Time (s)"]
+
+    def __init__(self):
+        super().__init__()
+        self.clear()
+
+    def clear(self):
+        self.beginResetModel()
+        self.results = []
+        self.rows_by_key = {}
+        self.by_status = collections.defaultdict(dict)  # status -> {row: None}, an insertion-ordered set
+        self.by_tag = collections.defaultdict(dict)
+        self.status_filter = None
+        self.tag_filter = None
+        self.visible = None  # Row numbers shown while a filter is active, None shows everything
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.results) if self.visible is None else len(self.visible)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.COLUMNS)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.DisplayRole and orientation == Qt.Orientation.Horizontal:
+            return self.COLUMNS[section]
+        return None
+
+    def result_at(self, position):
+        row = position if self.visible is None else self.visible[position]
+        return self.results[row]
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if role != Qt.ItemDataRole.DisplayRole or not index.isValid():
+            return None
+        result = self.result_at(index.row())
+        column = index.column()
+        if column == 0:
+            return result.username
+        if column == 1:
+            return result.site
+        if column == 2:
+            return result.url or ""
+        if column == 3:
+            return result.status if not result.error else f"{result.status}: {result.error}"
+        if column == 4:
+            return "" if result.http_code is None else str(result.http_code)
+        if column == 5:
+            return ", ".join(f"{key}: {value}" for key, value in (result.ids or {}).items())
+        if column == 6:
+            return "" if result.elapsed is None else f"{result.elapsed:.2f}"
+        return None
+
+    def matches(self, row):
+        return ((self.status_filter is None or row in self.by_status[self.status_filter])
+                and (self.tag_filter is None or row in self.by_tag[self.tag_filter]))
+
+    def add_results(self, results):
+        for result in results:
+            key = (result.username, result.site)
+            row = self.rows_by_key.get(key)
+            if row is None:
+                self.append_result(result)
+            else:
+                self.update_result(row, result)
+
+    def append_result(self, result):
+        row = len(self.results)
+        self.results.append(result)
+        self.rows_by_key[(result.username, result.site)] = row
+        self.by_status[result.status][row] = None
+        for tag in night_sites.site_tags(result.site):
+            self.by_tag[tag][row] = None
+
+        if self.visible is None:
+            self.beginInsertRows(QModelIndex(), row, row)
+            self.endInsertRows()
+        elif self.matches(row):
+            position = len(self.visible)
+            self.beginInsertRows(QModelIndex(), position, position)
+            self.visible.append(row)
+            self.endInsertRows()
+
+    def update_result(self, row, result):
+        # The same check reported again (e.g. with its HTTP status filled in) replaces the row in place
+        old = self.results[row]
+        was_visible = self.visible is None or self.matches(row)
+        del self.by_status[old.status][row]
+        self.results[row] = result
+        self.by_status[result.status][row] = None
+
+        if self.visible is None:
+            self.dataChanged.emit(self.index(row, 0), self.index(row, len(self.COLUMNS) - 1))
+            return
+        position = bisect.bisect_left(self.visible, row)
+        if was_visible and self.matches(row):
+            self.dataChanged.emit(self.index(position, 0), self.index(position, len(self.COLUMNS) - 1))
+        elif was_visible:
+            self.beginRemoveRows(QModelIndex(), position, position)
+            self.visible.pop(position)
+            self.endRemoveRows()
+        elif self.matches(row):
+            self.beginInsertRows(QModelIndex(), position, position)
+            self.visible.insert(position, row)
+            self.endInsertRows()
+
+    def set_filter(self, status=None, tag=None):
+        self.beginResetModel()
+        self.status_filter = status
+        self.tag_filter = tag
+        if status is None and tag is None:
+            self.visible = None
+        else:
+            # Start from the smaller index and check the other one, no scan over all rows
+            candidates = [self.by_status[status]] if status is not None else []
+            if tag is not None:
+                candidates.append(self.by_tag[tag])
+            smallest = min(candidates, key=len)
+            self.visible = sorted(row for row in smallest if self.matches(row))
+        self.endResetModel()
+
+    def counts(self):
+        return {status: len(self.by_status[status]) for status in STATUSES}
+
+    def tags(self):
+        return sorted(tag for tag, rows in self.by_tag.items() if rows)
+
+# List model that serves log lines straight from a LogSpool, so only the rows on screen are ever read
+class LogModel(QAbstractListModel):
+    def __init__(self, spool):
+        super().__init__()
+        self.spool = spool
+        self.line_index = None  # Built on the first search of this log, then kept up to date
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.spool)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.DisplayRole and index.isValid():
+            return self.spool.line(index.row())
+        return None
+
+    def append_lines(self, lines):
+        if not lines:
+            return
+        first = len(self.spool)
+        self.beginInsertRows(QModelIndex(), first, first + len(lines) - 1)
+        self.spool.append(lines)
+        if self.line_index is not None:
+            self.line_index.add(lines)
+        self.endInsertRows()
+
+    def search_index(self):
+        if self.line_index is None:
+            self.line_index = LineIndex()
+            self.line_index.add(self.spool.line(number) for number in range(len(self.spool)))
+        return self.line_index
+
+# The lines of a log that match a filter, followed live while the log grows, after the matches of
+# earlier logs when the filter covers them too
+class FilteredLogModel(QAbstractListModel):
+    def __init__(self, query, source, history=()):
+        super().__init__()
+        self.query = query
+        self.source = source
+        self.labelled = bool(history)  # Lines of several logs carry the name of theirs
+        self.entries = [(spool, number) for spool, numbers in history for number in numbers]
+        self.entries += [(source.spool, number) for number in query.search(source.search_index(), source.spool.line)]
+        source.rowsInserted.connect(self.on_source_rows)
+
+    def detach(self):
+        self.source.rowsInserted.disconnect(self.on_source_rows)
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.entries)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.DisplayRole and index.isValid():
+            spool, number = self.entries[index.row()]
+            if self.labelled:
+                return f"{os.path.basename(spool.path)}:{number + 1}: {spool.line(number)}"
+            return spool.line(number)
+        return None
+
+    def entry(self, row):
+        return self.entries[row]
+
+    def on_source_rows(self, parent, first, last):
+        # Only the new lines are tested, the index of the source is already up to date for the next query
+        spool = self.source.spool
+        new = [(spool, number) for number in range(first, last + 1) if self.query.matches(spool.line(number))]
+        if new:
+            self.beginInsertRows(QModelIndex(), len(self.entries), len(self.entries) + len(new) - 1)
+            self.entries += new
+            self.endInsertRows()
+
+# Paints the spans a filter matched. Only the rows on screen are painted, so highlighting a new
+# filter costs the same however long the log is.
+class HighlightDelegate(QStyledItemDelegate):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.pattern = None
+
+    def paint(self, painter, option, index):
+        text = index.data() or ""
+        spans = [match.span() for match in self.pattern.finditer(text) if match.end() > match.start()] if self.pattern else []
+        if not spans:
+            super().paint(painter, option, index)
+            return
+        item = QStyleOptionViewItem(option)
+        self.initStyleOption(item, index)
+        item.text = ""
+        style = item.widget.style() if item.widget else QApplication.style()
+        style.drawControl(QStyle.ControlElement.CE_ItemViewItem, item, painter, item.widget)
+
+        margin = style.pixelMetric(QStyle.PixelMetric.PM_FocusFrameHMargin, None, item.widget) + 1
+        rect = style.subElementRect(QStyle.SubElement.SE_ItemViewItemText, item, item.widget).adjusted(margin, 0, -margin, 0)
+        metrics = item.fontMetrics
+        selected = bool(item.state & QStyle.StateFlag.State_Selected)
+        painter.save()
+        painter.setClipRect(rect)
+        for start, end in spans:
+            left = rect.left() + metrics.horizontalAdvance(text[:start])
+            painter.fillRect(left, rect.top(), metrics.horizontalAdvance(text[start:end]), rect.height(), Qt.GlobalColor.yellow)
+        painter.setPen(item.palette.highlightedText().color() if selected else item.palette.text().color())
+        painter.drawText(rect, Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignVCenter, text)
+        painter.restore()
+
+# Read-only output view backed by a per-run log file on disk
+class LogView(QListView):
+    matches_changed = pyqtSignal(int)  # Lines matching the filter, -1 without one
+    line_requested = pyqtSignal(object, int)  # A filtered line was double-clicked: its spool and number
+
+    def __init__(self):
+        super().__init__()
+        self.setUniformItemSizes(True)  # Lets the view skip measuring rows that are off screen
+        self.setLayoutMode(QListView.LayoutMode.Batched)  # Otherwise every insert re-lays out the whole list
+        self.setSelectionMode(QListView.SelectionMode.ExtendedSelection)
+        self.delegate = HighlightDelegate(self)
+        self.setItemDelegate(self.delegate)
+        self.doubleClicked.connect(self.request_line)
+        self.log_model = None
+        self.owned = False
+        self.query = None
+        self.only_matching = True
+        self.history = []  # Matches in earlier logs, [(spool, line numbers)]
+        self.filtered = None
+        self.clear()
+
+    def set_model(self, log_model, owned):
+        # Only logs the view created itself are cleaned up here, job logs belong to their jobs
+        if self.log_model and self.owned:
+            self.log_model.spool.discard_if_empty()
+        self.log_model = log_model
+        self.owned = owned
+        self.show_filtered()
+
+    def set_filter(self, query, only_matching=True, history=()):
+        self.query = query or None
+        self.only_matching = only_matching
+        self.history = list(history)
+        self.show_filtered()
+
+    def show_filtered(self):
+        if self.filtered:
+            self.filtered.detach()
+            self.filtered = None
+        self.delegate.pattern = self.query.highlight() if self.query else None
+        if self.query:
+            # Also kept when every line is shown, it counts the matches and finds the next one
+            self.filtered = FilteredLogModel(self.query, self.log_model, self.history)
+            self.filtered.rowsInserted.connect(lambda: self.matches_changed.emit(len(self.filtered.entries)))
+        self.setModel(self.filtered if self.filtered and self.only_matching else self.log_model)
+        self.matches_changed.emit(len(self.filtered.entries) if self.filtered else -1)
+
+    def request_line(self, index):
+        if self.model() is self.filtered:
+            self.line_requested.emit(*self.filtered.entry(index.row()))
+
+    def scroll_to_line(self, number):
+        index = self.log_model.index(number)
+        self.setCurrentIndex(index)
+        self.scrollTo(index, QAbstractItemView.ScrollHint.PositionAtCenter)
+
+    def next_match(self):
+        # In the full log: selects the first match below the current line, wrapping around
+        if not self.filtered or self.model() is not self.log_model:
+            return
+        numbers = [number for spool, number in self.filtered.entries if spool is self.log_model.spool]
+        if numbers:
+            current = self.currentIndex().row()
+            position = bisect.bisect_right(numbers, current)
+            self.scroll_to_line(numbers[position % len(numbers)])
+
+    def clear(self):
+        # Every run starts a fresh log file, earlier ones stay on disk and can be reopened
+        self.set_model(LogModel(LogSpool.create()), True)
+
+    def open_log(self, path):
+        self.set_model(LogModel(LogSpool.open(path)), True)
+        self.scrollToBottom()
+
+    def show_log(self, log_model):
+        self.set_model(log_model, False)
+        self.scrollToBottom()
+
+    def log_path(self):
+        return self.log_model.spool.path
+
+    def append(self, text):
+        self.append_lines(text.split("\n"))
+
+    def append_lines(self, lines):
+        if not self.owned or not self.log_model.spool.writable:
+            # Reopened and job logs are not ours to write to, new output goes to a fresh one
+            self.clear()
+        scrollbar = self.verticalScrollBar()
+        follow = scrollbar.value() == scrollbar.maximum()
+        self.log_model.append_lines(lines)
+        if follow:
+            self.scrollToBottom()
+
+def is_scan(settings):
+    # Parse, submit, self-check and stats runs don't check sites for a username
+    return bool(settings.get('username', '').strip()) and not (
+        settings.get('parse_url') or settings.get('submit_url') or settings.get('self_check') or settings.get('stats')
+    )
+
+def plans_permutations(settings):
+    # `--permute` with a hit limit is planned by the GUI, without one maigret permutes on its own as before
+    return (bool(settings.get('permute')) and settings.get('permute_stop_after', 0) > 0 and is_scan(settings)
+            and settings.get('id_type', 'username') == 'username' and len(settings['username'].split()) > 1)
+
+def default_pool_size():
+    return min(4, os.cpu_count() or 1)
+
+# One username in a batch run, with its own worker, log and progress
+class BatchJob:
+    def __init__(self, username, id_type=None, depth=0, parent=None):
+        self.username = username
+        self.id_type = id_type  # None searches with the id type of the settings
+        self.depth = depth  # Crawl level, 0 for the identities the batch was started with
+        self.parent = parent  # Identity whose accounts this one was found on
+        self.status = "Pending"
+        self.worker = None
+        self.max_connections = 0
+        self.log_model = None
+        self.found_sites = set()
+        self.results = {}  # Checks made by this job, keyed by site
+        self.proxy = None  # Entry of the proxy pool the job runs through, until it finishes
+        self.proxy_url = ""
+        self.agent = None  # Entry of the agent pool the job runs on, until it finishes
+        self.overrides = None  # Planned once, a retry runs with the same ones
+        self.attempt = 0
+        self.failed_agents = set()
+        self.row = None
+
+# Runs a list of usernames through a bounded pool of MaigretWorker processes
+class BatchQueue(QObject):
+    job_added = pyqtSignal(object)
+    job_changed = pyqtSignal(object)
+    output_signal = pyqtSignal(object, list)
+    results_signal = pyqtSignal(list)
+    metrics_signal = pyqtSignal(object)
+    finished_signal = pyqtSignal()
+
+    def __init__(self, settings, pool_size, engine=None, planner=None, recorder=None, controller=None,
+                 proxy_pool=None, agent_pool=None, crawl=None):
+        super().__init__()
+        self.settings = settings
+        self.pool_size = pool_size
+        self.engine = engine
+        self.controller = controller  # Adapts the connection budget to the error rate, if set
+        self.proxy_pool = proxy_pool  # Each job runs through the best free proxy of the pool, if set
+        self.agent_pool = agent_pool  # Each job runs on the best free agent of the pool, if set
+        self.planner = planner  # planner(settings, username, notify) -> (sites to check or None, cached results)
+        self.recorder = recorder  # recorder(job, notify), called once a job has finished
+        self.crawl = crawl  # Queues the identities found on the accounts of each job, if set
+        # Jobs on the in-process engine report measured response times, the others arrival times
+        self.timed = engine is not None and agent_pool is None and night_engine.can_run(settings)
+        self.jobs = []
+        self.pending = collections.deque()
+        self.running = []
+        self.cancelled = False  # Set by Cancel All, no job is started after it
+
+    def add(self, username, id_type=None, depth=0, parent=None):
+        job = BatchJob(username, id_type, depth, parent)
+        self.jobs.append(job)
+        self.pending.append(job)
+        if self.crawl:
+            self.crawl.add_seed(username, self.settings_for(job)['id_type'])
+        self.job_added.emit(job)
+        return job
+
+    def settings_for(self, job):
+        if job.id_type is None:
+            return self.settings
+        return dict(self.settings, id_type=job.id_type)
+
+    def start(self):
+        self.fill()
+
+    def fill(self):
+        # Start the next job as soon as a slot frees up, so the pool never sits idle between runs
+        while self.pending and not self.cancelled:
+            # The controller moves the budget as errors come and go, before each job is started
+            self.connection_budget()
+            if len(self.running) >= self.slots() or self.free_connections() <= 0:
+                break
+            proxy = None
+            if self.proxy_pool:
+                if not self.proxy_pool.alive():
+                    # Running without the pool would send the checks from our own address
+                    self.fail_pending("Failed (no proxy)")
+                    break
+                proxy = self.proxy_pool.acquire()
+                if proxy is None:
+                    break  # Every proxy is at its max concurrency, a finishing job frees one up
+            agent = None
+            if self.agent_pool:
+                agent = self.agent_pool.acquire(self.pending[0].failed_agents) if self.agent_pool.alive() else None
+                if agent is None:
+                    if proxy:
+                        self.proxy_pool.release(proxy)
+                    if not self.agent_pool.alive():
+                        self.fail_pending("Failed (no agent)")
+                    break  # Otherwise every agent is busy, a finishing job frees one up
+            self.start_job(self.pending.popleft(), proxy, agent)
+        if not self.running and not self.pending:
+            self.finished_signal.emit()
+
+    def fail_pending(self, status):
+        while self.pending:
+            job = self.pending.popleft()
+            job.status = status
+            self.job_changed.emit(job)
+
+    def connection_budget(self):
+        if self.controller:
+            return self.controller.adjust()
+        return self.settings.get('max_connections', 10)
+
+    def current_budget(self):
+        return self.controller.limit if self.controller else self.settings.get('max_connections', 10)
+
+    def slots(self):
+        # Every job needs a connection, so no more jobs run at once than the budget has connections
+        return max(1, min(self.pool_size, self.current_budget()))
+
+    def free_connections(self):
+        # Running jobs keep the share they started with, a shrunk budget is only caught up on as they end
+        return self.current_budget() - sum(job.max_connections for job in self.running)
+
+    def connection_share(self):
+        # The --max-connections budget is split into equal shares, one per slot, whatever is queued when
+        # the job starts: jobs queued later by the crawl or a retry get a share of their own
+        return max(1, min(self.current_budget() // self.slots(), self.free_connections()))
+
+    def start_job(self, job, proxy=None, agent=None):
+        job.proxy = proxy
+        job.agent = agent
+        job.attempt += 1
+        if job.overrides is None:
+            job.log_model = LogModel(LogSpool.create())
+            job.overrides = self.plan_job(job)
+            if job.overrides is None:
+                return
+
+        overrides = dict(job.overrides)
+        hidden = hidden_statuses(self.settings) if overrides else ()
+        if proxy:
+            job.proxy_url = proxy.url
+            overrides['proxy'] = proxy.url
+        job.max_connections = self.connection_share()
+        settings = self.settings_for(job)
+        if agent:
+            # Reports written on the agent would stay there, they are written here from the results instead
+            overrides['reports'] = False
+            job.worker = DaemonWorker(agent.address, settings, hidden,
+                                      username=job.username, max_connections=job.max_connections, **overrides)
+        else:
+            job.worker = make_worker(settings, self.engine, hidden,
+                                     username=job.username, max_connections=job.max_connections, **overrides)
+        job.worker.metrics.label = f"job {job.username}"
+        job.log_model.append_lines([job.worker.description()])
+        job.status = "Running"
+
+        job.worker.output_signal.connect(lambda lines, job=job: self.on_job_output(job, lines))
+        job.worker.results_signal.connect(lambda results, job=job: self.on_job_results(job, results))
+        job.worker.finished_signal.connect(lambda job=job: self.on_job_finished(job))
+        self.running.append(job)
+        job.worker.start()
+        self.job_changed.emit(job)
+
+    def plan_job(self, job):
+        # The overrides of the job's run, None when the cache answers every check and the job is done
+        notify = lambda text, job=job: job.log_model.append_lines([text])
+        if not self.planner:
+            # A scan's reports are streamed by the recorder's side, maigret needs to print every check for them
+            return {'reports': False, 'track_all': True} if self.recorder else {}
+        sites, cached = self.planner(self.settings_for(job), job.username, notify)
+        if cached:
+            self.on_job_results(job, cached, fresh=False)
+        if sites == []:
+            # The cache answers every check, the job is done without starting a worker
+            job.status = "Done"
+            self.finish_job(job)
+            return None
+        if sites is not None:
+            return {'sites': sites, 'reports': False, 'track_all': True}
+        return {}
+
+    def on_job_output(self, job, lines):
+        job.log_model.append_lines(lines)
+        self.output_signal.emit(job, lines)
+
+    def on_job_results(self, job, results, fresh=True):
+        job.found_sites.update(result.site for result in results if result.status == CLAIMED)
+        if fresh:
+            job.results.update((result.site, result) for result in results)
+            if self.controller:
+                self.controller.observe(results)
+            if job.proxy:
+                self.proxy_pool.report(job.proxy, results)
+        self.results_signal.emit(results)
+        # Results still queued from a terminated worker arrive after Cancel All, they queue nothing
+        if self.crawl and not self.cancelled and job.status in ("Pending", "Running"):
+            self.expand(job, results)
+
+    def expand(self, job, results):
+        # New identities are scanned as soon as they turn up, not once the job that found them ends
+        discovered = self.crawl.discover(results, job.depth)
+        for identifier, id_type, site in discovered:
+            child = self.add(identifier, id_type, job.depth + 1, job.username)
+            job.log_model.append_lines([f"Found {id_type} {identifier} on {site}, queued at depth {child.depth}."])
+        if discovered:
+            self.fill()
+
+    def on_job_finished(self, job):
+        if job in self.running:
+            self.running.remove(job)
+        job.worker.wait()
+        self.metrics_signal.emit(job.worker.metrics)
+        if job.status == "Running":
+            returncode = job.worker.returncode
+            job.status = "Done" if returncode == 0 else f"Failed ({returncode})"
+            if job.agent:
+                self.agent_pool.record_job(job.agent, returncode == 0, f"exit code {returncode}")
+                if returncode != 0 and job.attempt < MAX_ATTEMPTS:
+                    self.retry(job)
+                    self.fill()
+                    return
+        self.finish_job(job)
+        self.fill()
+
+    def retry(self, job):
+        # Runs again first thing, on an agent it has not failed on yet. Its results so far are kept.
+        job.log_model.append_lines([f"Failed on agent {job.agent.address} ({job.status}), retrying on another agent."])
+        job.failed_agents.add(job.agent.address)
+        self.release_slots(job)
+        job.status = "Pending"
+        self.pending.appendleft(job)
+        self.job_changed.emit(job)
+
+    def release_slots(self, job):
+        if job.proxy:
+            self.proxy_pool.release(job.proxy)
+            job.proxy = None
+        if job.agent:
+            self.agent_pool.release(job.agent)
+            job.agent = None
+
+    def finish_job(self, job):
+        self.release_slots(job)
+        if self.crawl and job.status == "Done":
+            self.crawl.mark_visited(job.username, self.settings_for(job)['id_type'], job.depth, job.parent)
+        if self.recorder:
+            self.recorder(job, lambda text: job.log_model.append_lines([text]))
+        job.results = {}
+        job.log_model.spool.seal()
+        self.job_changed.emit(job)
+
+    def cancel(self, job):
+        if job.status == "Pending":
+            self.pending.remove(job)
+            job.status = "Cancelled"
+            self.job_changed.emit(job)
+            if not self.running and not self.pending:
+                self.finished_signal.emit()
+        elif job.status == "Running":
+            job.status = "Cancelled"
+            job.worker.terminate()
+
+    def cancel_all(self):
+        self.cancelled = True
+        for job in list(self.pending) + list(self.running):
+            self.cancel(job)
+
+# One slice of the site list, checked by its own maigret process
+class Shard:
+    def __init__(self, number, sites):
+        self.number = number
+        self.sites = sites
+        self.pending = set(sites)  # Sites that have not reported a result yet
+        self.status = "Pending"
+        self.worker = None
+        self.proxy = None
+        self.agent = None  # Entry of the agent pool the shard runs on, until it finishes
+        self.attempt = 1
+        self.failed_agents = set()  # Addresses of the agents earlier attempts failed on
+        self.started_at = None
+        self.first_result_at = None
+        self.last_result_at = None
+
+    def time_left(self, now):
+        # Seconds its pending sites will take at the rate it has checked sites so far. A shard that
+        # has reported nothing yet, or nothing for a while, keeps falling behind as time passes.
+        checked = len(self.sites) - len(self.pending)
+        if not checked:
+            return float('inf')
+        rate = checked / max(now - self.first_result_at, 1.0)
+        return len(self.pending) / rate + (now - self.last_result_at)
+
+# Splits a single scan across several maigret processes and merges what they report
+class ShardScan(QObject):
+    output_signal = pyqtSignal(list)
+    results_signal = pyqtSignal(list)
+    message_signal = pyqtSignal(str)
+    metrics_signal = pyqtSignal(object)
+    finished_signal = pyqtSignal()
+
+    def __init__(self, settings, sites, shard_count, min_split=20, split_grace=15, controller=None,
+                 proxy_pool=None, agent_pool=None):
+        super().__init__()
+        self.settings = settings
+        self.controller = controller
+        self.proxy_pool = proxy_pool
+        self.agent_pool = agent_pool  # Shards run on the agents of the pool instead of locally, if set
+        self.shard_count = shard_count
+        self.min_split = min_split
+        self.split_grace = split_grace  # Seconds a shard runs before it can be split, maigret starts up meanwhile
+        self.rebalance_timer = QTimer(self)
+        self.rebalance_timer.setSingleShot(True)
+        self.rebalance_timer.timeout.connect(self.fill)
+        self.queue = collections.deque()
+        self.running = []
+        self.results = {}
+        self.rebalances = 0
+        self.retries = 0
+        self.cancelled = False
+        self.shard_total = 0
+        for shard_sites in night_sites.make_shards(sites, shard_count):
+            self.add_shard(shard_sites)
+
+        # Every shard prints all of its checks so progress can be tracked, the view only shows what was asked for
+        self.hidden_statuses = hidden_statuses(settings)
+
+    def add_shard(self, sites, first=False):
+        self.shard_total += 1
+        shard = Shard(self.shard_total, sites)
+        if first:
+            self.queue.appendleft(shard)
+        else:
+            self.queue.append(shard)
+        return shard
+
+    def start(self):
+        self.fill()
+
+    def fill(self):
+        while not self.cancelled:
+            while self.queue and len(self.running) < self.shard_count:
+                proxy = None
+                if self.proxy_pool:
+                    if not self.proxy_pool.alive():
+                        self.message_signal.emit("No proxy of the pool is left in service, the scan stops.")
+                        self.cancel()
+                        break
+                    proxy = self.proxy_pool.acquire()
+                    if proxy is None:
+                        break  # Every proxy is at its max concurrency, a finishing shard frees one up
+                agent = None
+                if self.agent_pool:
+                    agent = self.agent_pool.acquire(self.queue[0].failed_agents) if self.agent_pool.alive() else None
+                    if agent is None:
+                        if proxy:
+                            self.proxy_pool.release(proxy)
+                        if not self.agent_pool.alive():
+                            self.message_signal.emit("No agent is left in service, the scan stops.")
+                            self.cancel()
+                        break  # Otherwise every agent is busy, a finishing shard frees one up
+                self.start_shard(self.queue.popleft(), proxy, agent)
+            if self.queue or len(self.running) >= self.shard_count or not self.rebalance():
+                break
+        if not self.running:
+            self.rebalance_timer.stop()
+            self.finished_signal.emit()
+
+    def start_shard(self, shard, proxy=None, agent=None):
+        budget = self.controller.adjust() if self.controller else self.settings.get('max_connections', 10)
+        connections = max(1, budget // self.shard_count)
+        shard.proxy = proxy
+        shard.agent = agent
+        shard.status = "Running"
+        shard.started_at = time.monotonic()
+        overrides = {'max_connections': connections, 'sites': shard.sites, 'proxy': proxy.url if proxy else None,
+                     'reports': False, 'track_all': True}
+        if agent:
+            shard.worker = DaemonWorker(agent.address, self.settings, self.hidden_statuses, **overrides)
+        else:
+            # Shards run as CLI processes, or as jobs on the daemon when one is selected
+            shard.worker = make_worker(self.settings, hidden_statuses=self.hidden_statuses, **overrides)
+        shard.worker.metrics.label = f"shard {shard.number}"
+        shard.worker.output_signal.connect(self.output_signal.emit)
+        shard.worker.results_signal.connect(lambda results, shard=shard: self.on_results(shard, results))
+        shard.worker.finished_signal.connect(lambda shard=shard: self.on_shard_finished(shard))
+        self.running.append(shard)
+        shard.worker.start()
+        via = f" via {proxy.url}" if proxy else ""
+        on = f" on agent {agent.address}" if agent else ""
+        self.message_signal.emit(
+            f"Shard {shard.number} started with {len(shard.sites)} sites, {connections} connections{via}{on}."
+        )
+
+    def on_results(self, shard, results):
+        if self.controller:
+            self.controller.observe(results)
+        if shard.proxy:
+            self.proxy_pool.report(shard.proxy, results)
+        now = time.monotonic()
+        shard.first_result_at = shard.first_result_at or now
+        shard.last_result_at = now
+        merged = []
+        for result in results:
+            shard.pending.discard(result.site)
+            # A site can be reported twice after a rebalance, the first report wins
+            key = (result.username, result.site)
+            if key not in self.results:
+                self.results[key] = result
+                merged.append(result)
+        if merged:
+            self.results_signal.emit(merged)
+
+    def on_shard_finished(self, shard):
+        if shard in self.running:
+            self.running.remove(shard)
+        shard.worker.wait()
+        if shard.status == "Running":
+            # An agent that dies or loses its maigret process leaves sites without a result
+            failed = shard.worker.returncode != 0 and bool(shard.pending)
+            if shard.agent:
+                self.agent_pool.record_job(shard.agent, not failed, f"exit code {shard.worker.returncode}")
+            if failed and shard.agent:
+                shard.status = "Failed"
+                self.retry(shard)
+            else:
+                shard.status = "Done"
+                self.message_signal.emit(f"Shard {shard.number} finished ({len(shard.sites) - len(shard.pending)} sites checked).")
+        self.metrics_signal.emit(shard.worker.metrics)
+        self.release_slots(shard)
+        self.fill()
+
+    def retry(self, shard):
+        remaining = [site for site in shard.sites if site in shard.pending]
+        failure = f"Shard {shard.number} failed on agent {shard.agent.address} (exit code {shard.worker.returncode})"
+        if shard.attempt >= MAX_ATTEMPTS:
+            self.message_signal.emit(f"{failure}, {len(remaining)} sites stay unchecked after {shard.attempt} attempts.")
+            return
+        # The retry goes first in the queue, on an agent this slice has not failed on yet
+        retry = self.add_shard(remaining, first=True)
+        retry.attempt = shard.attempt + 1
+        retry.failed_agents = shard.failed_agents | {shard.agent.address}
+        self.retries += 1
+        self.message_signal.emit(f"{failure}, its {len(remaining)} remaining sites are retried as shard {retry.number}.")
+
+    def release_slots(self, shard):
+        if shard.proxy:
+            self.proxy_pool.release(shard.proxy)
+            shard.proxy = None
+        if shard.agent:
+            self.agent_pool.release(shard.agent)
+            shard.agent = None
+
+    def rebalance(self):
+        # A slot is idle and nothing is queued: the shard that will take longest to finish gives half
+        # of its sites away. Shards still in their grace period are left alone, splitting one throws
+        # away its startup, and the idle slot is looked at again once the earliest grace period ends.
+        now = time.monotonic()
+        candidates = [shard for shard in self.running if len(shard.pending) >= self.min_split]
+        ready = [shard for shard in candidates if now - shard.started_at >= self.split_grace]
+        if len(ready) < len(candidates):
+            wait = min(self.split_grace - (now - shard.started_at) for shard in candidates if shard not in ready)
+            self.rebalance_timer.start(int(wait * 1000) + 100)
+        lagging = max(ready, key=lambda shard: shard.time_left(now), default=None)
+        # Not worth it when the shard will be done before a new one would be up and running
+        if lagging is None or lagging.time_left(now) < self.split_grace:
+            return False
+
+        remaining = [site for site in lagging.sites if site in lagging.pending]
+        lagging.status = "Split"
+        self.running.remove(lagging)
+        # Whatever it still has buffered belongs to sites that are about to be checked again
+        lagging.worker.output_signal.disconnect()
+        lagging.worker.results_signal.disconnect()
+        lagging.worker.terminate()
+        self.release_slots(lagging)
+        self.rebalances += 1
+        parts = [self.add_shard(sites) for sites in night_sites.make_shards(remaining, 2)]
+        self.message_signal.emit(
+            f"Shard {lagging.number} is lagging, its {len(remaining)} remaining sites moved to shards "
+            + " and ".join(str(part.number) for part in parts) + "."
+        )
+        return True
+
+    def cancel(self):
+        self.cancelled = True
+        self.rebalance_timer.stop()
+        self.queue.clear()
+        for shard in list(self.running):
+            shard.status = "Cancelled"
+            shard.worker.terminate()
+
 # Main GUI class for the Maigret OSINT tool
 class MaigretGUI(QMainWindow):
     def __init__(self):
@@ -36,6 +1203,32 @@ class MaigretGUI(QMainWindow):
         self.setWindowTitle("Maigret Night")
         self.setGeometry(100, 100, 1000, 600)  # Reduced window size
         self.worker = None
+        self.batch_queue = None
+        self.shard_scan = None
+        self.engine = None
+        self.cache = None
+        self.health = None
+        self.visited = None
+        self.permutation_stats = None
+        self.permutation_plan = None  # Set while the variants of a permuted search run on the batch queue
+        self.run_settings = None
+        self.run_timed = False  # Whether the run measures per-site response times
+        self.run_results = {}  # Checks made by the current run, stored in the cache when it finishes
+        self.run_reports = None
+        self.batch_reports = None
+        self.renderers = []
+        self.checkpoint = None
+        self.proxy_pool = None
+        self.proxy_pool_key = None  # Pool text and check URL the current pool was built from
+        self.health_checker = None
+        self.agent_pool = None
+        self.agent_pool_key = None  # Agent list the current pool was built from
+        self.agent_checker = None
+        self.run_pool = None
+        self.run_proxy = None
+        self.run_metrics = None
+        self.batch_metrics = None
+        self.metrics_history = collections.deque(maxlen=500)
 
         central_widget = QWidget()
         self.setCentralWidget(central_widget)
@@ -49,7 +1242,13 @@ class MaigretGUI(QMainWindow):
         # Create tabs for different sections
         self.create_options_tab(tab_widget)
         self.create_proxy_tab(tab_widget)
+        self.create_agents_tab(tab_widget)
         self.create_output_tab(tab_widget)
+        self.create_cache_tab(tab_widget)
+        self.create_health_tab(tab_widget)
+        self.create_batch_tab(tab_widget)
+        self.create_results_tab(tab_widget)
+        self.create_performance_tab(tab_widget)
 
         # Buttons and output area
         self.create_buttons(layout)
@@ -68,6 +1267,10 @@ class MaigretGUI(QMainWindow):
         self.load_button.clicked.connect(self.load_settings_dialog)
         save_load_layout.addWidget(self.load_button)
 
+        self.open_log_button = QPushButton("Open Run Log")
+        self.open_log_button.clicked.connect(self.open_log_dialog)
+        save_load_layout.addWidget(self.open_log_button)
+
         layout.addLayout(save_load_layout)
 
     def save_settings_dialog(self):
@@ -77,8 +1280,26 @@ class MaigretGUI(QMainWindow):
         if file_path:
             self.save_settings(file_path)
 
+    def open_log_dialog(self):
+        # Open a log from an earlier run, the sidecar index makes this instant regardless of size
+        file_path, _ = QFileDialog.getOpenFileName(self, "Open Run Log", LOG_DIR, "Log Files (*.log);;All Files (*)")
+
+        if file_path:
+            try:
+                self.output_area.open_log(file_path)
+            except OSError as error:
+                self.output_area.append(f"Could not open log {file_path}: {error}")
+
     def save_settings(self, file_path):
-        settings = {
+        settings = self.collect_settings()
+
+        with open(file_path, 'w') as json_file:
+            json.dump(settings, json_file, indent=4)
+
+        self.output_area.append(f"Settings saved to {file_path}.")
+
+    def collect_settings(self):
+        return {
             'username': self.username_input.text(),
             'timeout': self.timeout_spinbox.value(),
             'retries': self.retries_spinbox.value(),
@@ -87,6 +1308,8 @@ class MaigretGUI(QMainWindow):
             'no_extracting': self.no_extracting_checkbox.isChecked(),
             'id_type': self.id_type_combobox.currentText(),
             'permute': self.permute_checkbox.isChecked(),
+            'permute_stop_after': self.permute_stop_spinbox.value(),
+            'permute_max_variants': self.permute_max_spinbox.value(),
             'proxy': self.proxy_input.text(),
             'tor_proxy': self.tor_proxy_input.text(),
             'i2p_proxy': self.i2p_proxy_input.text(),
@@ -111,13 +1334,27 @@ class MaigretGUI(QMainWindow):
             'verbose': self.verbose_checkbox.isChecked(),
             'info': self.info_checkbox.isChecked(),
             'debug': self.debug_checkbox.isChecked(),
+            'batch_pool_size': self.batch_pool_spinbox.value(),
+            'crawl': self.crawl_checkbox.isChecked(),
+            'crawl_depth': self.crawl_depth_spinbox.value(),
+            'crawl_budget': self.crawl_budget_spinbox.value(),
+            'crawl_revisit_days': self.crawl_revisit_spinbox.value(),
+            'shards': self.shards_spinbox.value(),
+            'engine': self.engine_combobox.currentText(),
+            'daemon_address': self.daemon_address_input.text(),
+            'adaptive_connections': self.adaptive_checkbox.isChecked(),
+            'min_connections': self.min_connections_spinbox.value(),
+            'max_connections_limit': self.max_connections_limit_spinbox.value(),
+            'proxy_pool': self.proxy_pool_input.toPlainText(),
+            'proxy_check_url': self.proxy_check_url_input.text(),
+            'distributed': self.distributed_checkbox.isChecked(),
+            'agents': self.agents_input.toPlainText(),
+            'site_order': self.site_order_combobox.currentText(),
+            'dead_sites': self.dead_sites_combobox.currentText(),
+            'incremental': self.incremental_checkbox.isChecked(),
+            'cache_ttl': {status: spinbox.value() for status, spinbox in self.ttl_spinboxes.items()},
         }
 
-        with open(file_path, 'w') as json_file:
-            json.dump(settings, json_file, indent=4)
-
-        self.output_area.append(f"Settings saved to {file_path}.")
-
     def load_settings_dialog(self):
         # Open a file dialog to load settings
         file_path, _ = QFileDialog.getOpenFileName(self, "Load Settings", "", "JSON Files (*.json);;All Files (*)")
@@ -138,6 +1375,8 @@ class MaigretGUI(QMainWindow):
             self.no_extracting_checkbox.setChecked(settings.get('no_extracting', False))
             self.id_type_combobox.setCurrentText(settings.get('id_type', 'username'))
             self.permute_checkbox.setChecked(settings.get('permute', False))
+            self.permute_stop_spinbox.setValue(settings.get('permute_stop_after', 1))
+            self.permute_max_spinbox.setValue(settings.get('permute_max_variants', 0))
             self.proxy_input.setText(settings.get('proxy', ''))
             self.tor_proxy_input.setText(settings.get('tor_proxy', ''))
             self.i2p_proxy_input.setText(settings.get('i2p_proxy', ''))
@@ -162,6 +1401,27 @@ class MaigretGUI(QMainWindow):
             self.verbose_checkbox.setChecked(settings.get('verbose', False))
             self.info_checkbox.setChecked(settings.get('info', False))
             self.debug_checkbox.setChecked(settings.get('debug', False))
+            self.batch_pool_spinbox.setValue(settings.get('batch_pool_size', default_pool_size()))
+            self.crawl_checkbox.setChecked(settings.get('crawl', False))
+            self.crawl_depth_spinbox.setValue(settings.get('crawl_depth', 2))
+            self.crawl_budget_spinbox.setValue(settings.get('crawl_budget', 50))
+            self.crawl_revisit_spinbox.setValue(settings.get('crawl_revisit_days', 30))
+            self.shards_spinbox.setValue(settings.get('shards', 1))
+            self.engine_combobox.setCurrentText(settings.get('engine', 'cli'))
+            self.daemon_address_input.setText(settings.get('daemon_address', DEFAULT_ADDRESS))
+            self.adaptive_checkbox.setChecked(settings.get('adaptive_connections', False))
+            self.min_connections_spinbox.setValue(settings.get('min_connections', 2))
+            self.max_connections_limit_spinbox.setValue(settings.get('max_connections_limit', 50))
+            self.proxy_pool_input.setPlainText(settings.get('proxy_pool', ''))
+            self.proxy_check_url_input.setText(settings.get('proxy_check_url', ''))
+            self.distributed_checkbox.setChecked(settings.get('distributed', False))
+            self.agents_input.setPlainText(settings.get('agents', ''))
+            self.site_order_combobox.setCurrentText(settings.get('site_order', 'rank'))
+            self.dead_sites_combobox.setCurrentText(settings.get('dead_sites', 'check'))
+            self.incremental_checkbox.setChecked(settings.get('incremental', False))
+            cache_ttl = settings.get('cache_ttl', {})
+            for status, spinbox in self.ttl_spinboxes.items():
+                spinbox.setValue(cache_ttl.get(status, DEFAULT_TTL[status]))
 
             self.output_area.append(f"Settings loaded from {file_path}.")
         except FileNotFoundError:
@@ -211,6 +1471,44 @@ class MaigretGUI(QMainWindow):
         max_connections_layout.addWidget(self.max_connections_spinbox)
         options_layout.addLayout(max_connections_layout)
 
+        # Adaptive connections, batch jobs and shards start from Max Connections and move within these bounds
+        adaptive_layout = QHBoxLayout()
+        self.adaptive_checkbox = QCheckBox("Adaptive Connections")
+        adaptive_layout.addWidget(self.adaptive_checkbox)
+        adaptive_layout.addWidget(QLabel("Min:"))
+        self.min_connections_spinbox = QSpinBox()
+        self.min_connections_spinbox.setRange(1, 200)
+        self.min_connections_spinbox.setValue(2)
+        adaptive_layout.addWidget(self.min_connections_spinbox)
+        adaptive_layout.addWidget(QLabel("Max:"))
+        self.max_connections_limit_spinbox = QSpinBox()
+        self.max_connections_limit_spinbox.setRange(1, 200)
+        self.max_connections_limit_spinbox.setValue(50)
+        adaptive_layout.addWidget(self.max_connections_limit_spinbox)
+        options_layout.addLayout(adaptive_layout)
+
+        # Shards input, more than one splits the selected sites across parallel maigret processes
+        shards_layout = QHBoxLayout()
+        shards_layout.addWidget(QLabel("Shards:"))
+        self.shards_spinbox = QSpinBox()
+        self.shards_spinbox.setRange(1, 16)
+        self.shards_spinbox.setValue(1)
+        shards_layout.addWidget(self.shards_spinbox)
+        options_layout.addLayout(shards_layout)
+
+        # Engine combobox, in-process keeps maigret and its site database loaded between runs
+        engine_layout = QHBoxLayout()
+        engine_layout.addWidget(QLabel("Engine:"))
+        self.engine_combobox = QComboBox()
+        self.engine_combobox.addItems(["cli", "in-process", "daemon"])
+        engine_layout.addWidget(self.engine_combobox)
+        # A headless night_daemon.py, on this machine or reachable from it
+        engine_layout.addWidget(QLabel("Daemon:"))
+        self.daemon_address_input = QLineEdit(DEFAULT_ADDRESS)
+        self.daemon_address_input.setPlaceholderText("host:port or unix:/path/to/socket")
+        engine_layout.addWidget(self.daemon_address_input)
+        options_layout.addLayout(engine_layout)
+
         # Create a horizontal layout for the checkboxes: No Extracting, Permute, All Sites
         checkbox_layout_1 = QHBoxLayout()
 
@@ -225,6 +1523,28 @@ class MaigretGUI(QMainWindow):
 
         options_layout.addLayout(checkbox_layout_1)
 
+        # Permuted searches are planned here: the likeliest variants go first, a site is no longer
+        # checked once enough variants have hit there
+        permute_layout = QHBoxLayout()
+        permute_layout.addWidget(QLabel("Stop a Site After Hits:"))
+        self.permute_stop_spinbox = QSpinBox()
+        self.permute_stop_spinbox.setRange(0, 100)
+        self.permute_stop_spinbox.setValue(1)
+        self.permute_stop_spinbox.setToolTip("0 leaves the permutations to maigret, every variant on every site")
+        permute_layout.addWidget(self.permute_stop_spinbox)
+
+        permute_layout.addWidget(QLabel("Max Variants:"))
+        self.permute_max_spinbox = QSpinBox()
+        self.permute_max_spinbox.setRange(0, 10000)
+        self.permute_max_spinbox.setValue(0)
+        self.permute_max_spinbox.setToolTip("Only the likeliest variants are searched, 0 searches all of them")
+        permute_layout.addWidget(self.permute_max_spinbox)
+
+        self.permute_clear_button = QPushButton("Clear Permutation Stats")
+        self.permute_clear_button.clicked.connect(self.clear_permutation_stats)
+        permute_layout.addWidget(self.permute_clear_button)
+        options_layout.addLayout(permute_layout)
+
         # Create a horizontal layout for the checkboxes: Self Check, Stats, Report Sorting
         checkbox_layout_2 = QHBoxLayout()
 
@@ -342,9 +1662,170 @@ class MaigretGUI(QMainWindow):
         proxy_layout.addWidget(QLabel("I2P Proxy URL:"))
         proxy_layout.addWidget(self.i2p_proxy_input)
 
+        # A pool replaces the single proxy above for batch jobs, shards and runs
+        proxy_layout.addWidget(QLabel("Proxy Pool (one per line: URL [weight] [max concurrent jobs]):"))
+        self.proxy_pool_input = QPlainTextEdit()
+        self.proxy_pool_input.setMaximumHeight(80)
+        proxy_layout.addWidget(self.proxy_pool_input)
+
+        check_layout = QHBoxLayout()
+        check_layout.addWidget(QLabel("Health Check URL:"))
+        self.proxy_check_url_input = QLineEdit()
+        self.proxy_check_url_input.setPlaceholderText("built-in local endpoint, loopback proxies only")
+        check_layout.addWidget(self.proxy_check_url_input)
+        self.proxy_check_button = QPushButton("Check Now")
+        self.proxy_check_button.clicked.connect(self.check_proxies)
+        check_layout.addWidget(self.proxy_check_button)
+        proxy_layout.addLayout(check_layout)
+
+        self.proxy_table = QTableWidget(0, 7)
+        self.proxy_table.setHorizontalHeaderLabels(["Proxy", "Weight", "Jobs", "Latency (ms)", "Checks", "Errors", "Status"])
+        self.proxy_table.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
+        self.proxy_table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        proxy_layout.addWidget(self.proxy_table)
+
+        # Health and load change in the background, the table is refreshed while a pool exists
+        self.proxy_timer = QTimer(self)
+        self.proxy_timer.setInterval(1000)
+        self.proxy_timer.timeout.connect(self.update_proxy_table)
+
         proxy_group.setLayout(proxy_layout)
         tab_widget.addTab(proxy_group, "Proxy")
 
+    def pool_for(self, settings):
+        # The pool, and the health scores it has collected, is kept as long as its definition is unchanged
+        text = settings.get('proxy_pool', '').strip()
+        key = (text, settings.get('proxy_check_url', '').strip())
+        if key == self.proxy_pool_key:
+            return self.proxy_pool
+        self.stop_proxy_pool()
+        if not text:
+            return None
+        try:
+            entries = parse_pool(text)
+        except ValueError as error:
+            self.output_area.append(f"{error}, the proxy pool is not used.")
+            return None
+
+        self.proxy_pool = ProxyPool(entries)
+        self.proxy_pool_key = key
+        self.health_checker = HealthChecker(self.proxy_pool, key[1] or None)
+        self.health_checker.start()
+        self.proxy_table.setRowCount(len(entries))
+        for row, entry in enumerate(entries):
+            for column in range(self.proxy_table.columnCount()):
+                self.proxy_table.setItem(row, column, QTableWidgetItem())
+        self.proxy_timer.start()
+        self.output_area.append(f"Proxy pool of {len(entries)} proxies, health checks against {self.health_checker.url}.")
+        return self.proxy_pool
+
+    def stop_proxy_pool(self):
+        if self.health_checker:
+            self.health_checker.stop()
+        self.proxy_pool = None
+        self.proxy_pool_key = None
+        self.health_checker = None
+        self.proxy_timer.stop()
+        self.proxy_table.setRowCount(0)
+
+    def check_proxies(self):
+        if self.pool_for(self.collect_settings()):
+            self.health_checker.check_now()
+
+    def update_proxy_table(self):
+        if self.proxy_pool is None:
+            return
+        for message in self.proxy_pool.take_events():
+            self.output_area.append(message)
+        for row, entry in enumerate(self.proxy_pool.entries):
+            latency = "" if entry.latency is None else f"{entry.latency * 1000:.0f}"
+            values = [entry.url, f"{entry.weight:g}", f"{entry.active}/{entry.max_jobs}", latency,
+                      str(entry.checks), f"{entry.error_rate():.1%}", entry.status()]
+            for column, value in enumerate(values):
+                self.proxy_table.item(row, column).setText(value)
+
+    def create_agents_tab(self, tab_widget):
+        agents_group = QWidget()
+        agents_layout = QVBoxLayout()
+
+        # Agents are night_daemon.py instances, this window schedules shards and batch jobs on them
+        self.distributed_checkbox = QCheckBox("Distribute scans and batch jobs across agents")
+        agents_layout.addWidget(self.distributed_checkbox)
+        agents_layout.addWidget(QLabel("Agents (one per line: host:port [slots] or unix:/path/to/socket [slots]):"))
+        self.agents_input = QPlainTextEdit()
+        self.agents_input.setMaximumHeight(80)
+        agents_layout.addWidget(self.agents_input)
+
+        check_layout = QHBoxLayout()
+        check_layout.addStretch()
+        self.agents_check_button = QPushButton("Check Now")
+        self.agents_check_button.clicked.connect(self.check_agents)
+        check_layout.addWidget(self.agents_check_button)
+        agents_layout.addLayout(check_layout)
+
+        self.agents_table = QTableWidget(0, 6)
+        self.agents_table.setHorizontalHeaderLabels(["Agent", "Slots", "Running", "Completed", "Failed", "Status"])
+        self.agents_table.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
+        self.agents_table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        agents_layout.addWidget(self.agents_table)
+
+        self.agents_timer = QTimer(self)
+        self.agents_timer.setInterval(1000)
+        self.agents_timer.timeout.connect(self.update_agents_table)
+
+        agents_group.setLayout(agents_layout)
+        tab_widget.addTab(agents_group, "Agents")
+
+    def agents_for(self, settings):
+        # Like the proxy pool, the agent pool lives as long as its definition is unchanged
+        text = settings.get('agents', '').strip() if settings.get('distributed') else ''
+        if text == self.agent_pool_key:
+            return self.agent_pool
+        self.stop_agent_pool()
+        if not text:
+            return None
+        try:
+            entries = parse_agents(text)
+        except ValueError as error:
+            self.output_area.append(f"{error}, the agents are not used.")
+            return None
+
+        self.agent_pool = AgentPool(entries)
+        self.agent_pool_key = text
+        self.agent_checker = AgentChecker(self.agent_pool)
+        self.agent_checker.start()
+        self.agents_table.setRowCount(len(entries))
+        for row, entry in enumerate(entries):
+            for column in range(self.agents_table.columnCount()):
+                self.agents_table.setItem(row, column, QTableWidgetItem())
+        self.agents_timer.start()
+        self.output_area.append(f"Distributing over {len(entries)} agents.")
+        return self.agent_pool
+
+    def stop_agent_pool(self):
+        if self.agent_checker:
+            self.agent_checker.stop()
+        self.agent_pool = None
+        self.agent_pool_key = None
+        self.agent_checker = None
+        self.agents_timer.stop()
+        self.agents_table.setRowCount(0)
+
+    def check_agents(self):
+        if self.agents_for(self.collect_settings()):
+            self.agent_checker.check_now()
+
+    def update_agents_table(self):
+        if self.agent_pool is None:
+            return
+        for message in self.agent_pool.take_events():
+            self.output_area.append(message)
+        for row, entry in enumerate(self.agent_pool.entries):
+            values = [entry.address, str(entry.capacity()), str(entry.active), str(entry.completed),
+                      str(entry.failed), entry.status()]
+            for column, value in enumerate(values):
+                self.agents_table.item(row, column).setText(value)
+
     def create_output_tab(self, tab_widget):
         output_group = QWidget()
         output_layout = QHBoxLayout()
@@ -361,6 +1842,558 @@ class MaigretGUI(QMainWindow):
         output_group.setLayout(output_layout)
         tab_widget.addTab(output_group, "Output")
 
+    def create_health_tab(self, tab_widget):
+        health_group = QWidget()
+        health_layout = QVBoxLayout()
+
+        # Fast-first ordering takes effect on the in-process engine and in how shards are queued,
+        # the maigret CLI always checks a single process's sites in rank order
+        controls_layout = QHBoxLayout()
+        controls_layout.addWidget(QLabel("Site Order:"))
+        self.site_order_combobox = QComboBox()
+        self.site_order_combobox.addItems(["rank", "fast first"])
+        controls_layout.addWidget(self.site_order_combobox)
+
+        controls_layout.addWidget(QLabel(f"Sites with {DEAD_AFTER} timeouts in a row:"))
+        self.dead_sites_combobox = QComboBox()
+        self.dead_sites_combobox.addItems(["check", "check last", "skip"])
+        controls_layout.addWidget(self.dead_sites_combobox)
+
+        self.health_refresh_button = QPushButton("Refresh")
+        self.health_refresh_button.clicked.connect(self.update_health_table)
+        controls_layout.addWidget(self.health_refresh_button)
+
+        self.health_clear_button = QPushButton("Clear History")
+        self.health_clear_button.clicked.connect(self.clear_site_health)
+        controls_layout.addWidget(self.health_clear_button)
+        controls_layout.addStretch()
+        health_layout.addLayout(controls_layout)
+
+        # maigret's CLI prints no timings, so p50 and p95 only ever come from in-process runs
+        latency_note = QLabel("Response times (p50, p95) are only measured on the in-process engine. "
+                              "On CLI runs, fast first orders sites by their timeouts alone.")
+        latency_note.setWordWrap(True)
+        health_layout.addWidget(latency_note)
+
+        self.health_table = QTableWidget(0, 6)
+        self.health_table.setHorizontalHeaderLabels(["Site", "Checks", "p50 (s)", "p95 (s)", "Timeouts", "Errors"])
+        self.health_table.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
+        self.health_table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.health_table.verticalHeader().hide()
+        self.health_table.setSortingEnabled(True)
+        self.health_table.sortByColumn(0, Qt.SortOrder.AscendingOrder)
+        health_layout.addWidget(self.health_table)
+
+        health_group.setLayout(health_layout)
+        tab_widget.addTab(health_group, "Site Health")
+
+    def site_health(self):
+        if self.health is None:
+            self.health = SiteHealthStore()
+        return self.health
+
+    def update_health_table(self):
+        stats = sorted(self.site_health().stats().values(), key=lambda health: health.site.lower())
+        self.health_table.setSortingEnabled(False)
+        self.health_table.setRowCount(len(stats))
+        for row, health in enumerate(stats):
+            values = [
+                health.site + (" (dead)" if health.dead else ""),
+                str(health.checks),
+                "" if health.p50 is None else f"{health.p50:.2f}",
+                "" if health.p95 is None else f"{health.p95:.2f}",
+                f"{health.timeout_rate:.0%}",
+                f"{health.error_rate:.0%}",
+            ]
+            for column, value in enumerate(values):
+                self.health_table.setItem(row, column, QTableWidgetItem(value))
+        self.health_table.setSortingEnabled(True)
+
+    def clear_site_health(self):
+        self.site_health().clear()
+        self.update_health_table()
+        self.output_area.append("Site health history cleared.")
+
+    def order_by_health(self, settings, sites):
+        # Returns the sites to check, in order, and the ones to check after everything else
+        if sites is None:
+            try:
+                sites = night_sites.select_sites(settings)
+            except Exception as error:
+                self.output_area.append(f"Could not load the maigret site database ({error}), sites keep their order.")
+                return None, []
+        stats = self.site_health().stats()
+        fast_first = settings.get('site_order') == 'fast first'
+        if fast_first and not any(health.p50 is not None for health in stats.values()):
+            self.output_area.append("No site has a measured response time yet, these come from runs on the "
+                                    "in-process engine. Fast first orders the sites by their timeouts only.")
+        ordered, last, skipped = order_sites(sites, stats, settings.get('timeout', 30), fast_first,
+                                             settings.get('dead_sites'))
+        if skipped:
+            names = ", ".join(skipped[:10]) + (", ..." if len(skipped) > 10 else "")
+            self.output_area.append(f"Skipping {len(skipped)} sites that timed out on their last {DEAD_AFTER} checks: {names}")
+        if last:
+            self.output_area.append(f"{len(last)} sites that keep timing out are checked last.")
+        return ordered, last
+
+    def create_cache_tab(self, tab_widget):
+        cache_group = QWidget()
+        cache_layout = QVBoxLayout()
+
+        self.incremental_checkbox = QCheckBox("Incremental Scan (only check sites whose cached result expired)")
+        cache_layout.addWidget(self.incremental_checkbox)
+
+        # How long a cached result counts as fresh, per status
+        ttl_layout = QFormLayout()
+        self.ttl_spinboxes = {}
+        for status in STATUSES:
+            spinbox = QSpinBox()
+            spinbox.setRange(0, 24 * 365)
+            spinbox.setSuffix(" h")
+            spinbox.setValue(DEFAULT_TTL[status])
+            ttl_layout.addRow(QLabel(f"{status} valid for:"), spinbox)
+            self.ttl_spinboxes[status] = spinbox
+        cache_layout.addLayout(ttl_layout)
+
+        self.clear_cache_button = QPushButton("Clear Cache")
+        self.clear_cache_button.clicked.connect(self.clear_cache)
+        cache_layout.addWidget(self.clear_cache_button)
+        cache_layout.addStretch()
+
+        cache_group.setLayout(cache_layout)
+        tab_widget.addTab(cache_group, "Cache")
+
+    def result_cache(self):
+        if self.cache is None:
+            self.cache = ResultCache()
+        return self.cache
+
+    def clear_cache(self):
+        self.result_cache().clear()
+        self.output_area.append("Result cache cleared.")
+
+    def plan_cached_sites(self, settings, usernames, notify):
+        # Sites whose cached result is still fresh are answered from the cache instead of checked again
+        try:
+            sites = night_sites.select_sites(settings)
+        except Exception as error:
+            notify(f"Could not load the maigret site database ({error}), running a full scan.")
+            return None, []
+        stale = set()
+        cached = []
+        for username in usernames:
+            user_stale, user_cached = self.result_cache().plan(username, settings['id_type'], sites,
+                                                                settings['cache_ttl'])
+            stale.update(user_stale)
+            cached.extend(user_cached)
+        notify(f"{len(cached)} results served from the cache, {len(stale)} of {len(sites)} sites to check.")
+        return [site for site in sites if site in stale], cached
+
+    def record_results(self, settings, results, notify):
+        # Stores the checks a run made and lists what changed since the previous run
+        by_username = collections.defaultdict(list)
+        for result in results:
+            by_username[result.username].append(result)
+        for username, user_results in by_username.items():
+            changes = self.result_cache().record(username, settings['id_type'], user_results)
+            if changes:
+                notify(f"Changes for {username} since the last run:")
+                for change in changes:
+                    notify(format_change(change))
+
+    def collect_run_results(self, results):
+        self.run_results.update(((result.username, result.site), result) for result in results)
+        if self.run_reports:
+            self.run_reports.add(results)
+        if self.checkpoint:
+            try:
+                self.checkpoint.add(results)
+            except OSError as error:
+                self.output_area.append(f"Checkpoint write failed ({error}), this scan can no longer be resumed.")
+                self.checkpoint = None
+
+    def create_batch_tab(self, tab_widget):
+        batch_group = QWidget()
+        batch_layout = QVBoxLayout()
+
+        batch_layout.addWidget(QLabel("Usernames (one per line or comma-separated):"))
+        self.batch_input = QPlainTextEdit()
+        self.batch_input.setMaximumHeight(100)
+        batch_layout.addWidget(self.batch_input)
+
+        # Pool size and the batch controls share one row
+        controls_layout = QHBoxLayout()
+        self.batch_load_button = QPushButton("Load File")
+        self.batch_load_button.clicked.connect(self.load_batch_file)
+        controls_layout.addWidget(self.batch_load_button)
+
+        controls_layout.addWidget(QLabel("Concurrent Jobs:"))
+        self.batch_pool_spinbox = QSpinBox()
+        self.batch_pool_spinbox.setRange(1, 32)
+        self.batch_pool_spinbox.setValue(default_pool_size())
+        controls_layout.addWidget(self.batch_pool_spinbox)
+
+        self.batch_run_button = QPushButton("Run Batch")
+        self.batch_run_button.clicked.connect(self.run_batch)
+        controls_layout.addWidget(self.batch_run_button)
+
+        self.batch_cancel_button = QPushButton("Cancel All")
+        self.batch_cancel_button.clicked.connect(self.cancel_batch)
+        self.batch_cancel_button.setEnabled(False)
+        controls_layout.addWidget(self.batch_cancel_button)
+        batch_layout.addLayout(controls_layout)
+
+        # Crawling takes maigret's recursion over: usernames and ids found on the accounts of a job
+        # become jobs of their own, scanned in parallel as soon as they turn up
+        crawl_layout = QHBoxLayout()
+        self.crawl_checkbox = QCheckBox("Crawl extracted identities (breadth-first)")
+        crawl_layout.addWidget(self.crawl_checkbox)
+
+        crawl_layout.addWidget(QLabel("Max Depth:"))
+        self.crawl_depth_spinbox = QSpinBox()
+        self.crawl_depth_spinbox.setRange(1, 10)
+        self.crawl_depth_spinbox.setValue(2)
+        crawl_layout.addWidget(self.crawl_depth_spinbox)
+
+        crawl_layout.addWidget(QLabel("Budget:"))
+        self.crawl_budget_spinbox = QSpinBox()
+        self.crawl_budget_spinbox.setRange(1, 10000)
+        self.crawl_budget_spinbox.setValue(50)
+        self.crawl_budget_spinbox.setToolTip("Most new identities one batch queues, the ones it was started with aside")
+        crawl_layout.addWidget(self.crawl_budget_spinbox)
+
+        crawl_layout.addWidget(QLabel("Skip Visited Within (days):"))
+        self.crawl_revisit_spinbox = QSpinBox()
+        self.crawl_revisit_spinbox.setRange(0, 3650)
+        self.crawl_revisit_spinbox.setValue(30)
+        self.crawl_revisit_spinbox.setToolTip("Identities an earlier crawl scanned this recently are not scanned again, 0 scans them")
+        crawl_layout.addWidget(self.crawl_revisit_spinbox)
+
+        self.crawl_clear_button = QPushButton("Clear Visited")
+        self.crawl_clear_button.clicked.connect(self.clear_visited)
+        crawl_layout.addWidget(self.crawl_clear_button)
+        batch_layout.addLayout(crawl_layout)
+
+        self.batch_connections_label = QLabel()
+        batch_layout.addWidget(self.batch_connections_label)
+
+        # One row per job, selecting a row shows that job's output below
+        self.batch_table = QTableWidget(0, 8)
+        self.batch_table.setHorizontalHeaderLabels(["Username", "Status", "Progress", "Connections", "Lines", "Found", "Proxy", ""])
+        self.batch_table.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
+        self.batch_table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        self.batch_table.setSelectionMode(QAbstractItemView.SelectionMode.SingleSelection)
+        self.batch_table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.batch_table.itemSelectionChanged.connect(self.show_batch_job_output)
+        batch_layout.addWidget(self.batch_table)
+
+        batch_group.setLayout(batch_layout)
+        tab_widget.addTab(batch_group, "Batch")
+
+    def load_batch_file(self):
+        file_path, _ = QFileDialog.getOpenFileName(self, "Load Usernames", "", "Text Files (*.txt);;All Files (*)")
+
+        if file_path:
+            try:
+                with open(file_path, 'r', errors='replace') as usernames_file:
+                    self.batch_input.setPlainText(usernames_file.read())
+            except OSError as error:
+                self.output_area.append(f"Could not read {file_path}: {error}")
+
+    def run_batch(self):
+        usernames = split_usernames(self.batch_input.toPlainText())
+        if not usernames:
+            self.output_area.append("No usernames to run.")
+            return
+
+        settings = self.collect_settings()
+        # The username field plays no part in a batch, the jobs bring their own
+        scan = is_scan(dict(settings, username=usernames[0]))
+        crawl = None
+        if settings['crawl'] and scan:
+            crawl = self.start_crawl(settings)
+            # The crawl follows the extracted identities itself, maigret following them too would scan them twice
+            settings['no_recursion'] = True
+        planner = None
+        if settings['incremental'] and scan:
+            planner = lambda settings, username, notify: self.plan_cached_sites(settings, [username], notify)
+        self.start_batch_queue(BatchQueue(settings, self.batch_pool_spinbox.value(), self.search_engine(settings),
+                                          planner, self.record_batch_job if scan else None,
+                                          self.connection_controller(settings), self.pool_for(settings),
+                                          self.agents_for(settings), crawl),
+                               usernames, f"batch of {len(usernames)}")
+
+    def start_batch_queue(self, batch_queue, usernames, label):
+        self.batch_queue = batch_queue
+        self.batch_reports = ReportStreams(batch_queue.settings, self.output_area.append, self.renderers)
+        if batch_queue.recorder:
+            self.batch_queue.results_signal.connect(self.batch_reports.add)
+        self.batch_queue.job_added.connect(self.add_batch_row)
+        self.batch_queue.job_changed.connect(self.update_batch_row)
+        self.batch_queue.output_signal.connect(self.update_batch_output)
+        self.batch_metrics = RunMetrics(label, "batch")
+        self.batch_queue.results_signal.connect(
+            lambda results: self.add_results(results, self.batch_metrics, self.batch_queue.timed))
+        self.batch_queue.metrics_signal.connect(self.add_metrics)
+        self.batch_queue.finished_signal.connect(self.on_batch_finished)
+
+        self.batch_table.setRowCount(0)
+        self.batch_connections_label.setText("")
+        self.clear_results()
+        for username in usernames:
+            self.batch_queue.add(username)
+
+        self.batch_run_button.setEnabled(False)
+        self.batch_cancel_button.setEnabled(True)
+        self.batch_queue.start()
+
+    def start_crawl(self, settings):
+        if self.visited is None:
+            self.visited = VisitedStore()
+        try:
+            # Profile links are matched against the site database, without it only the ids maigret printed are followed
+            database = night_sites.load_database()
+        except Exception as error:
+            self.output_area.append(f"Site database not available ({error}), profile links will not be followed.")
+            database = None
+        return Crawl(settings['crawl_depth'], settings['crawl_budget'], self.visited,
+                     settings['crawl_revisit_days'], database)
+
+    def clear_visited(self):
+        if self.visited is None:
+            self.visited = VisitedStore()
+        count = self.visited.count()
+        self.visited.clear()
+        self.output_area.append(f"Forgot {count} visited identities.")
+
+    def add_batch_row(self, job):
+        # Seeds are added by run_batch, crawled identities while the batch runs
+        label = job.username
+        if job.depth:
+            label = f"{job.username} ({job.id_type}, depth {job.depth}, from {job.parent})"
+        job.row = self.batch_table.rowCount()
+        self.batch_table.insertRow(job.row)
+        self.batch_table.setItem(job.row, 0, QTableWidgetItem(label))
+        for column in (1, 3, 4, 5, 6):
+            self.batch_table.setItem(job.row, column, QTableWidgetItem())
+        progress = QProgressBar()
+        progress.setRange(0, 1)
+        progress.setValue(0)
+        self.batch_table.setCellWidget(job.row, 2, progress)
+        cancel_button = QPushButton("Cancel")
+        cancel_button.clicked.connect(lambda checked=False, job=job: self.batch_queue.cancel(job))
+        self.batch_table.setCellWidget(job.row, 7, cancel_button)
+        self.update_batch_row(job)
+
+    def record_batch_job(self, job, notify):
+        settings = self.batch_queue.settings_for(job)
+        self.record_results(settings, job.results.values(), notify)
+        self.site_health().record(job.results.values(), timed=isinstance(job.worker, EngineWorker))
+        self.batch_reports.close(job.username, job.status == "Done", settings, notify)
+
+    def update_batch_row(self, job):
+        self.batch_table.item(job.row, 1).setText(job.status)
+        controller = self.batch_queue.controller
+        if controller:
+            self.batch_connections_label.setText(controller.summary())
+        self.batch_table.item(job.row, 3).setText(str(job.max_connections or ""))
+        self.batch_table.item(job.row, 6).setText(job.proxy_url)
+        self.update_batch_output(job, [])
+
+        progress = self.batch_table.cellWidget(job.row, 2)
+        if job.status == "Running":
+            progress.setRange(0, 0)  # Busy indicator until the job finishes
+        else:
+            progress.setRange(0, 1)
+            progress.setValue(0 if job.status == "Pending" else 1)
+        self.batch_table.cellWidget(job.row, 7).setEnabled(job.status in ("Pending", "Running"))
+
+        if job.status == "Running" and self.batch_table.currentRow() == job.row:
+            self.output_area.show_log(job.log_model)
+
+    def update_batch_output(self, job, lines):
+        self.batch_table.item(job.row, 4).setText(str(len(job.log_model.spool)) if job.log_model else "")
+        self.batch_table.item(job.row, 5).setText(str(len(job.found_sites)))
+
+    def show_batch_job_output(self):
+        row = self.batch_table.currentRow()
+        if self.batch_queue and 0 <= row < len(self.batch_queue.jobs):
+            job = self.batch_queue.jobs[row]
+            if job.log_model:
+                self.output_area.show_log(job.log_model)
+
+    def cancel_batch(self):
+        if self.batch_queue:
+            self.batch_queue.cancel_all()
+
+    def on_batch_finished(self):
+        self.batch_reports.close(render=False)  # Jobs that never finished
+        self.batch_metrics.finish()
+        self.add_metrics(self.batch_metrics)
+        if self.batch_queue.controller:
+            self.output_area.append(self.batch_queue.controller.summary())
+        if self.batch_queue.crawl:
+            self.output_area.append(self.batch_queue.crawl.summary())
+        self.batch_run_button.setEnabled(True)
+        self.batch_cancel_button.setEnabled(False)
+        if self.permutation_plan:
+            self.output_area.append(self.permutation_plan.summary())
+            self.permutation_plan = None
+            self.run_button.setEnabled(True)
+            self.stop_button.setEnabled(False)
+
+    def create_results_tab(self, tab_widget):
+        results_group = QWidget()
+        results_layout = QVBoxLayout()
+
+        # Filters and counters sit above the table
+        filter_layout = QHBoxLayout()
+        filter_layout.addWidget(QLabel("Status:"))
+        self.status_filter_combobox = QComboBox()
+        self.status_filter_combobox.addItems(["All"] + list(STATUSES))
+        self.status_filter_combobox.currentTextChanged.connect(self.apply_results_filter)
+        filter_layout.addWidget(self.status_filter_combobox)
+
+        filter_layout.addWidget(QLabel("Tag:"))
+        self.tag_filter_combobox = QComboBox()
+        self.tag_filter_combobox.addItem("All")
+        self.tag_filter_combobox.currentTextChanged.connect(self.apply_results_filter)
+        filter_layout.addWidget(self.tag_filter_combobox)
+
+        self.results_counter_label = QLabel()
+        filter_layout.addWidget(self.results_counter_label)
+        filter_layout.addStretch()
+        results_layout.addLayout(filter_layout)
+
+        self.results_model = ResultTableModel()
+        self.known_tags = set()
+        self.results_table = QTableView()
+        self.results_table.setModel(self.results_model)
+        self.results_table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        self.results_table.verticalHeader().hide()
+        self.results_table.verticalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
+        self.results_table.horizontalHeader().setStretchLastSection(True)
+        results_layout.addWidget(self.results_table)
+        self.update_results_counters()
+
+        results_group.setLayout(results_layout)
+        tab_widget.addTab(results_group, "Results")
+
+    def results_for(self, username):
+        return [result for result in self.results_model.results if result.username == username]
+
+    def clear_results(self):
+        self.results_model.clear()
+        self.known_tags = set()
+        self.tag_filter_combobox.blockSignals(True)
+        self.tag_filter_combobox.clear()
+        self.tag_filter_combobox.addItem("All")
+        self.tag_filter_combobox.blockSignals(False)
+        self.apply_results_filter()
+
+    def add_results(self, results, metrics=None, timed=False):
+        started = time.perf_counter()
+        self.results_model.add_results(results)
+        for result in results:
+            for tag in night_sites.site_tags(result.site):
+                if tag not in self.known_tags:
+                    self.known_tags.add(tag)
+                    self.tag_filter_combobox.addItem(tag)
+        self.update_results_counters()
+        if metrics:
+            metrics.observe_results(results, timed)
+            metrics.observe_ui(time.perf_counter() - started)
+
+    def add_run_results(self, results):
+        self.add_results(results, self.run_metrics, self.run_timed)
+
+    def create_performance_tab(self, tab_widget):
+        performance_group = QWidget()
+        performance_layout = QVBoxLayout()
+
+        # Runs, batches, and the processes, shards and jobs inside them, newest last
+        self.performance_table = QTableWidget(0, 12)
+        self.performance_table.setHorizontalHeaderLabels([
+            "Run", "Kind", "Duration (s)", "Spawn (ms)", "First Result (s)", "Lines", "Lines/s", "Results",
+            "Site p50/p95 (s)", "Peak RSS (MB)", "UI (ms)", "Max UI (ms)",
+        ])
+        self.performance_table.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
+        self.performance_table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.performance_table.verticalHeader().hide()
+        performance_layout.addWidget(self.performance_table)
+
+        buttons_layout = QHBoxLayout()
+        self.export_json_button = QPushButton("Export JSON")
+        self.export_json_button.clicked.connect(self.export_metrics_json)
+        buttons_layout.addWidget(self.export_json_button)
+        self.export_prometheus_button = QPushButton("Export Prometheus")
+        self.export_prometheus_button.clicked.connect(self.export_metrics_prometheus)
+        buttons_layout.addWidget(self.export_prometheus_button)
+        self.clear_metrics_button = QPushButton("Clear")
+        self.clear_metrics_button.clicked.connect(self.clear_metrics)
+        buttons_layout.addWidget(self.clear_metrics_button)
+        buttons_layout.addStretch()
+        performance_layout.addLayout(buttons_layout)
+
+        performance_group.setLayout(performance_layout)
+        tab_widget.addTab(performance_group, "Performance")
+
+    def add_metrics(self, metrics):
+        if len(self.metrics_history) == self.metrics_history.maxlen:
+            self.performance_table.removeRow(0)
+        self.metrics_history.append(metrics)
+
+        entry = metrics.as_dict()
+        def seconds(value, scale=1, digits=2):
+            return "" if value is None else f"{value * scale:.{digits}f}"
+        p50, p95 = entry['site_time_p50_seconds'], entry['site_time_p95_seconds']
+        rss = entry['peak_rss_bytes'] or entry['gui_peak_rss_bytes']
+        values = [
+            entry['label'],
+            entry['kind'],
+            seconds(entry['duration_seconds']),
+            seconds(entry['spawn_seconds'], 1000, 0),
+            seconds(entry['first_result_seconds']),
+            str(entry['lines']),
+            f"{entry['lines_per_second']:.0f}",
+            str(entry['results']),
+            "" if p50 is None else f"{p50:.2f} / {p95:.2f}" + ("" if entry['site_times_are_response_times'] else " (arrival)"),
+            seconds(rss, 1 / 2 ** 20, 1),
+            seconds(entry['ui_seconds'], 1000, 0),
+            seconds(entry['ui_max_seconds'], 1000, 1),
+        ]
+        row = self.performance_table.rowCount()
+        self.performance_table.insertRow(row)
+        for column, value in enumerate(values):
+            self.performance_table.setItem(row, column, QTableWidgetItem(value))
+
+    def export_metrics_json(self):
+        file_path, _ = QFileDialog.getSaveFileName(self, "Export Metrics", "", "JSON Files (*.json);;All Files (*)")
+        if file_path:
+            write_json(file_path, self.metrics_history)
+            self.output_area.append(f"Metrics of {len(self.metrics_history)} runs saved to {file_path}.")
+
+    def export_metrics_prometheus(self):
+        file_path, _ = QFileDialog.getSaveFileName(self, "Export Metrics", "", "Prometheus Text (*.prom);;All Files (*)")
+        if file_path:
+            write_prometheus(file_path, self.metrics_history)
+            self.output_area.append(f"Metrics of {len(self.metrics_history)} runs saved to {file_path}.")
+
+    def clear_metrics(self):
+        self.metrics_history.clear()
+        self.performance_table.setRowCount(0)
+
+    def apply_results_filter(self):
+        status = self.status_filter_combobox.currentText()
+        tag = self.tag_filter_combobox.currentText()
+        self.results_model.set_filter(None if status == "All" else status, None if tag in ("All", "") else tag)
+        self.update_results_counters()
+
+    def update_results_counters(self):
+        counts = self.results_model.counts()
+        text = " | ".join(f"{status}: {counts[status]}" for status in STATUSES)
+        self.results_counter_label.setText(f"{text} | Shown: {self.results_model.rowCount()}")
+
     def create_buttons(self, layout):
         button_layout = QHBoxLayout()
         self.run_button = QPushButton("Run Maigret")
@@ -372,100 +2405,330 @@ class MaigretGUI(QMainWindow):
         self.stop_button.setEnabled(False)
         button_layout.addWidget(self.stop_button)
 
+        self.resume_button = QPushButton("Resume")
+        self.resume_button.clicked.connect(self.resume_scan)
+        self.resume_button.setEnabled(latest_checkpoint() is not None)
+        button_layout.addWidget(self.resume_button)
+
         layout.addLayout(button_layout)
 
-        self.output_area = QTextEdit()
-        self.output_area.setReadOnly(True)
+        # The filter searches an index of the log, so it answers at once even while a scan streams
+        filter_layout = QHBoxLayout()
+        filter_layout.addWidget(QLabel("Filter:"))
+        self.log_filter_input = QLineEdit()
+        self.log_filter_input.setPlaceholderText("site or text, status:found, /regex/")
+        self.log_filter_input.setClearButtonEnabled(True)
+        filter_layout.addWidget(self.log_filter_input)
+
+        self.log_filter_scope = QComboBox()
+        self.log_filter_scope.addItems(["This Log", "All Logs"])
+        filter_layout.addWidget(self.log_filter_scope)
+
+        self.log_filter_only_checkbox = QCheckBox("Only Matching")
+        self.log_filter_only_checkbox.setChecked(True)
+        filter_layout.addWidget(self.log_filter_only_checkbox)
+
+        self.log_filter_label = QLabel()
+        filter_layout.addWidget(self.log_filter_label)
+        layout.addLayout(filter_layout)
+
+        self.output_area = LogView()
+        self.output_area.matches_changed.connect(self.show_log_matches)
+        self.output_area.line_requested.connect(self.show_log_line)
         layout.addWidget(self.output_area)
 
+        # Typing restarts the timer, the filter runs once the typing pauses
+        self.log_filter_timer = QTimer(self)
+        self.log_filter_timer.setSingleShot(True)
+        self.log_filter_timer.setInterval(150)
+        self.log_filter_timer.timeout.connect(self.apply_log_filter)
+        self.log_filter_input.textChanged.connect(self.log_filter_timer.start)
+        self.log_filter_input.returnPressed.connect(self.output_area.next_match)
+        self.log_filter_scope.currentTextChanged.connect(self.apply_log_filter)
+        self.log_filter_only_checkbox.toggled.connect(self.apply_log_filter)
+        self.log_library = LogLibrary()
+        self.log_indexer = None
+
     def run_maigret(self):
         # Clear the output area before starting a new search
         self.output_area.clear()
+        self.clear_results()
+
+        settings = self.collect_settings()
+        if plans_permutations(settings):
+            self.run_permutations(settings)
+            return
+        sites = None
+        cached = []
+        if settings['incremental'] and is_scan(settings):
+            sites, cached = self.plan_cached_sites(settings, settings['username'].split(), self.output_area.append)
+            self.add_results(cached)
+        self.start_run(settings, sites, cached=cached)
+
+    def run_permutations(self, settings):
+        # Instead of `maigret --permute`, every variant is a job of the batch queue, likeliest first
+        if self.batch_queue and not self.batch_run_button.isEnabled():
+            self.output_area.append("A batch is running, permuted searches run on the batch queue once it is done.")
+            return
+        try:
+            sites = night_sites.select_sites(settings)
+        except Exception as error:
+            self.output_area.append(f"Could not load the maigret site database ({error}), maigret permutes the usernames.")
+            self.start_run(settings)
+            return
+
+        variants = rank_variants(generate_variants(settings['username'].split()), self.permutations().rates())
+        if settings.get('permute_max_variants'):
+            variants = variants[:settings['permute_max_variants']]
+        self.permutation_plan = plan = PermutationPlan(sites, variants, settings['permute_stop_after'])
+        self.output_area.append(
+            f"Searching {len(variants)} variants on {len(sites)} sites, likeliest first, {settings['batch_pool_size']} "
+            f"at a time. A site is dropped once {plan.stop_after} of them hit there. Progress is on the Batch tab."
+        )
+        job_settings = dict(settings, permute=False)
+        batch_queue = BatchQueue(job_settings, settings['batch_pool_size'], self.search_engine(settings),
+                                 lambda settings, username, notify: (plan.sites_for(username), []),
+                                 self.record_permutation_job, self.connection_controller(settings),
+                                 self.pool_for(settings), self.agents_for(settings))
+        # Hits count as soon as they arrive, so the variants starting next already skip those sites
+        batch_queue.results_signal.connect(plan.observe)
+        self.start_batch_queue(batch_queue, [variant.username for variant in variants],
+                               f"permutations of {settings['username']}")
+        self.run_button.setEnabled(False)
+        self.stop_button.setEnabled(True)
 
-        # Construct the command for running Maigret
-        command = f"maigret {self.username_input.text()}"
-
-        # Add additional flags for settings
-        command += f" --timeout {self.timeout_spinbox.value()}"
-        command += f" --retries {self.retries_spinbox.value()}"
-        command += f" --max-connections {self.max_connections_spinbox.value()}"
-        if self.no_recursion_checkbox.isChecked():
-            command += " --no-recursion"
-        if self.no_extracting_checkbox.isChecked():
-            command += " --no-extracting"
-        command += f" --id-type {self.id_type_combobox.currentText()}"
-        if self.permute_checkbox.isChecked():
-            command += " --permute"
-        if self.proxy_input.text():
-            command += f" --proxy {self.proxy_input.text()}"
-        if self.tor_proxy_input.text():
-            command += f" --tor-proxy {self.tor_proxy_input.text()}"
-        if self.i2p_proxy_input.text():
-            command += f" --i2p-proxy {self.i2p_proxy_input.text()}"
-        if self.all_sites_checkbox.isChecked():
-            command += " --all-sites"
-        if self.top_sites_checkbox.isChecked():
-            command += f" --top-sites {self.top_sites_input.value()}"
-        if self.tags_input.text():
-            command += f" --tags {self.tags_input.text()}"
-        if self.site_input.text():
-            command += f" --site {self.site_input.text()}"
-        if self.use_disabled_sites_checkbox.isChecked():
-            command += " --use-disabled-sites"
-        
-        # Add more specific URLs
-        if self.parse_url_input.text():
-            command += f" --parse {self.parse_url_input.text()}"
-        if self.submit_url_input.text():
-            command += f" --submit {self.submit_url_input.text()}"
-        if self.self_check_checkbox.isChecked():
-            command += " --self-check"
-        if self.stats_checkbox.isChecked():
-            command += " --stats"
-        
-        # Output file options
-        if self.csv_checkbox.isChecked():
-            command += " --csv"
-        if self.pdf_checkbox.isChecked():
-            command += " --pdf"
-        if self.txt_checkbox.isChecked():
-            command += " --txt"
-        if self.html_checkbox.isChecked():
-            command += " --html"
-        
-        # Add report sorting if checkbox is checked
-        if self.report_sorting_checkbox.isChecked():
-            command += f" --reports-sorting {self.report_sorting_combobox.currentText()}"
-
-        # New flags for the additional options
-        if self.print_not_found_checkbox.isChecked():
-            command += " --print-not-found"
-        if self.print_errors_checkbox.isChecked():
-            command += " --print-errors"
-        if self.verbose_checkbox.isChecked():
-            command += " --verbose"
-        if self.info_checkbox.isChecked():
-            command += " --info"
-        if self.debug_checkbox.isChecked():
-            command += " --debug"
-        
-        self.output_area.append(f"Running command: {command}")
+    def record_permutation_job(self, job, notify):
+        self.record_batch_job(job, notify)
+        if job.status == "Done" and job.results:
+            # Only finished variants teach the ranking, a cancelled one did not get the chance to hit
+            variant = self.permutation_plan.variants[job.username]
+            self.permutations().record(variant, len(job.results), len(job.found_sites))
+
+    def permutations(self):
+        if self.permutation_stats is None:
+            self.permutation_stats = PermutationStats()
+        return self.permutation_stats
+
+    def clear_permutation_stats(self):
+        self.permutations().clear()
+        self.output_area.append("Permutation statistics cleared.")
+
+    def resume_scan(self):
+        path = latest_checkpoint()
+        if path is None:
+            self.output_area.append("No interrupted scan to resume.")
+            self.resume_button.setEnabled(False)
+            return
+        try:
+            checkpoint = Checkpoint.open(path)
+        except (OSError, ValueError, KeyError) as error:
+            self.output_area.append(f"Could not read the checkpoint {path}: {error}")
+            return
+
+        settings = checkpoint.settings
+        sites = checkpoint.sites
+        if sites is None:
+            try:
+                sites = night_sites.select_sites(settings)
+            except Exception as error:
+                self.output_area.append(f"Could not load the maigret site database ({error}), the scan cannot be resumed.")
+                checkpoint.close()
+                return
+
+        remaining = checkpoint.remaining(sites)
+        self.output_area.clear()
+        self.clear_results()
+        started = time.strftime('%Y-%m-%d %H:%M', time.localtime(checkpoint.started))
+        self.output_area.append(
+            f"Resuming the scan of {settings['username']} started {started}: "
+            f"{len(sites) - len(remaining)} of {len(sites)} sites already checked."
+        )
+        self.add_results(list(checkpoint.results.values()))
+        self.start_run(settings, remaining, checkpoint)
+
+    def start_run(self, settings, sites=None, checkpoint=None, cached=()):
+        self.run_settings = settings
+        self.run_metrics = RunMetrics(settings.get('username') or "maigret", "run")
+        self.run_results = {}
+        # Reports are written here as the results arrive, resumed and incremental scans start them
+        # with the results they already have
+        self.run_reports = ReportStreams(settings, self.output_area.append, self.renderers) if is_scan(settings) else None
+        if self.run_reports:
+            self.run_reports.add(list(checkpoint.results.values()) if checkpoint else list(cached))
+        self.checkpoint = checkpoint
+        if checkpoint is None and is_scan(settings):
+            try:
+                self.checkpoint = Checkpoint.create(settings, sites)
+                self.checkpoint.add(cached)
+            except OSError as error:
+                self.output_area.append(f"Could not create a checkpoint ({error}), this scan cannot be resumed.")
+
+        if sites == []:
+            self.on_maigret_finished()
+            return
+
+        last = []
+        if is_scan(settings) and (settings.get('site_order', 'rank') != 'rank'
+                                  or settings.get('dead_sites', 'check') != 'check'):
+            sites, last = self.order_by_health(settings, sites)
+        if (settings.get('shards', 1) > 1 or self.agents_for(settings)) and is_scan(settings):
+            self.run_sharded(settings, sites, last)
+        else:
+            self.run_single(settings, None if sites is None else sites + last)
+
+    def run_single(self, settings, sites=None):
+        # Run Maigret in a separate thread, or on the in-process engine if it is selected
+        overrides = {}
+        if is_scan(settings):
+            # Every check is printed so the checkpoint knows which sites are done, the view hides the extra lines
+            overrides['track_all'] = True
+        if sites is not None:
+            overrides['sites'] = sites
+        if self.run_reports:
+            overrides['reports'] = False
+        pool = self.pool_for(settings) if is_scan(settings) else None
+        if pool:
+            self.run_pool = pool
+            self.run_proxy = pool.acquire()
+            if self.run_proxy is None:
+                self.output_area.append("No proxy of the pool is available for this run.")
+                self.on_maigret_finished(completed=False)
+                return
+            overrides['proxy'] = self.run_proxy.url
+        self.worker = make_worker(settings, self.search_engine(settings),
+                                  hidden_statuses(settings) if is_scan(settings) else (), **overrides)
+        self.run_timed = isinstance(self.worker, EngineWorker)
+        self.output_area.append(self.worker.description())
 
-        # Run the Maigret command in a separate thread
-        self.worker = MaigretWorker(command)
         self.worker.output_signal.connect(self.append_output)
-        self.worker.finished_signal.connect(self.on_maigret_finished)  # Connect to the finished signal
+        self.worker.metrics.label = settings.get('username') or "maigret"
+        self.worker.results_signal.connect(self.add_run_results)
+        if is_scan(settings):
+            self.worker.results_signal.connect(self.collect_run_results)
+        if self.run_proxy:
+            self.worker.results_signal.connect(lambda results, proxy=self.run_proxy: pool.report(proxy, results))
+        self.worker.stats_signal.connect(self.show_output_stats)
+        self.worker.finished_signal.connect(self.on_single_finished)  # Connect to the finished signal
         self.worker.start()
 
         self.run_button.setEnabled(False)
+        self.resume_button.setEnabled(False)
+        self.stop_button.setEnabled(True)
+
+    def connection_controller(self, settings):
+        if not settings.get('adaptive_connections'):
+            return None
+        return ConcurrencyController(settings.get('max_connections', 10), settings.get('min_connections', 2),
+                                     settings.get('max_connections_limit', 50))
+
+    def search_engine(self, settings):
+        # The engine is loaded on first use and then kept warm for every later run
+        if settings.get('engine') != 'in-process':
+            return None
+        if not night_engine.can_run(settings):
+            self.output_area.append("These options need the maigret CLI, running it as a subprocess.")
+            return None
+        if self.engine is None:
+            engine = night_engine.SearchEngine()
+            try:
+                engine.start()
+            except Exception as error:
+                self.output_area.append(f"In-process engine unavailable ({error}), using the maigret CLI.")
+                return None
+            self.engine = engine
+        return self.engine
+
+    def run_sharded(self, settings, sites=None, last=()):
+        if sites is None:
+            try:
+                sites = night_sites.select_sites(settings)
+            except Exception as error:
+                self.output_area.append(f"Could not load the maigret site database ({error}), running unsharded.")
+                self.run_single(settings)
+                return
+
+        shard_count = settings['shards']
+        agent_pool = self.agents_for(settings)
+        if agent_pool:
+            # Every agent gets at least one shard
+            shard_count = max(shard_count, len(agent_pool.alive()))
+        self.output_area.append(f"Running a sharded scan of {len(sites) + len(last)} sites in {shard_count} shards.")
+        self.run_timed = False
+        self.shard_scan = ShardScan(settings, sites, shard_count,
+                                    controller=self.connection_controller(settings),
+                                    proxy_pool=self.pool_for(settings), agent_pool=agent_pool)
+        if last:
+            # Queued behind the others, it only starts once a shard slot frees up
+            self.shard_scan.add_shard(list(last))
+        self.shard_scan.output_signal.connect(self.append_output)
+        self.shard_scan.results_signal.connect(self.add_run_results)
+        self.shard_scan.metrics_signal.connect(self.add_metrics)
+        self.shard_scan.results_signal.connect(self.collect_run_results)
+        self.shard_scan.message_signal.connect(self.output_area.append)
+        self.shard_scan.finished_signal.connect(self.on_sharded_finished)
+        self.shard_scan.start()
+
+        self.run_button.setEnabled(False)
+        self.resume_button.setEnabled(False)
         self.stop_button.setEnabled(True)
 
-    def on_maigret_finished(self):
+    def on_sharded_finished(self):
+        scan = self.shard_scan
+        if scan is None:
+            return
+        found = sum(1 for result in scan.results.values() if result.status == CLAIMED)
+        self.output_area.append(
+            f"Sharded scan finished: {len(scan.results)} sites checked, {found} accounts found, "
+            f"{scan.rebalances} rebalances, {scan.retries} retries."
+        )
+        if scan.controller:
+            self.output_area.append(scan.controller.summary())
+        self.shard_scan = None
+        self.on_maigret_finished(completed=not scan.cancelled)
+
+    def on_single_finished(self):
+        if self.worker is not None:
+            self.add_metrics(self.worker.metrics)
+        completed = self.worker is not None and self.worker.returncode == 0
+        self.on_maigret_finished(completed)
+
+    def on_maigret_finished(self, completed=True):
+        if self.run_metrics:
+            self.run_metrics.finish()
+            self.add_metrics(self.run_metrics)
+            self.run_metrics = None
+        if self.run_proxy:
+            self.run_pool.release(self.run_proxy)
+            self.run_proxy = None
+        if self.run_reports:
+            # An interrupted scan keeps what its streams hold, HTML and PDF are only rendered for a finished one
+            self.run_reports.close(render=completed)
+            self.run_reports = None
+        if self.run_results:
+            self.record_results(self.run_settings, self.run_results.values(), self.output_area.append)
+            self.site_health().record(self.run_results.values(), timed=self.run_timed)
+            self.run_results = {}
+        if self.checkpoint:
+            # A finished scan needs no checkpoint, an interrupted one keeps it for Resume
+            if completed:
+                self.checkpoint.discard()
+            else:
+                self.checkpoint.close()
+                self.output_area.append(f"Scan interrupted, {len(self.checkpoint.results)} results are checkpointed. "
+                                        "Use Resume to continue it.")
+            self.checkpoint = None
+        self.resume_button.setEnabled(latest_checkpoint() is not None)
         # Disable the stop button when Maigret finishes
         self.stop_button.setEnabled(False)
         self.run_button.setEnabled(True)  # Re-enable the run button
 
     def stop_maigret(self):
+        if self.permutation_plan and self.batch_queue:
+            self.batch_queue.cancel_all()
+            self.output_area.append("Permuted search cancelled.")
+        if self.shard_scan:
+            self.shard_scan.cancel()
+            self.output_area.append("Sharded scan terminated.")
         if self.worker:
             self.worker.terminate()
             self.worker = None
@@ -474,8 +2737,115 @@ class MaigretGUI(QMainWindow):
         self.run_button.setEnabled(True)
         self.stop_button.setEnabled(False)
 
-    def append_output(self, text):
-        self.output_area.append(text)
+    def apply_log_filter(self):
+        self.log_filter_timer.stop()
+        try:
+            query = LogQuery(self.log_filter_input.text())
+        except ValueError as error:
+            self.log_filter_label.setText(str(error))
+            return
+        history = ()
+        if query and self.log_filter_scope.currentText() == "All Logs":
+            self.index_logs()
+            history = self.log_library.search(query, exclude=self.live_logs())
+        started = time.perf_counter()
+        self.output_area.set_filter(query, self.log_filter_only_checkbox.isChecked(), history)
+        if query:
+            self.log_filter_label.setText(self.log_filter_label.text() + f" in {(time.perf_counter() - started) * 1000:.1f} ms")
+
+    def index_logs(self):
+        # Logs finished since the last search are indexed in the background, the filter is applied
+        # again once they are in
+        if self.log_indexer and self.log_indexer.isRunning():
+            return
+        self.log_indexer = LogIndexer(self.log_library, self.live_logs())
+        self.log_indexer.finished.connect(lambda: self.log_indexer.changed and self.apply_log_filter())
+        self.log_indexer.start()
+
+    def live_logs(self):
+        # The log in view and those of the batch jobs still writing theirs, the library leaves them alone
+        paths = {self.output_area.log_path()}
+        if self.batch_queue:
+            paths.update(job.log_model.spool.path for job in self.batch_queue.jobs
+                         if job.log_model and job.log_model.spool.writable)
+        return paths
+
+    def show_log_matches(self, count):
+        if count < 0:
+            self.log_filter_label.setText("")
+        else:
+            indexing = " (indexing logs...)" if self.log_indexer and self.log_indexer.isRunning() else ""
+            self.log_filter_label.setText(f"{count} matching lines{indexing}")
+
+    def show_log_line(self, spool, number):
+        # A filtered line opens in its full log, with the filter highlighting instead of hiding
+        if spool is not self.output_area.log_model.spool:
+            self.output_area.open_log(spool.path)
+        self.log_filter_only_checkbox.setChecked(False)
+        self.output_area.scroll_to_line(number)
+
+    def append_output(self, lines):
+        # Insert the whole chunk in one go instead of one append per line
+        started = time.perf_counter()
+        self.output_area.append_lines(lines)
+        if self.run_metrics:
+            self.run_metrics.observe_lines(len(lines))
+            self.run_metrics.observe_ui(time.perf_counter() - started)
+
+    def show_output_stats(self, stats):
+        self.output_area.append(
+            f"Output: {stats['lines']} lines in {stats['batches']} updates "
+            f"({stats['merged']} merged, {stats['dropped']} dropped)."
+        )
+
+    def stop_workers(self):
+        # Stops every search still running, as Stop and Cancel All would, and waits for their threads.
+        # What they printed before is then handed to the checkpoint and the report streams, and the
+        # finished handlers close both as for an interrupted scan.
+        workers = [self.worker] if self.worker else []
+        if self.shard_scan:
+            workers += [shard.worker for shard in self.shard_scan.running]
+            self.shard_scan.cancel()
+        if self.batch_queue:
+            workers += [job.worker for job in self.batch_queue.running]
+            self.batch_queue.cancel_all()
+        if self.worker:
+            self.worker.terminate()
+        for worker in workers:
+            if isinstance(worker, EngineWorker):
+                # Its future is cancelled, the last drain delivers the rest and finishes it
+                if worker.timer.isActive():
+                    worker.drain()
+            else:
+                worker.wait()
+        QApplication.processEvents()
+
+    def closeEvent(self, event):
+        self.stop_workers()
+        if self.engine:
+            self.engine.stop()
+        for reports in (self.run_reports, self.batch_reports):
+            if reports:
+                reports.close(render=False)
+        for renderer in list(self.renderers):
+            renderer.wait()
+        if self.log_indexer:
+            self.log_indexer.wait()
+        if self.cache:
+            self.cache.close()
+        if self.health:
+            self.health.close()
+        if self.visited:
+            self.visited.close()
+        if self.permutation_stats:
+            self.permutation_stats.close()
+        if self.checkpoint:
+            self.checkpoint.close()
+        self.stop_proxy_pool()
+        self.stop_agent_pool()
+        if self.output_area.owned:
+            self.output_area.log_model.spool.discard_if_empty()
+        super().closeEvent(event)
 
 if __name__ == "__main__":
     app = QApplication(sys.argv)
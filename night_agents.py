@@ -0,0 +1,153 @@
+import threading
+
+from night_client import DaemonClient, DaemonError
+
+# Seconds between two rounds of agent health checks, and the timeout of one check
+CHECK_INTERVAL = 15
+CHECK_TIMEOUT = 5
+
+# An agent is retired after this many failed health checks or failed shards and jobs in a row
+RETIRE_FAILURES = 3
+
+# Times a failed shard or batch job is tried, each time on an agent it has not failed on if one is free
+MAX_ATTEMPTS = 3
+
+# One worker node: a night_daemon.py on another host (or this one), with what the coordinator has seen
+class AgentEntry:
+    def __init__(self, address, slots=None):
+        self.address = address
+        self.slots = slots  # Configured concurrency, None takes the daemon's own --max-jobs
+        self.reported_slots = None
+        self.active = 0  # Shards and jobs the coordinator has running on it
+        self.checks = 0
+        self.failures = 0  # Failed checks, shards and jobs in a row
+        self.last_error = ''
+        self.completed = 0
+        self.failed = 0
+        self.retired = ''
+
+    def capacity(self):
+        return self.slots or self.reported_slots or 1
+
+    def status(self):
+        if self.retired:
+            return f"Retired ({self.retired})"
+        if self.failures:
+            return f"Failing ({self.last_error})"
+        return "Healthy" if self.checks else "Unchecked"
+
+    def score(self):
+        # Higher is better: free share of its slots, less for an agent that has failed recently
+        return (self.capacity() - self.active) / self.capacity() / (1 + self.failures)
+
+def parse_agents(text):
+    # One agent per line: "host:port [slots]" or "unix:/path [slots]", blank lines and # comments are skipped
+    entries = []
+    for line in text.splitlines():
+        fields = line.split('#', 1)[0].split()
+        if not fields:
+            continue
+        try:
+            slots = int(fields[1]) if len(fields) > 1 else None
+        except ValueError:
+            raise ValueError(f"Bad agent line: {line.strip()}")
+        entries.append(AgentEntry(fields[0], max(slots, 1) if slots is not None else None))
+    return entries
+
+# Hands agents out to shards and batch jobs. Called from the GUI thread and the checker thread, so
+# every access goes through the lock.
+class AgentPool:
+    def __init__(self, entries):
+        self.entries = entries
+        self.lock = threading.Lock()
+        self.events = []  # Retirement messages not yet shown to the user
+
+    def alive(self):
+        with self.lock:
+            return [entry for entry in self.entries if not entry.retired]
+
+    def acquire(self, avoid=()):
+        # The best free agent that is not in `avoid` (addresses a shard has failed on). Those are only
+        # used again once every agent still in service is among them. None if no suitable agent is free.
+        with self.lock:
+            alive = [entry for entry in self.entries if not entry.retired]
+            free = [entry for entry in alive if entry.active < entry.capacity()]
+            preferred = [entry for entry in free if entry.address not in avoid]
+            if not preferred and all(entry.address in avoid for entry in alive):
+                preferred = free
+            entry = max(preferred, key=AgentEntry.score, default=None)
+            if entry is not None:
+                entry.active += 1
+            return entry
+
+    def release(self, entry):
+        with self.lock:
+            entry.active = max(0, entry.active - 1)
+
+    def record_check(self, entry, health=None, error=''):
+        with self.lock:
+            entry.checks += 1
+            if error:
+                self.record_failure(entry, error)
+            else:
+                entry.reported_slots = health.get('max_jobs')
+                entry.failures = 0
+                entry.last_error = ''
+
+    def record_job(self, entry, ok, error=''):
+        with self.lock:
+            if ok:
+                entry.completed += 1
+                entry.failures = 0
+                entry.last_error = ''
+            else:
+                entry.failed += 1
+                self.record_failure(entry, error)
+
+    def record_failure(self, entry, error):
+        entry.failures += 1
+        entry.last_error = error
+        if entry.failures >= RETIRE_FAILURES and not entry.retired:
+            entry.retired = f"{entry.failures} failures in a row"
+            self.events.append(f"Agent {entry.address} retired: {entry.retired}, last: {error}.")
+
+    def take_events(self):
+        with self.lock:
+            events = self.events
+            self.events = []
+            return events
+
+# Asks every agent of the pool for its health on a thread of its own, every CHECK_INTERVAL seconds
+class AgentChecker:
+    def __init__(self, pool, interval=CHECK_INTERVAL):
+        self.pool = pool
+        self.interval = interval
+        self.wake = threading.Event()
+        self.stopped = False
+        self.thread = threading.Thread(target=self.run, name="agent-health", daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def run(self):
+        while not self.stopped:
+            for entry in self.pool.entries:
+                if not entry.retired and not self.stopped:
+                    self.check(entry)
+            self.wake.wait(self.interval)
+            self.wake.clear()
+
+    def check(self, entry):
+        try:
+            health = DaemonClient(entry.address, timeout=CHECK_TIMEOUT).health()
+        except (OSError, ValueError, DaemonError) as error:
+            self.pool.record_check(entry, error=str(error) or type(error).__name__)
+        else:
+            self.pool.record_check(entry, health)
+
+    def check_now(self):
+        self.wake.set()
+
+    def stop(self):
+        self.stopped = True
+        self.wake.set()
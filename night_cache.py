@@ -0,0 +1,81 @@
+import os
+import sqlite3
+import time
+
+from night_log import DATA_DIR
+from night_results import AVAILABLE, CLAIMED, ILLEGAL, UNKNOWN, SiteResult
+
+CACHE_PATH = os.path.join(DATA_DIR, 'cache.sqlite')
+
+# Hours a cached answer stays valid, per status class. Errors are always checked again.
+DEFAULT_TTL = {CLAIMED: 24, AVAILABLE: 24 * 7, ILLEGAL: 24 * 30, UNKNOWN: 0}
+
+# Last known result of every (identifier, id_type, site) check, so a re-scan can skip fresh ones
+class ResultCache:
+    def __init__(self, path=CACHE_PATH):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.connection = sqlite3.connect(path)
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            " identifier TEXT NOT NULL, id_type TEXT NOT NULL, site TEXT NOT NULL,"
+            " status TEXT NOT NULL, url TEXT, checked_at REAL NOT NULL,"
+            " PRIMARY KEY (identifier, id_type, site)) WITHOUT ROWID"
+        )
+        self.connection.commit()
+
+    def entries(self, identifier, id_type):
+        rows = self.connection.execute(
+            "SELECT site, status, url, checked_at FROM results WHERE identifier = ? AND id_type = ?",
+            (identifier, id_type),
+        )
+        return {site: (status, url, checked_at) for site, status, url, checked_at in rows}
+
+    def plan(self, identifier, id_type, sites, ttl=DEFAULT_TTL, now=None):
+        # Splits the sites into those that need a request and those the cache still answers
+        now = time.time() if now is None else now
+        entries = self.entries(identifier, id_type)
+        stale = []
+        fresh = []
+        for site in sites:
+            entry = entries.get(site)
+            if entry is None or entry[2] + ttl.get(entry[0], 0) * 3600 <= now:
+                stale.append(site)
+            else:
+                fresh.append(SiteResult(identifier, site, entry[1], entry[0]))
+        return stale, fresh
+
+    def record(self, identifier, id_type, results, now=None):
+        # Stores new results and returns what changed since the previous run
+        now = time.time() if now is None else now
+        entries = self.entries(identifier, id_type)
+        changes = []
+        rows = []
+        for result in results:
+            previous = entries.get(result.site)
+            if result.status == UNKNOWN and previous is not None:
+                # An error says nothing new about the account, the last real answer is kept (and stays stale)
+                continue
+            # A site checked for the first time has no earlier answer to differ from
+            if previous is not None and (previous[0], previous[1]) != (result.status, result.url):
+                changes.append((result.site, previous[0], previous[1], result.status, result.url))
+            rows.append((identifier, id_type, result.site, result.status, result.url, now))
+        with self.connection:
+            self.connection.executemany("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?)", rows)
+        return changes
+
+    def clear(self):
+        with self.connection:
+            self.connection.execute("DELETE FROM results")
+
+    def close(self):
+        self.connection.close()
+
+def format_change(change):
+    site, old_status, old_url, status, url = change
+    if status == CLAIMED and old_status != CLAIMED:
+        return f"+ {site}: {url} (new account)"
+    if old_status == CLAIMED and status != CLAIMED:
+        return f"- {site}: {old_url} (now {status})"
+    if status == CLAIMED:
+        return f"~ {site}: {old_url} -> {url}"
+    return f"~ {site}: {old_status} -> {status}"
@@ -0,0 +1,91 @@
+import glob
+import json
+import os
+import time
+
+from night_log import DATA_DIR
+from night_results import SiteResult
+
+CHECKPOINT_DIR = os.path.join(DATA_DIR, 'checkpoints')
+
+# Seconds between fsync calls, every write is still flushed to the OS straight away
+SYNC_INTERVAL = 1.0
+
+# Results of a running scan, appended to an NDJSON file as they arrive. The first line holds the
+# settings and site list of the run, every following line one SiteResult. A scan that finishes
+# removes its checkpoint, so any file left in the directory belongs to an interrupted scan.
+class Checkpoint:
+    def __init__(self, path, settings, sites=None, started=None, results=None):
+        self.path = path
+        self.settings = settings
+        self.sites = sites  # None means the site selection of the settings
+        self.started = started or time.time()
+        self.results = results or {}  # (username, site) -> SiteResult
+        self.checkpoint_file = None
+        self.synced = time.monotonic()
+
+    @classmethod
+    def create(cls, settings, sites=None, directory=CHECKPOINT_DIR):
+        os.makedirs(directory, exist_ok=True)
+        checkpoint = cls(os.path.join(directory, f"scan-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}.ndjson"),
+                         settings, sites)
+        checkpoint.checkpoint_file = open(checkpoint.path, 'a', encoding='utf-8')
+        header = {'settings': settings, 'sites': sites, 'started': checkpoint.started}
+        checkpoint.checkpoint_file.write(json.dumps(header) + "\n")
+        checkpoint.sync()
+        return checkpoint
+
+    @classmethod
+    def open(cls, path):
+        with open(path, 'rb') as checkpoint_file:
+            header_line = checkpoint_file.readline()
+            header = json.loads(header_line)
+            complete = len(header_line)  # Bytes up to the end of the last whole line
+            results = {}
+            for line in checkpoint_file:
+                if not line.endswith(b"\n"):
+                    break  # The last line may be cut short by a crash, everything before it is intact
+                complete += len(line)
+                try:
+                    result = SiteResult(**json.loads(line))
+                except (ValueError, TypeError):
+                    continue
+                results[(result.username, result.site)] = result
+        # A cut-off line is dropped, new results would otherwise be appended onto it and lost with it
+        if complete < os.path.getsize(path):
+            os.truncate(path, complete)
+        checkpoint = cls(path, header['settings'], header.get('sites'), header.get('started'), results)
+        checkpoint.checkpoint_file = open(path, 'a', encoding='utf-8')
+        return checkpoint
+
+    def add(self, results):
+        for result in results:
+            self.results[(result.username, result.site)] = result
+            self.checkpoint_file.write(json.dumps(result._asdict()) + "\n")
+        self.checkpoint_file.flush()
+        if time.monotonic() - self.synced >= SYNC_INTERVAL:
+            self.sync()
+
+    def sync(self):
+        self.checkpoint_file.flush()
+        os.fsync(self.checkpoint_file.fileno())
+        self.synced = time.monotonic()
+
+    def remaining(self, sites):
+        # Sites still missing a result for at least one of the usernames
+        usernames = self.settings.get('username', '').split()
+        return [site for site in sites if any((username, site) not in self.results for username in usernames)]
+
+    def close(self):
+        if self.checkpoint_file:
+            self.sync()
+            self.checkpoint_file.close()
+            self.checkpoint_file = None
+
+    def discard(self):
+        self.close()
+        os.remove(self.path)
+
+def latest_checkpoint(directory=CHECKPOINT_DIR):
+    paths = glob.glob(os.path.join(directory, "scan-*.ndjson"))
+    return max(paths, key=os.path.getmtime, default=None)
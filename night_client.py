@@ -0,0 +1,126 @@
+import http.client
+import json
+import os
+import socket
+import urllib.parse
+
+DEFAULT_PORT = 8765
+DEFAULT_ADDRESS = f"127.0.0.1:{DEFAULT_PORT}"
+
+# Shared secret of the daemon's API, sent by the clients as "Authorization: Bearer <token>"
+TOKEN_ENV = 'MAIGRET_NIGHT_TOKEN'
+
+class DaemonError(Exception):
+    pass
+
+# http.client over a Unix socket, the daemon speaks the same HTTP on both
+class UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, path, timeout=None):
+        super().__init__('localhost', timeout=timeout)
+        self.socket_path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+
+def parse_address(address):
+    # "host:port", "http://host:port" or "unix:/path/to/socket" -> ('tcp', host, port) or ('unix', path, None)
+    address = address.strip()
+    if address.startswith('unix:'):
+        return 'unix', address[len('unix:'):], None
+    if '://' not in address:
+        address = 'http://' + address
+    parsed = urllib.parse.urlsplit(address)
+    return 'tcp', parsed.hostname or '127.0.0.1', parsed.port or DEFAULT_PORT
+
+# Talks to a maigret night daemon: submits jobs, polls them and follows their event stream
+class DaemonClient:
+    def __init__(self, address=DEFAULT_ADDRESS, timeout=10, token=None):
+        self.address = address
+        self.timeout = timeout
+        self.token = token if token is not None else os.environ.get(TOKEN_ENV, '')
+        self.kind, self.host, self.port = parse_address(address)
+        self.stream = None  # Connection of the event stream being followed, closed to abort it
+
+    def connect(self, timeout):
+        if self.kind == 'unix':
+            return UnixHTTPConnection(self.host, timeout=timeout)
+        return http.client.HTTPConnection(self.host, self.port, timeout=timeout)
+
+    def headers(self):
+        return {'Authorization': f"Bearer {self.token}"} if self.token else {}
+
+    def request(self, method, path, body=None):
+        connection = self.connect(self.timeout)
+        try:
+            payload = None if body is None else json.dumps(body).encode('utf-8')
+            headers = self.headers()
+            if payload is not None:
+                headers['Content-Type'] = 'application/json'
+            connection.request(method, path, body=payload, headers=headers)
+            response = connection.getresponse()
+            data = response.read()
+        finally:
+            connection.close()
+        try:
+            decoded = json.loads(data) if data else {}
+        except ValueError:
+            raise DaemonError(f"HTTP {response.status}: invalid response")
+        if response.status >= 400:
+            raise DaemonError(decoded.get('error') or f"HTTP {response.status}")
+        return decoded
+
+    def health(self):
+        return self.request('GET', '/health')
+
+    def submit(self, settings, hidden_statuses=(), **overrides):
+        # overrides are the build_command keywords: username, max_connections, sites, proxy, reports, track_all
+        return self.request('POST', '/jobs', {
+            'settings': settings,
+            'overrides': overrides,
+            'hidden_statuses': sorted(hidden_statuses),
+        })
+
+    def jobs(self):
+        return self.request('GET', '/jobs')['jobs']
+
+    def job(self, job_id):
+        return self.request('GET', f'/jobs/{job_id}')
+
+    def cancel(self, job_id):
+        return self.request('DELETE', f'/jobs/{job_id}')
+
+    def events(self, job_id, since=0, follow=True):
+        # Yields the job's events as dicts, following the stream until the job has ended
+        connection = self.connect(None if follow else self.timeout)
+        self.stream = connection
+        try:
+            connection.request('GET', f'/jobs/{job_id}/events?since={since}&follow={int(follow)}',
+                               headers=self.headers())
+            response = connection.getresponse()
+            if response.status >= 400:
+                data = response.read()
+                try:
+                    message = json.loads(data).get('error')
+                except ValueError:
+                    message = None
+                raise DaemonError(message or f"HTTP {response.status}")
+            while True:
+                line = response.readline()
+                if not line:
+                    break
+                if line.strip():
+                    yield json.loads(line)
+        finally:
+            self.stream = None
+            connection.close()
+
+    def abort(self):
+        # Breaks off a followed event stream from another thread
+        stream = self.stream
+        if stream is not None and stream.sock is not None:
+            try:
+                stream.sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
@@ -0,0 +1,116 @@
+import re
+import shlex
+
+# Builds the maigret argument list from a settings dict, the same dict save_settings writes to JSON.
+# username, max_connections, sites and proxy override the settings for a single job or shard.
+# reports=False leaves the report files to the caller, track_all=True makes maigret print every
+# site it checks so the caller can tell which ones are done.
+def build_command(settings, username=None, max_connections=None, sites=None, proxy=None,
+                  reports=True, track_all=False):
+    command = ["maigret"]
+    if username is None:
+        usernames = settings.get('username', '').split()
+    else:
+        usernames = [username]
+
+    # Add additional flags for settings
+    command += ["--timeout", str(settings.get('timeout', 30))]
+    command += ["--retries", str(settings.get('retries', 0))]
+    if max_connections is None:
+        max_connections = settings.get('max_connections', 10)
+    command += ["--max-connections", str(max_connections)]
+    if settings.get('no_recursion'):
+        command.append("--no-recursion")
+    if settings.get('no_extracting'):
+        command.append("--no-extracting")
+    command += ["--id-type", settings.get('id_type', 'username')]
+    if settings.get('permute'):
+        command.append("--permute")
+
+    if proxy is None:
+        proxy = settings.get('proxy')
+    if proxy:
+        command += ["--proxy", proxy]
+    if settings.get('tor_proxy'):
+        command += ["--tor-proxy", settings['tor_proxy']]
+    if settings.get('i2p_proxy'):
+        command += ["--i2p-proxy", settings['i2p_proxy']]
+
+    if sites is None:
+        # A site list narrows the scan by itself, so the broader selections only apply without one
+        if settings.get('all_sites'):
+            command.append("--all-sites")
+        if settings.get('top_sites'):
+            command += ["--top-sites", str(settings.get('top_sites_count', 10))]
+        if settings.get('tags'):
+            command += ["--tags", split_tags(settings['tags'])]
+        sites = split_sites(settings.get('site', ''))
+    for site in sites:
+        command += ["--site", site]
+    if settings.get('use_disabled_sites'):
+        command.append("--use-disabled-sites")
+
+    # Add more specific URLs
+    if settings.get('parse_url'):
+        command += ["--parse", settings['parse_url']]
+    if settings.get('submit_url'):
+        command += ["--submit", settings['submit_url']]
+    if settings.get('self_check'):
+        command.append("--self-check")
+    if settings.get('stats'):
+        command.append("--stats")
+
+    # Output file options
+    if reports:
+        if settings.get('csv'):
+            command.append("--csv")
+        if settings.get('pdf'):
+            command.append("--pdf")
+        if settings.get('txt'):
+            command.append("--txt")
+        if settings.get('html'):
+            command.append("--html")
+
+        # Add report sorting if checkbox is checked
+        if settings.get('report_sorting'):
+            command += ["--reports-sorting", settings.get('report_sorting_type', 'default')]
+
+    if settings.get('print_not_found') or track_all:
+        command.append("--print-not-found")
+    if settings.get('print_errors') or track_all:
+        command.append("--print-errors")
+    if settings.get('verbose'):
+        command.append("--verbose")
+    if settings.get('info'):
+        command.append("--info")
+    if settings.get('debug'):
+        command.append("--debug")
+
+    # The usernames go last, after "--", so one starting with "-" can't pass for a flag
+    command += ["--", *usernames]
+    return command
+
+def split_tags(text):
+    return ",".join(tag.strip() for tag in text.split(",") if tag.strip())
+
+def split_sites(text):
+    return [site for site in re.split(r"[,\s]+", text) if site]
+
+def split_usernames(text):
+    # One identifier per line or separated by commas, lines starting with # are comments
+    usernames = []
+    seen = set()
+    for line in text.splitlines():
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        for username in re.split(r"[,\s]+", line):
+            if username and username not in seen:
+                seen.add(username)
+                usernames.append(username)
+    return usernames
+
+def format_command(command):
+    if isinstance(command, str):
+        return command
+    return shlex.join(command)
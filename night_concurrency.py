@@ -0,0 +1,62 @@
+import time
+
+from night_results import UNKNOWN
+
+# Check errors that mean we are pushing too hard: the network, proxy or site can't keep up.
+# Captchas, bot protection and the like say nothing about the request rate and are ignored.
+CONGESTION_ERRORS = ("Request timeout", "Connecting failure", "Connection lost", "Server disconnected",
+                     "Rate limited", "Too many requests")
+
+def is_congestion(result):
+    if result.http_code == 429:
+        return True
+    return result.status == UNKNOWN and result.error.startswith(CONGESTION_ERRORS)
+
+# Picks the --max-connections budget for the next job or shard with AIMD: the budget grows by a
+# fixed step after a clean stretch of checks and is cut by a factor when congestion errors pile up.
+class ConcurrencyController:
+    def __init__(self, initial, minimum, maximum, increase=2, decrease=0.5, threshold=0.05, min_samples=20):
+        self.minimum = max(1, minimum)
+        self.maximum = max(self.minimum, maximum)
+        self.limit = min(self.maximum, max(self.minimum, initial))
+        self.increase = increase
+        self.decrease = decrease
+        self.threshold = threshold
+        self.min_samples = min_samples
+        self.window_checks = 0  # Checks since the last adjustment
+        self.window_errors = 0
+        self.checks = 0
+        self.errors = 0
+        self.history = [(time.time(), self.limit, None)]  # (when, budget, error rate that led to it)
+
+    def observe(self, results):
+        for result in results:
+            congested = is_congestion(result)
+            self.window_checks += 1
+            self.window_errors += congested
+            self.checks += 1
+            self.errors += congested
+
+    def adjust(self):
+        # Called when a job or shard is about to start, too few checks since the last change keep the budget
+        if self.window_checks < self.min_samples:
+            return self.limit
+        rate = self.window_errors / self.window_checks
+        if rate > self.threshold:
+            limit = max(self.minimum, int(self.limit * self.decrease))
+        else:
+            limit = min(self.maximum, self.limit + self.increase)
+        self.window_checks = 0
+        self.window_errors = 0
+        if limit != self.limit:
+            self.limit = limit
+            self.history.append((time.time(), limit, rate))
+        return self.limit
+
+    def error_rate(self):
+        return self.errors / self.checks if self.checks else 0.0
+
+    def summary(self):
+        budgets = " -> ".join(str(limit) for _, limit, _ in self.history)
+        return (f"Connection budget {budgets} (range {self.minimum}-{self.maximum}), "
+                f"congestion errors {self.error_rate():.1%} of {self.checks} checks.")
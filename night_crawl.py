@@ -0,0 +1,170 @@
+import ast
+import os
+import sqlite3
+import time
+
+from night_log import DATA_DIR
+from night_results import CLAIMED
+
+VISITED_PATH = os.path.join(DATA_DIR, 'visited.sqlite')
+
+# Identifier types maigret can search for, as in maigret.checking.SUPPORTED_IDS
+FALLBACK_SUPPORTED_IDS = (
+    "username", "yandex_public_id", "gaia_id", "vk_id", "ok_id", "wikimapia_uid", "steam_id",
+    "uidme_uguid", "yelp_userid", "orcid", "qq_id", "bilibili_id",
+)
+
+def supported_ids():
+    try:
+        from maigret.checking import SUPPORTED_IDS
+        return SUPPORTED_IDS
+    except ImportError:
+        return FALLBACK_SUPPORTED_IDS
+
+def is_plausible_username(value):
+    # Same rules as maigret's: extractors sometimes put URLs or e-mail addresses under *_username keys.
+    # A leading "-" is refused too, a page could otherwise hand maigret a flag.
+    if not isinstance(value, str):
+        return False
+    value = value.strip()
+    if not value or value.startswith("-") or "://" in value or value.startswith(("www.", "//")) or "/" in value:
+        return False
+    if any(character.isspace() for character in value):
+        return False
+    return not ("@" in value and "." in value)
+
+def is_plausible_id(value):
+    return isinstance(value, str) and bool(value.strip()) and not value.strip().startswith("-")
+
+def as_list(value):
+    # The CLI prints lists as sub-items, the library keeps them as Python literals in a string
+    if isinstance(value, list):
+        return value
+    if isinstance(value, str):
+        try:
+            parsed = ast.literal_eval(value)
+        except (ValueError, SyntaxError):
+            return [value]
+        return parsed if isinstance(parsed, list) else [value]
+    return []
+
+def extract_identities(result, database=None, id_types=None):
+    # Identifiers found on an account page, {identifier: id_type}, the way maigret's own recursion
+    # picks them: *username keys, *usernames lists, supported id keys and, with the site database
+    # at hand, profile links that match a site's URL pattern
+    id_types = id_types or supported_ids()
+    identities = {}
+    for key, value in (result.ids or {}).items():
+        if "usernames" in key:
+            for item in as_list(value):
+                if is_plausible_username(item):
+                    identities[item.strip()] = "username"
+        elif "username" in key:
+            if is_plausible_username(value):
+                identities[value.strip()] = "username"
+        elif key in id_types and is_plausible_id(value):
+            identities[value.strip()] = key
+
+    if database is not None:
+        links = as_list((result.ids or {}).get("links", []))
+        website = (result.ids or {}).get("website")
+        if isinstance(website, str):
+            links.append(website)
+        for link in links:
+            if isinstance(link, str):
+                for identifier, id_type in database.extract_ids_from_url(link.strip()).items():
+                    if is_plausible_id(identifier):
+                        identities[identifier] = id_type
+    return identities
+
+def identity_key(identifier, id_type):
+    # Usernames are matched case-insensitively, like most sites do
+    return (identifier.lower() if id_type == "username" else identifier, id_type)
+
+# Every identity a crawl has scanned, so later crawls don't scan it again while it is recent
+class VisitedStore:
+    def __init__(self, path=VISITED_PATH):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.connection = sqlite3.connect(path)
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS visited ("
+            " identifier TEXT NOT NULL, id_type TEXT NOT NULL, scanned_at REAL NOT NULL,"
+            " depth INTEGER NOT NULL, parent TEXT,"
+            " PRIMARY KEY (identifier, id_type)) WITHOUT ROWID"
+        )
+        self.connection.commit()
+
+    def add(self, identifier, id_type, depth=0, parent=None, now=None):
+        now = time.time() if now is None else now
+        with self.connection:
+            self.connection.execute("INSERT OR REPLACE INTO visited VALUES (?, ?, ?, ?, ?)",
+                                    (*identity_key(identifier, id_type), now, depth, parent))
+
+    def scanned_since(self, identifier, id_type, since):
+        row = self.connection.execute(
+            "SELECT 1 FROM visited WHERE identifier = ? AND id_type = ? AND scanned_at >= ?",
+            (*identity_key(identifier, id_type), since),
+        ).fetchone()
+        return row is not None
+
+    def count(self):
+        return self.connection.execute("SELECT COUNT(*) FROM visited").fetchone()[0]
+
+    def clear(self):
+        with self.connection:
+            self.connection.execute("DELETE FROM visited")
+
+    def close(self):
+        self.connection.close()
+
+# Breadth-first expansion of a batch: accounts found for one identity yield new identities, which
+# are queued one level deeper until the depth or the budget runs out
+class Crawl:
+    def __init__(self, max_depth=2, budget=50, visited=None, revisit_days=30, database=None):
+        self.max_depth = max_depth
+        self.budget = budget  # Identities discovered and queued, the seeds don't count
+        self.visited = visited
+        self.revisit_days = revisit_days  # 0 only dedups within this crawl
+        self.database = database
+        self.id_types = supported_ids()
+        self.seen = set()
+        self.queued = 0
+        self.skipped_visited = 0
+        self.skipped_limits = 0
+        self.started = time.time()
+
+    def add_seed(self, identifier, id_type):
+        self.seen.add(identity_key(identifier, id_type))
+
+    def discover(self, results, depth):
+        # Returns [(identifier, id_type, site)] worth scanning at depth + 1
+        new = []
+        for result in results:
+            if result.status != CLAIMED or not result.ids:
+                continue
+            for identifier, id_type in extract_identities(result, self.database, self.id_types).items():
+                key = identity_key(identifier, id_type)
+                if key in self.seen:
+                    continue
+                self.seen.add(key)
+                if depth + 1 > self.max_depth or self.queued >= self.budget:
+                    self.skipped_limits += 1
+                elif self.recently_visited(identifier, id_type):
+                    self.skipped_visited += 1
+                else:
+                    self.queued += 1
+                    new.append((identifier, id_type, result.site))
+        return new
+
+    def recently_visited(self, identifier, id_type):
+        if self.visited is None or self.revisit_days <= 0:
+            return False
+        return self.visited.scanned_since(identifier, id_type, time.time() - self.revisit_days * 86400)
+
+    def mark_visited(self, identifier, id_type, depth, parent=None):
+        if self.visited is not None:
+            self.visited.add(identifier, id_type, depth, parent)
+
+    def summary(self):
+        return (f"Crawl: {self.queued} new identities queued, {self.skipped_visited} skipped as visited recently, "
+                f"{self.skipped_limits} beyond the depth or budget limit.")
@@ -0,0 +1,483 @@
+import argparse
+import hmac
+import http.server
+import ipaddress
+import json
+import os
+import queue
+import re
+import signal
+import socketserver
+import subprocess
+import sys
+import threading
+import time
+import urllib.parse
+import uuid
+
+from night_client import DEFAULT_PORT, TOKEN_ENV
+from night_command import build_command, format_command, split_sites
+from night_log import DATA_DIR
+from night_results import CLAIMED, ResultParser
+from night_runner import OutputBatcher, pump_output, split_chunk
+
+# Runs maigret searches without the GUI. Jobs are submitted over a small HTTP API on localhost or a
+# Unix socket, run a bounded number at a time, and their output is kept as NDJSON events on disk so
+# any number of clients can follow a job, or catch up on it later.
+
+JOBS_DIR = os.path.join(DATA_DIR, 'daemon')
+
+QUEUED, RUNNING, DONE, FAILED, CANCELLED = "queued", "running", "done", "failed", "cancelled"
+
+# build_command keywords a job may override
+OVERRIDES = {'username', 'max_connections', 'sites', 'proxy', 'reports', 'track_all'}
+
+# Event logs are named after their job, only files of that shape are ever removed from the jobs directory
+EVENTS_NAME = re.compile(r"^[0-9a-f]{12}\.ndjson$")
+
+# Finished jobs kept in memory (and their event files on disk), the oldest are dropped first
+KEEP_JOBS = 200
+
+MAX_BODY = 1024 * 1024
+
+class QueueFull(Exception):
+    pass
+
+def check_job(settings, overrides):
+    # Usernames and sites end up in maigret's arguments, one starting with "-" would pass for a flag
+    values = [('username', name) for name in str(settings.get('username', '')).split()]
+    values += [('site', site) for site in split_sites(str(settings.get('site', '')))]
+    if overrides.get('username') is not None:
+        values.append(('username', overrides['username']))
+    sites = overrides.get('sites')
+    if sites is not None:
+        if not isinstance(sites, list):
+            raise ValueError("sites must be a list")
+        values += [('site', site) for site in sites]
+    for kind, value in values:
+        if not isinstance(value, str) or not value.strip():
+            raise ValueError(f"every {kind} must be a non-empty string")
+        if value.startswith('-'):
+            raise ValueError(f"{kind} {value!r} starts with '-'")
+
+def is_loopback(host):
+    if host == 'localhost':
+        return True
+    host = host.strip('[]')
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+# One submitted search and its event log. Events are appended by the runner thread and read back
+# from the file by the request threads following it.
+class Job:
+    def __init__(self, settings, overrides, hidden_statuses, directory):
+        self.id = uuid.uuid4().hex[:12]
+        self.settings = settings
+        self.overrides = overrides
+        self.hidden_statuses = set(hidden_statuses)
+        self.command = build_command(settings, **overrides)
+        self.status = QUEUED
+        self.returncode = None
+        self.error = ''
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.lines = 0
+        self.results = 0
+        self.found = 0
+        self.process = None
+        self.cancel_requested = False
+        self.events_path = os.path.join(directory, f"{self.id}.ndjson")
+        self.events_file = open(self.events_path, 'ab')
+        self.event_count = 0
+        self.changed = threading.Condition()
+
+    @property
+    def done(self):
+        return self.status in (DONE, FAILED, CANCELLED)
+
+    def emit(self, event):
+        with self.changed:
+            self.events_file.write(json.dumps(event).encode('utf-8') + b'\n')
+            self.events_file.flush()
+            self.event_count += 1
+            self.changed.notify_all()
+
+    def add(self, lines, results):
+        if lines:
+            self.lines += len(lines)
+            self.emit({'event': 'lines', 'lines': lines})
+        if results:
+            self.results += len(results)
+            self.found += sum(result.status == CLAIMED for result in results)
+            self.emit({'event': 'results', 'results': [result._asdict() for result in results]})
+
+    def end(self, status, returncode=None, error='', stats=None):
+        self.emit({'event': 'end', 'status': status, 'returncode': returncode, 'error': error,
+                   'stats': stats or {}})
+        with self.changed:
+            self.status = status
+            self.returncode = returncode
+            self.error = error
+            self.finished = time.time()
+            self.events_file.close()
+            self.changed.notify_all()
+
+    def wait(self, seen, timeout):
+        # Blocks until there are more than `seen` events or the job has ended
+        with self.changed:
+            self.changed.wait_for(lambda: self.event_count > seen or self.done, timeout)
+
+    def as_dict(self):
+        return {
+            'id': self.id,
+            'status': self.status,
+            'command': format_command(self.command),
+            'created': self.created,
+            'started': self.started,
+            'finished': self.finished,
+            'returncode': self.returncode,
+            'error': self.error,
+            'lines': self.lines,
+            'results': self.results,
+            'found': self.found,
+            'events': self.event_count,
+        }
+
+# Queues jobs and runs at most max_jobs maigret processes at a time, refusing new jobs once
+# max_queued are waiting
+class JobManager:
+    def __init__(self, max_jobs=2, max_queued=100, directory=JOBS_DIR, max_lines=500, max_delay=0.05):
+        os.makedirs(directory, exist_ok=True)
+        # Event logs of an earlier daemon belong to jobs nobody can ask for any more
+        for name in os.listdir(directory):
+            if EVENTS_NAME.match(name):
+                os.remove(os.path.join(directory, name))
+        self.directory = directory
+        self.max_jobs = max_jobs
+        self.max_queued = max_queued
+        self.max_lines = max_lines
+        self.max_delay = max_delay
+        self.jobs = {}  # Insertion ordered, oldest first
+        self.lock = threading.Lock()
+        self.pending = queue.Queue()
+        self.stopped = False
+        self.runners = [threading.Thread(target=self.run, name=f"job-runner-{number}", daemon=True)
+                        for number in range(max_jobs)]
+        for runner in self.runners:
+            runner.start()
+
+    def counts(self):
+        with self.lock:
+            statuses = [job.status for job in self.jobs.values()]
+        return statuses.count(RUNNING), statuses.count(QUEUED)
+
+    def submit(self, settings, overrides=None, hidden_statuses=()):
+        overrides = dict(overrides or {})
+        unknown = set(overrides) - OVERRIDES
+        if unknown:
+            raise ValueError(f"Unknown overrides: {', '.join(sorted(unknown))}")
+        check_job(settings, overrides)
+        with self.lock:
+            if sum(job.status == QUEUED for job in self.jobs.values()) >= self.max_queued:
+                raise QueueFull(f"{self.max_queued} jobs are already waiting")
+            job = Job(settings, overrides, hidden_statuses, self.directory)
+            self.jobs[job.id] = job
+            self.prune()
+        self.pending.put(job)
+        return job
+
+    def prune(self):
+        finished = [job for job in self.jobs.values() if job.done]
+        for job in finished[:max(0, len(finished) - KEEP_JOBS)]:
+            del self.jobs[job.id]
+            try:
+                os.remove(job.events_path)
+            except OSError:
+                pass
+
+    def get(self, job_id):
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def list(self):
+        with self.lock:
+            return list(self.jobs.values())
+
+    def cancel(self, job):
+        with job.changed:
+            job.cancel_requested = True
+            if job.status == QUEUED:
+                # The runner that picks it up skips it
+                job.end(CANCELLED)
+                return
+        if job.process is not None and job.process.poll() is None:
+            job.process.terminate()
+
+    def run(self):
+        while True:
+            job = self.pending.get()
+            if job is None:
+                return
+            with job.changed:
+                if job.status != QUEUED:
+                    continue
+                job.status = RUNNING
+                job.started = time.time()
+            self.run_job(job)
+
+    def run_job(self, job):
+        try:
+            job.process = subprocess.Popen(job.command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+        except OSError as error:
+            job.end(FAILED, error=f"Could not start maigret: {error}")
+            return
+        if job.cancel_requested:
+            job.process.terminate()
+
+        batcher = OutputBatcher(self.max_lines, self.max_delay)
+        parser = ResultParser()
+
+        def flush(final):
+            job.add(*split_chunk(batcher.take(), parser, batcher, job.hidden_statuses, final))
+
+        pump_output(job.process, batcher, flush)
+        returncode = job.process.returncode
+        if job.cancel_requested:
+            status = CANCELLED
+        else:
+            status = DONE if returncode == 0 else FAILED
+        job.end(status, returncode, stats=batcher.stats())
+
+    def stop(self):
+        self.stopped = True
+        for job in self.list():
+            if not job.done:
+                self.cancel(job)
+        for _ in self.runners:
+            self.pending.put(None)
+
+class Handler(http.server.BaseHTTPRequestHandler):
+    # HTTP/1.0, every response ends with the connection, which is also how an event stream ends
+    protocol_version = 'HTTP/1.0'
+
+    @property
+    def manager(self):
+        return self.server.manager
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            sys.stderr.write(f"{time.strftime('%H:%M:%S')} {format % args}\n")
+
+    def address_string(self):
+        # Unix socket peers have no address
+        return self.client_address[0] if self.client_address else 'unix'
+
+    def send_json(self, status, body):
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def send_error_json(self, status, message):
+        self.send_json(status, {'error': message})
+
+    def authorized(self):
+        # Every request carries the daemon's token when it has one. Without one, only requests sent to
+        # a loopback name are answered: a web page that rebinds its own name to 127.0.0.1 sends its
+        # name in the Host header, and can't read the job results that way.
+        token = self.server.token
+        if not token:
+            host = urllib.parse.urlsplit('//' + self.headers.get('Host', '')).hostname or ''
+            if isinstance(self.server, UnixServer) or is_loopback(host):
+                return True
+            self.send_error_json(403, f"Host {host or '(none)'} is not a loopback name")
+            return False
+        header = self.headers.get('Authorization', '')
+        if hmac.compare_digest(header.encode('utf-8'), f"Bearer {token}".encode('utf-8')):
+            return True
+        self.send_error_json(401, "A valid token is required")
+        return False
+
+    def route(self):
+        url = urllib.parse.urlsplit(self.path)
+        parts = [part for part in url.path.split('/') if part]
+        return parts, urllib.parse.parse_qs(url.query)
+
+    def find_job(self, job_id):
+        job = self.manager.get(job_id)
+        if job is None:
+            self.send_error_json(404, f"No job {job_id}")
+        return job
+
+    def do_GET(self):
+        if not self.authorized():
+            return
+        parts, query = self.route()
+        if parts == ['health']:
+            running, queued = self.manager.counts()
+            self.send_json(200, {'status': 'ok', 'running': running, 'queued': queued,
+                                 'max_jobs': self.manager.max_jobs, 'max_queued': self.manager.max_queued})
+        elif parts == ['jobs']:
+            self.send_json(200, {'jobs': [job.as_dict() for job in self.manager.list()]})
+        elif len(parts) == 2 and parts[0] == 'jobs':
+            job = self.find_job(parts[1])
+            if job is not None:
+                self.send_json(200, job.as_dict())
+        elif len(parts) == 3 and parts[0] == 'jobs' and parts[2] == 'events':
+            job = self.find_job(parts[1])
+            if job is not None:
+                try:
+                    since = int(query.get('since', ['0'])[0])
+                except ValueError:
+                    self.send_error_json(400, "since must be a number")
+                    return
+                follow = query.get('follow', ['1'])[0] not in ('0', 'false', 'no')
+                self.stream_events(job, since, follow)
+        else:
+            self.send_error_json(404, f"Unknown path {self.path}")
+
+    def do_POST(self):
+        if not self.authorized():
+            return
+        parts, _ = self.route()
+        if parts != ['jobs']:
+            self.send_error_json(404, f"Unknown path {self.path}")
+            return
+        # A browser sends a cross-origin JSON body only after a preflight the daemon never answers,
+        # a text/plain form post goes without one
+        if self.headers.get_content_type() != 'application/json':
+            self.send_error_json(415, "Content-Type must be application/json")
+            return
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+        except ValueError:
+            length = -1
+        if not 0 < length <= MAX_BODY:
+            self.send_error_json(400, "A JSON body of at most 1 MB is required")
+            return
+        try:
+            spec = json.loads(self.rfile.read(length))
+            settings = spec['settings']
+            if not isinstance(settings, dict):
+                raise ValueError("settings must be an object")
+            job = self.manager.submit(settings, spec.get('overrides'), spec.get('hidden_statuses', ()))
+        except QueueFull as error:
+            self.send_error_json(503, str(error))
+        except (ValueError, KeyError, TypeError, AttributeError) as error:
+            self.send_error_json(400, f"Bad job: {error}")
+        else:
+            self.send_json(202, job.as_dict())
+
+    def do_DELETE(self):
+        if not self.authorized():
+            return
+        parts, _ = self.route()
+        if len(parts) != 2 or parts[0] != 'jobs':
+            self.send_error_json(404, f"Unknown path {self.path}")
+            return
+        job = self.find_job(parts[1])
+        if job is not None:
+            self.manager.cancel(job)
+            self.send_json(200, job.as_dict())
+
+    def stream_events(self, job, since, follow):
+        # Copies the job's NDJSON file to the client, then keeps copying new events until the job ends
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/x-ndjson')
+        self.end_headers()
+        seen = 0
+        try:
+            with open(job.events_path, 'rb') as events_file:
+                while True:
+                    line = events_file.readline()
+                    if line.endswith(b'\n'):
+                        if seen >= since:
+                            self.wfile.write(line)
+                        seen += 1
+                        continue
+                    # An event still being written is read again once it is complete
+                    events_file.seek(-len(line), os.SEEK_CUR)
+                    self.wfile.flush()
+                    if not follow or (job.done and seen >= job.event_count) or self.manager.stopped:
+                        return
+                    job.wait(seen, timeout=1.0)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # The client went away
+        except FileNotFoundError:
+            pass  # Pruned while it was being read
+
+class TCPServer(http.server.ThreadingHTTPServer):
+    daemon_threads = True
+
+class UnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def server_bind(self):
+        # A socket left behind by an earlier daemon would make bind fail
+        if os.path.exists(self.server_address):
+            os.remove(self.server_address)
+        super().server_bind()
+        os.chmod(self.server_address, 0o600)
+
+def make_server(manager, host='127.0.0.1', port=DEFAULT_PORT, socket_path=None, verbose=False, token=None):
+    if socket_path:
+        server = UnixServer(socket_path, Handler)
+    else:
+        server = TCPServer((host, port), Handler)
+    server.manager = manager
+    server.verbose = verbose
+    server.token = token
+    return server
+
+def server_address(server):
+    if isinstance(server, UnixServer):
+        return f"unix:{server.server_address}"
+    host, port = server.server_address[:2]
+    return f"{host}:{port}"
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Headless maigret night: runs searches submitted over HTTP.")
+    parser.add_argument('--host', default='127.0.0.1', help="address to listen on (default 127.0.0.1)")
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help=f"port to listen on (default {DEFAULT_PORT})")
+    parser.add_argument('--socket', help="listen on this Unix socket instead of TCP")
+    parser.add_argument('--max-jobs', type=int, default=2, help="maigret processes run at the same time")
+    parser.add_argument('--max-queued', type=int, default=100, help="jobs allowed to wait before new ones are refused")
+    parser.add_argument('--jobs-dir', default=JOBS_DIR, help="where job event logs are kept")
+    parser.add_argument('--token', default=os.environ.get(TOKEN_ENV),
+                        help=f"require this token from every client (default ${TOKEN_ENV})")
+    parser.add_argument('--verbose', action='store_true', help="log every request")
+    args = parser.parse_args(argv)
+    if not args.socket and not args.token and not is_loopback(args.host):
+        # Anyone who can reach the port could run searches from this host
+        parser.error(f"--host {args.host} is reachable from other hosts, set a --token or ${TOKEN_ENV}")
+
+    manager = JobManager(max(1, args.max_jobs), max(0, args.max_queued), args.jobs_dir)
+    server = make_server(manager, args.host, args.port, args.socket, args.verbose, args.token)
+
+    def shut_down(signum, frame):
+        # shutdown() blocks until serve_forever returns, so it can't be called from its own thread
+        threading.Thread(target=server.shutdown, daemon=True).start()
+
+    signal.signal(signal.SIGTERM, shut_down)
+    if not args.token and not args.socket:
+        print(f"WARNING: no --token or ${TOKEN_ENV} set, any program on this host can submit searches "
+              f"to {server_address(server)}", file=sys.stderr, flush=True)
+    print(f"maigret night daemon listening on {server_address(server)}, "
+          f"{manager.max_jobs} jobs at a time", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        manager.stop()
+        server.server_close()
+        if args.socket and os.path.exists(args.socket):
+            os.remove(args.socket)
+
+if __name__ == '__main__':
+    main()
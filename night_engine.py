@@ -0,0 +1,157 @@
+import asyncio
+import logging
+import threading
+
+import night_sites
+from night_report import report_path
+from night_results import CLAIMED, SiteResult, site_name
+
+# Keeps maigret imported in this process, with its site database parsed and an asyncio loop
+# running on a thread of its own, so a search starts sending requests straight away.
+class SearchEngine:
+    def __init__(self):
+        self.loop = None
+        self.thread = None
+        self.database = None
+        # Check failures already arrive as results, the logger would only repeat them on stderr
+        self.logger = logging.getLogger("maigret")
+        self.logger.addHandler(logging.NullHandler())
+        self.logger.propagate = False
+
+    def start(self):
+        if self.loop is not None:
+            return
+        # ImportError and database errors reach the caller, which falls back to the CLI
+        import maigret  # noqa: F401
+        self.database = night_sites.load_database()
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, name="maigret-engine", daemon=True)
+        self.thread.start()
+
+    def submit(self, coroutine):
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop)
+
+    def site_dict(self, settings, sites=None):
+        if sites is None:
+            sites = night_sites.select_sites(settings)
+        # Keep the caller's order, maigret queues its checks in dict order
+        return {name: self.database.sites_dict[name] for name in sites if name in self.database.sites_dict}
+
+    async def search(self, username, settings, on_result, sites=None, max_connections=None, proxy=None):
+        from maigret import search as maigret_search
+
+        if max_connections is None:
+            max_connections = settings.get('max_connections', 10)
+        if proxy is None:
+            proxy = settings.get('proxy')
+        notifier = EngineNotifier(username, on_result)
+        return await maigret_search(
+            username=username,
+            site_dict=self.site_dict(settings, sites),
+            logger=self.logger,
+            query_notify=notifier,
+            proxy=proxy or None,
+            tor_proxy=settings.get('tor_proxy') or None,
+            i2p_proxy=settings.get('i2p_proxy') or None,
+            timeout=settings.get('timeout', 30),
+            is_parsing_enabled=not settings.get('no_extracting'),
+            id_type=settings.get('id_type', 'username'),
+            forced=settings.get('use_disabled_sites', False),
+            max_connections=max_connections,
+            no_progressbar=True,
+            retries=settings.get('retries', 0),
+        )
+
+    def stop(self):
+        if self.loop is not None:
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self.thread.join(timeout=5)
+            self.loop = None
+
+# Receives maigret's per-site callbacks and hands them on as SiteResult objects
+class EngineNotifier:
+    def __init__(self, username, on_result):
+        self.username = username
+        self.on_result = on_result
+
+    def start(self, message=None, id_type="username"):
+        pass
+
+    def update(self, result, is_similar=False):
+        self.on_result(to_site_result(self.username, result))
+
+    def finish(self, message=None):
+        pass
+
+    def warning(self, message, *args, **kwargs):
+        pass
+
+    def info(self, message, *args, **kwargs):
+        pass
+
+    def enrich(self, message, *args, **kwargs):
+        pass
+
+def to_site_result(username, result, http_code=None):
+    status = str(result.status)
+    ids = {key: value for key, value in (result.ids_data or {}).items() if not key.startswith("_")}
+    return SiteResult(
+        username,
+        site_name(result.site_name),
+        result.site_url_user if status == CLAIMED else None,
+        status,
+        http_code,
+        ids or None,
+        result.query_time,
+        str(result.error) if result.error else '',
+    )
+
+def site_results(username, raw_results):
+    # The finished search also knows the HTTP status of each check
+    results = []
+    for name, data in raw_results.items():
+        if data.get('status'):
+            results.append(to_site_result(username, data['status'], data.get('http_status')))
+    return results
+
+def save_reports(settings, raw_by_username, notify):
+    # With the raw maigret results at hand its own report writers can be used unchanged
+    from maigret import report
+
+    general_results = []
+    for username, raw_results in raw_by_username.items():
+        general_results.append((username, settings.get('id_type', 'username'), raw_results))
+        if settings.get('csv'):
+            file_path = report_path(username, ".csv")
+            report.save_csv_report(file_path, username, raw_results)
+            notify(f"CSV report saved to {file_path}.")
+        if settings.get('txt'):
+            file_path = report_path(username, ".txt")
+            report.save_txt_report(file_path, username, raw_results)
+            notify(f"TXT report saved to {file_path}.")
+
+    if general_results and (settings.get('html') or settings.get('pdf')):
+        context = report.generate_report_context(general_results)
+        if settings.get('html'):
+            file_path = report_path(context['username'], "_plain.html")
+            report.save_html_report(file_path, context)
+            notify(f"HTML report saved to {file_path}.")
+        if settings.get('pdf'):
+            file_path = report_path(context['username'], ".pdf")
+            try:
+                report.save_pdf_report(file_path, context)
+                notify(f"PDF report saved to {file_path}.")
+            except RuntimeError as error:
+                notify(f"PDF report failed: {error}")
+
+def usernames_for(settings, username=None):
+    if username is not None:
+        return [username]
+    return settings.get('username', '').split()
+
+def can_run(settings):
+    # Permutations, recursion into extracted identities and non-scan actions are only implemented by the CLI
+    if not settings.get('no_recursion'):
+        return False
+    return not (settings.get('permute') or settings.get('parse_url') or settings.get('submit_url')
+                or settings.get('self_check') or settings.get('stats'))
@@ -0,0 +1,106 @@
+import os
+import sqlite3
+import time
+from collections import namedtuple
+
+from night_log import DATA_DIR
+from night_results import UNKNOWN
+
+HEALTH_PATH = os.path.join(DATA_DIR, 'site_health.sqlite')
+
+# Checks kept per site, older ones are dropped so the store stays small and follows recent behaviour
+HISTORY = 20
+
+# Consecutive timeouts after which a site counts as dead
+DEAD_AFTER = 3
+
+OK, TIMEOUT, ERROR = 0, 1, 2
+
+SiteHealth = namedtuple('SiteHealth', ['site', 'checks', 'p50', 'p95', 'timeout_rate', 'error_rate', 'dead'])
+
+def outcome(result):
+    if result.status != UNKNOWN:
+        return OK
+    return TIMEOUT if result.error.startswith("Request timeout") else ERROR
+
+def percentile(values, fraction):
+    # Nearest-rank percentile of an already sorted list
+    if not values:
+        return None
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+# Recent check history of every site: outcome, and the response time when the run measured it
+class SiteHealthStore:
+    def __init__(self, path=HEALTH_PATH):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.connection = sqlite3.connect(path)
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS checks ("
+            " site TEXT NOT NULL, checked_at REAL NOT NULL, latency REAL, outcome INTEGER NOT NULL)"
+        )
+        self.connection.execute("CREATE INDEX IF NOT EXISTS checks_site ON checks (site, checked_at)")
+        self.connection.commit()
+
+    def record(self, results, timed=False, now=None):
+        # Parsed CLI output carries no per-site timing, only runs on the engine store latencies
+        now = time.time() if now is None else now
+        rows = [(result.site, now, result.elapsed if timed else None, outcome(result)) for result in results]
+        sites = {row[0] for row in rows}
+        with self.connection:
+            self.connection.executemany("INSERT INTO checks VALUES (?, ?, ?, ?)", rows)
+            for site in sites:
+                self.connection.execute(
+                    "DELETE FROM checks WHERE site = ? AND rowid NOT IN"
+                    " (SELECT rowid FROM checks WHERE site = ? ORDER BY checked_at DESC LIMIT ?)",
+                    (site, site, HISTORY),
+                )
+
+    def stats(self):
+        history = {}
+        for site, latency, result in self.connection.execute(
+            "SELECT site, latency, outcome FROM checks ORDER BY site, checked_at DESC"
+        ):
+            history.setdefault(site, []).append((latency, result))
+
+        stats = {}
+        for site, checks in history.items():
+            latencies = sorted(latency for latency, result in checks if latency is not None and result == OK)
+            outcomes = [result for latency, result in checks]
+            stats[site] = SiteHealth(
+                site,
+                len(checks),
+                percentile(latencies, 0.5),
+                percentile(latencies, 0.95),
+                outcomes.count(TIMEOUT) / len(checks),
+                outcomes.count(ERROR) / len(checks),
+                len(outcomes) >= DEAD_AFTER and all(result == TIMEOUT for result in outcomes[:DEAD_AFTER]),
+            )
+        return stats
+
+    def clear(self):
+        with self.connection:
+            self.connection.execute("DELETE FROM checks")
+
+    def close(self):
+        self.connection.close()
+
+def expected_time(health, timeout):
+    # Rough cost of checking a site: its median response time, or the full timeout when it times out
+    if health is None:
+        return timeout / 2
+    latency = health.p50 if health.p50 is not None else 1.0
+    return (1 - health.timeout_rate) * latency + health.timeout_rate * timeout
+
+def order_sites(sites, stats, timeout, fast_first=True, dead_sites='check'):
+    # Returns (sites to check now, sites to check at the end, skipped sites)
+    dead = [site for site in sites if site in stats and stats[site].dead]
+    dead_set = set(dead)
+    live = [site for site in sites if site not in dead_set] if dead_sites != 'check' else list(sites)
+    if fast_first:
+        # sorted() is stable, sites with the same estimate keep their rank order
+        live.sort(key=lambda site: expected_time(stats.get(site), timeout))
+    if dead_sites == 'skip':
+        return live, [], dead
+    if dead_sites == 'check last':
+        return live, dead, []
+    return live, [], []
@@ -0,0 +1,150 @@
+import mmap
+import os
+import struct
+import time
+
+DATA_DIR = os.path.join(os.path.expanduser('~'), '.maigret_night')
+LOG_DIR = os.path.join(DATA_DIR, 'logs')
+
+OFFSET = struct.Struct('<Q')
+
+# Append-only run log on disk, with a sidecar .idx file holding the byte offset of every line.
+# Both files are read back through mmap, so the memory used does not depend on the log size.
+class LogSpool:
+    def __init__(self, path, writable=False):
+        self.path = path
+        self.index_path = path + '.idx'
+        self.writable = writable
+        self.log_file = None
+        self.index_file = None
+        self.log_map = None
+        self.index_map = None
+        self.offsets = None  # Line offsets kept in memory instead of the sidecar, see open()
+        self.size = 0
+        self.count = 0
+
+    @classmethod
+    def create(cls, directory=LOG_DIR):
+        os.makedirs(directory, exist_ok=True)
+        stamp = time.strftime('%Y%m%d-%H%M%S')
+        path = os.path.join(directory, f"run-{stamp}.log")
+        suffix = 1
+        while os.path.exists(path):
+            path = os.path.join(directory, f"run-{stamp}-{suffix}.log")
+            suffix += 1
+
+        spool = cls(path, writable=True)
+        spool.log_file = open(path, 'ab')
+        spool.index_file = open(spool.index_path, 'ab')
+        return spool
+
+    @classmethod
+    def open(cls, path, read_only=False):
+        # read_only never rewrites the sidecar, the log may be one another spool is still writing.
+        # A sidecar that doesn't line up is then rebuilt in memory, up to the size seen now.
+        spool = cls(path)
+        spool.size = os.path.getsize(path)
+        if not spool.load_index():
+            spool.rebuild_index(in_memory=read_only)
+        return spool
+
+    def load_index(self):
+        # The sidecar is only trusted if it lines up with the log it describes
+        if not os.path.exists(self.index_path):
+            return False
+        index_size = os.path.getsize(self.index_path)
+        if index_size % OFFSET.size:
+            return False
+        self.count = index_size // OFFSET.size
+        if self.count == 0:
+            return self.size == 0
+        return self.offset(self.count - 1) < self.size
+
+    def rebuild_index(self, in_memory=False):
+        self.count = 0
+        position = 0
+        if in_memory:
+            offsets = bytearray()
+            with open(self.path, 'rb') as log_file:
+                for line in log_file:
+                    if position + len(line) > self.size:
+                        break  # Written after the size was taken
+                    offsets += OFFSET.pack(position)
+                    position += len(line)
+                    self.count += 1
+            self.offsets = bytes(offsets)
+            return
+        with open(self.path, 'rb') as log_file, open(self.index_path, 'wb') as index_file:
+            for line in log_file:
+                index_file.write(OFFSET.pack(position))
+                position += len(line)
+                self.count += 1
+        self.index_map = None
+
+    def append(self, lines):
+        if not self.writable:
+            raise ValueError(f"{self.path} is opened read-only")
+        data = bytearray()
+        offsets = bytearray()
+        for line in lines:
+            offsets += OFFSET.pack(self.size + len(data))
+            data += line.encode('utf-8', errors='replace') + b'\n'
+        self.log_file.write(data)
+        self.index_file.write(offsets)
+        self.log_file.flush()
+        self.index_file.flush()
+        self.size += len(data)
+        self.count += len(lines)
+
+    def __len__(self):
+        return self.count
+
+    def remap(self, attribute, path, needed):
+        # Files keep growing while a run streams, so the maps are refreshed whenever a read goes past them
+        current = getattr(self, attribute)
+        if current is not None and len(current) >= needed:
+            return current
+        if current is not None:
+            current.close()
+        with open(path, 'rb') as mapped_file:
+            current = mmap.mmap(mapped_file.fileno(), 0, access=mmap.ACCESS_READ)
+        setattr(self, attribute, current)
+        return current
+
+    def offset(self, number):
+        if self.offsets is not None:
+            return OFFSET.unpack_from(self.offsets, number * OFFSET.size)[0]
+        index_map = self.remap('index_map', self.index_path, (number + 1) * OFFSET.size)
+        return OFFSET.unpack_from(index_map, number * OFFSET.size)[0]
+
+    def line(self, number):
+        if number < 0 or number >= self.count:
+            raise IndexError(number)
+        start = self.offset(number)
+        end = self.offset(number + 1) if number + 1 < self.count else self.size
+        log_map = self.remap('log_map', self.path, end)
+        return log_map[start:end].rstrip(b'\r\n').decode('utf-8', errors='replace')
+
+    def seal(self):
+        # Called once a run is over: drops the write handles, the log stays readable
+        for attribute in ('log_file', 'index_file'):
+            handle = getattr(self, attribute)
+            if handle is not None:
+                handle.close()
+                setattr(self, attribute, None)
+        self.writable = False
+
+    def close(self):
+        for attribute in ('log_map', 'index_map', 'log_file', 'index_file'):
+            handle = getattr(self, attribute)
+            if handle is not None:
+                handle.close()
+                setattr(self, attribute, None)
+
+    def discard_if_empty(self):
+        writable = self.writable
+        self.close()
+        if writable and self.count == 0:
+            for path in (self.path, self.index_path):
+                if os.path.exists(path):
+                    os.remove(path)
@@ -0,0 +1,176 @@
+import json
+import os
+import sys
+import time
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+def process_status_bytes(pid, field):
+    # A memory figure of a running process in bytes, None where /proc is not available
+    try:
+        with open(f"/proc/{pid}/status") as status_file:
+            for line in status_file:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+def process_peak_rss(pid):
+    return process_status_bytes(pid, "VmHWM")
+
+def process_rss(pid):
+    return process_status_bytes(pid, "VmRSS")
+
+def own_peak_rss():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+def percentile(values, fraction):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+# Timings and counters of one run, job, shard or worker process. All times are seconds since the
+# start, taken from the monotonic clock; marks that never happened stay None.
+class RunMetrics:
+    def __init__(self, label, kind):
+        self.label = label
+        self.kind = kind
+        self.started_at = time.time()
+        self.started = time.monotonic()
+        self.spawn = None  # Until the maigret process (or the engine search) was running
+        self.first_output = None
+        self.first_result = None
+        self.duration = None
+        self.lines = 0
+        self.results = 0
+        self.timed = False  # Whether site times are response times (engine) or arrival times (CLI)
+        self.site_times = {}  # (username, site) -> seconds
+        self.peak_rss = None  # Of the maigret process
+        self.own_peak_rss = None  # Of this process, which renders the output
+        self.ui_updates = 0
+        self.ui_time = 0.0
+        self.ui_max = 0.0
+        self.returncode = None
+
+    def elapsed(self):
+        return time.monotonic() - self.started
+
+    def mark_spawned(self):
+        self.spawn = self.elapsed()
+
+    def observe_lines(self, count):
+        if count and self.first_output is None:
+            self.first_output = self.elapsed()
+        self.lines += count
+
+    def observe_results(self, results, timed=False):
+        if results and self.first_result is None:
+            self.first_result = self.elapsed()
+        self.timed = timed
+        for result in results:
+            key = (result.username, result.site)
+            if key not in self.site_times:
+                self.results += 1
+            self.site_times[key] = result.elapsed
+
+    def observe_ui(self, seconds):
+        # Time the GUI thread spent inserting one chunk of lines or results
+        self.ui_updates += 1
+        self.ui_time += seconds
+        self.ui_max = max(self.ui_max, seconds)
+
+    def sample_rss(self, pid):
+        peak = process_peak_rss(pid)
+        if peak is not None:
+            self.peak_rss = max(self.peak_rss or 0, peak)
+
+    def finish(self, returncode=None):
+        self.duration = self.elapsed()
+        self.returncode = returncode
+        self.own_peak_rss = own_peak_rss()
+
+    def lines_per_second(self):
+        duration = self.duration if self.duration is not None else self.elapsed()
+        return self.lines / duration if duration > 0 else 0.0
+
+    def as_dict(self):
+        times = [seconds for seconds in self.site_times.values() if seconds is not None]
+        site_times = {}
+        for (username, site), seconds in self.site_times.items():
+            site_times.setdefault(username, {})[site] = seconds
+        return {
+            'label': self.label,
+            'kind': self.kind,
+            'started_at': self.started_at,
+            'duration_seconds': self.duration,
+            'spawn_seconds': self.spawn,
+            'first_output_seconds': self.first_output,
+            'first_result_seconds': self.first_result,
+            'lines': self.lines,
+            'lines_per_second': self.lines_per_second(),
+            'results': self.results,
+            'site_times_are_response_times': self.timed,
+            'site_time_p50_seconds': percentile(times, 0.5),
+            'site_time_p95_seconds': percentile(times, 0.95),
+            'site_times_seconds': site_times,
+            'peak_rss_bytes': self.peak_rss,
+            'gui_peak_rss_bytes': self.own_peak_rss,
+            'ui_updates': self.ui_updates,
+            'ui_seconds': self.ui_time,
+            'ui_max_seconds': self.ui_max,
+            'returncode': self.returncode,
+        }
+
+def write_json(file_path, metrics):
+    with open(file_path, "w", encoding="utf-8") as json_file:
+        json.dump([entry.as_dict() for entry in metrics], json_file, indent=4)
+
+# Prometheus text exposition format, one gauge family per value, each run told apart by labels
+PROMETHEUS_GAUGES = [
+    ('duration_seconds', 'Wall-clock duration of the run'),
+    ('spawn_seconds', 'Time until the maigret process or engine search was running'),
+    ('first_output_seconds', 'Time until the first output line'),
+    ('first_result_seconds', 'Time until the first site result'),
+    ('lines', 'Output lines received'),
+    ('lines_per_second', 'Output lines received per second'),
+    ('results', 'Site results received'),
+    ('site_time_p50_seconds', 'Median per-site time'),
+    ('site_time_p95_seconds', '95th percentile per-site time'),
+    ('peak_rss_bytes', 'Peak resident memory of the maigret process'),
+    ('gui_peak_rss_bytes', 'Peak resident memory of the GUI process'),
+    ('ui_seconds', 'Time the GUI thread spent rendering output and results'),
+    ('ui_max_seconds', 'Longest single GUI update'),
+]
+
+def escape_label(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def prometheus_text(metrics):
+    entries = [entry.as_dict() for entry in metrics]
+    lines = []
+    for name, help_text in PROMETHEUS_GAUGES:
+        lines.append(f"# HELP maigret_night_{name} {help_text}")
+        lines.append(f"# TYPE maigret_night_{name} gauge")
+        for entry in entries:
+            if entry[name] is None:
+                continue
+            labels = (f'label="{escape_label(entry["label"])}",kind="{entry["kind"]}",'
+                      f'started="{int(entry["started_at"])}"')
+            lines.append(f"maigret_night_{name}{{{labels}}} {entry[name]}")
+    return "\n".join(lines) + "\n"
+
+def write_prometheus(file_path, metrics):
+    # Written to a temporary name first, so a node exporter textfile collector never reads half a file
+    temporary_path = file_path + ".tmp"
+    with open(temporary_path, "w", encoding="utf-8") as prom_file:
+        prom_file.write(prometheus_text(metrics))
+    os.replace(temporary_path, file_path)
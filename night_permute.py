@@ -0,0 +1,113 @@
+import collections
+import os
+import sqlite3
+from itertools import permutations
+
+from night_log import DATA_DIR
+from night_results import CLAIMED
+
+PERMUTATIONS_PATH = os.path.join(DATA_DIR, 'permutations.sqlite')
+
+# maigret's own separators, in the order it tries them
+SEPARATORS = ("", "_", "-", ".")
+
+# Hits a pattern is credited with before any run, over this many checks: an unseen pattern ranks at a
+# 2% hit rate, between the usual shapes that have hit before and the ones that never did
+PRIOR_HITS = 1
+PRIOR_CHECKS = 50
+
+# One candidate username, with the shape it was built in so hits can be credited to that shape
+Variant = collections.namedtuple('Variant', ['username', 'separator', 'order', 'affix', 'parts', 'index'])
+
+def pattern(variant):
+    # "_|forward|suffix|2": separator, order of the parts, leading or trailing "_", number of parts
+    return f"{variant.separator}|{variant.order}|{variant.affix}|{variant.parts}"
+
+def order_of(indexes):
+    if list(indexes) == sorted(indexes):
+        return "forward"
+    if list(indexes) == sorted(indexes, reverse=True):
+        return "reverse"
+    return "mixed"
+
+def generate_variants(parts):
+    # The usernames `maigret --permute` would search for (Permute.gather('strict')): every ordering of
+    # two or more parts, joined by each separator, the plain join also with a leading and a trailing "_"
+    variants = {}
+    for count in range(2, len(parts) + 1):
+        for indexes in permutations(range(len(parts)), count):
+            joined = [parts[index] for index in indexes]
+            for separator in SEPARATORS:
+                shapes = [(separator.join(joined), "")]
+                if separator == "":
+                    shapes += [("_" + shapes[0][0], "prefix"), (shapes[0][0] + "_", "suffix")]
+                for username, affix in shapes:
+                    if username not in variants:
+                        variants[username] = Variant(username, separator, order_of(indexes), affix, count, len(variants))
+    return list(variants.values())
+
+# Checks and hits of every variant shape over earlier runs, so the shapes people actually use are tried first
+class PermutationStats:
+    def __init__(self, path=PERMUTATIONS_PATH):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.connection = sqlite3.connect(path)
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS patterns ("
+            " pattern TEXT PRIMARY KEY, checks INTEGER NOT NULL, hits INTEGER NOT NULL) WITHOUT ROWID"
+        )
+        self.connection.commit()
+
+    def record(self, variant, checks, hits):
+        with self.connection:
+            self.connection.execute(
+                "INSERT INTO patterns VALUES (?, ?, ?) ON CONFLICT (pattern) DO UPDATE SET"
+                " checks = checks + excluded.checks, hits = hits + excluded.hits",
+                (pattern(variant), checks, hits),
+            )
+
+    def rates(self):
+        rows = self.connection.execute("SELECT pattern, checks, hits FROM patterns")
+        return {key: (hits + PRIOR_HITS) / (checks + PRIOR_CHECKS) for key, checks, hits in rows}
+
+    def clear(self):
+        with self.connection:
+            self.connection.execute("DELETE FROM patterns")
+
+    def close(self):
+        self.connection.close()
+
+def rank_variants(variants, rates=None):
+    # Most likely first: learned hit rate of the shape, then plain before affixed, the given order of
+    # the parts before others, and maigret's own order
+    rates = rates or {}
+    prior = PRIOR_HITS / PRIOR_CHECKS
+    return sorted(variants, key=lambda variant: (-rates.get(pattern(variant), prior), variant.affix != "",
+                                                 variant.order != "forward", variant.index))
+
+# Which sites each variant still has to be checked on: a site drops out once `stop_after` variants hit there
+class PermutationPlan:
+    def __init__(self, sites, variants, stop_after=1):
+        self.sites = list(sites)
+        self.variants = {variant.username: variant for variant in variants}
+        self.stop_after = stop_after
+        self.hits = collections.Counter()
+        self.planned = 0  # Site checks handed out
+        self.skipped = 0  # Variants with no site left to check
+
+    def sites_for(self, username):
+        sites = [site for site in self.sites if self.hits[site] < self.stop_after]
+        self.planned += len(sites)
+        if not sites:
+            self.skipped += 1
+        return sites
+
+    def observe(self, results):
+        for result in results:
+            if result.status == CLAIMED and result.username in self.variants:
+                self.hits[result.site] += 1
+
+    def summary(self):
+        full = len(self.variants) * len(self.sites)
+        saved = 100 * (1 - self.planned / full) if full else 0
+        return (f"Permutations: {len(self.variants)} variants, {self.skipped} skipped, {self.planned} of {full} "
+                f"site checks ({saved:.0f}% saved), accounts on {len(self.hits)} sites.")
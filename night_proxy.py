@@ -0,0 +1,233 @@
+import asyncio
+import http.server
+import ipaddress
+import threading
+import time
+from urllib.parse import urlsplit
+
+from night_concurrency import is_congestion
+
+# Seconds between two rounds of health checks, and the timeout of a single probe
+CHECK_INTERVAL = 30
+CHECK_TIMEOUT = 10
+
+# A proxy is retired after this many failed probes in a row, or when more than RETIRE_ERROR_RATE
+# of the last RETIRE_WINDOW checks it carried for a job ended in congestion errors
+RETIRE_FAILURES = 3
+RETIRE_WINDOW = 40
+RETIRE_ERROR_RATE = 0.5
+
+# One egress proxy of the pool, with what the health checker and the jobs using it have seen
+class ProxyEntry:
+    def __init__(self, url, weight=1, max_jobs=1):
+        self.url = url
+        self.weight = weight
+        self.max_jobs = max_jobs
+        self.active = 0  # Jobs and shards currently using it
+        self.latency = None  # Smoothed probe latency in seconds
+        self.probes = 0
+        self.failures = 0  # Failed probes in a row
+        self.last_error = ''
+        self.window_checks = 0  # Site checks carried since the window was last reset
+        self.window_errors = 0
+        self.checks = 0
+        self.errors = 0
+        self.retired = ''  # Reason it was taken out of the rotation
+
+    def error_rate(self):
+        return self.errors / self.checks if self.checks else 0.0
+
+    def status(self):
+        if self.retired:
+            return f"Retired ({self.retired})"
+        if self.failures:
+            return f"Failing ({self.last_error})"
+        return "Healthy" if self.probes else "Unchecked"
+
+    def score(self):
+        # Higher is better: weighted, penalised for load, latency and the errors its jobs have seen
+        latency = self.latency if self.latency is not None else CHECK_TIMEOUT / 2
+        return self.weight * (1 - self.error_rate()) / ((self.active + 1) * (0.1 + latency))
+
+def parse_pool(text):
+    # One proxy per line: "URL [weight] [max jobs]", blank lines and # comments are skipped
+    entries = []
+    for line in text.splitlines():
+        fields = line.split('#', 1)[0].split()
+        if not fields:
+            continue
+        try:
+            weight = float(fields[1]) if len(fields) > 1 else 1
+            max_jobs = int(fields[2]) if len(fields) > 2 else 1
+        except ValueError:
+            raise ValueError(f"Bad proxy pool line: {line.strip()}")
+        entries.append(ProxyEntry(fields[0], max(weight, 0.01), max(max_jobs, 1)))
+    return entries
+
+# Hands proxies out to jobs and shards and keeps score of how they do. Called from the GUI thread
+# and the health checker thread, so every access goes through the lock.
+class ProxyPool:
+    def __init__(self, entries):
+        self.entries = entries
+        self.lock = threading.Lock()
+        self.events = []  # Retirement messages not yet shown to the user
+
+    def alive(self):
+        with self.lock:
+            return [entry for entry in self.entries if not entry.retired]
+
+    def acquire(self):
+        # The best scoring proxy that is in service and has a free slot, None if all are busy
+        with self.lock:
+            candidates = [entry for entry in self.entries
+                          if not entry.retired and entry.active < entry.max_jobs]
+            # Proxies failing their probes are only used when nothing else is free
+            healthy = [entry for entry in candidates if not entry.failures]
+            entry = max(healthy or candidates, key=ProxyEntry.score, default=None)
+            if entry is not None:
+                entry.active += 1
+            return entry
+
+    def release(self, entry):
+        with self.lock:
+            entry.active = max(0, entry.active - 1)
+
+    def report(self, entry, results):
+        # Site checks made through this proxy, a burst of congestion errors takes it out of the rotation
+        with self.lock:
+            for result in results:
+                congested = is_congestion(result)
+                entry.window_checks += 1
+                entry.window_errors += congested
+                entry.checks += 1
+                entry.errors += congested
+            if entry.window_checks >= RETIRE_WINDOW:
+                rate = entry.window_errors / entry.window_checks
+                entry.window_checks = 0
+                entry.window_errors = 0
+                if rate > RETIRE_ERROR_RATE and not entry.retired:
+                    self.retire(entry, f"{rate:.0%} errors")
+
+    def record_probe(self, entry, latency=None, error=''):
+        with self.lock:
+            entry.probes += 1
+            if error:
+                entry.failures += 1
+                entry.last_error = error
+                if entry.failures >= RETIRE_FAILURES and not entry.retired:
+                    self.retire(entry, f"{entry.failures} failed health checks")
+            else:
+                entry.failures = 0
+                entry.last_error = ''
+                entry.latency = latency if entry.latency is None else 0.7 * entry.latency + 0.3 * latency
+
+    def retire(self, entry, reason):
+        entry.retired = reason
+        self.events.append(f"Proxy {entry.url} retired: {reason}.")
+
+    def take_events(self):
+        with self.lock:
+            events = self.events
+            self.events = []
+            return events
+
+def is_loopback(proxy_url):
+    # Only a proxy on this host can reach the local endpoint, a remote one resolves 127.0.0.1 at home
+    try:
+        host = urlsplit(proxy_url).hostname
+    except ValueError:
+        return False
+    if host == 'localhost':
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+# Answers every GET with 204, a target the health checker can reach through the proxies on this host
+# without sending a single request to a real site
+class LocalEndpoint:
+    class Handler(http.server.BaseHTTPRequestHandler):
+        def do_GET(self):
+            self.send_response(204)
+            self.end_headers()
+
+        def log_message(self, format, *args):
+            pass
+
+    def __init__(self):
+        self.server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), self.Handler)
+        self.thread = threading.Thread(target=self.server.serve_forever, name="proxy-endpoint", daemon=True)
+        self.thread.start()
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+async def probe(proxy_url, url, timeout=CHECK_TIMEOUT):
+    # Latency of one request through the proxy, with the same transport maigret uses
+    import aiohttp
+    from aiohttp_socks import ProxyConnector
+
+    try:
+        from maigret.checking import PYTHON_SOCKS_TRANSPORT, normalize_proxy_scheme
+        proxy_url = normalize_proxy_scheme(proxy_url, PYTHON_SOCKS_TRANSPORT)
+    except ImportError:
+        pass
+    started = time.monotonic()
+    connector = ProxyConnector.from_url(proxy_url)
+    async with aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=timeout)) as session:
+        async with session.get(url) as response:
+            await response.read()
+            if response.status >= 500:
+                raise RuntimeError(f"HTTP {response.status}")
+    return time.monotonic() - started
+
+# Probes every proxy of the pool on a thread of its own, every CHECK_INTERVAL seconds
+class HealthChecker:
+    def __init__(self, pool, url=None, interval=CHECK_INTERVAL):
+        self.pool = pool
+        self.endpoint = None if url else LocalEndpoint()
+        self.url = url or self.endpoint.url
+        self.interval = interval
+        self.wake = threading.Event()
+        self.stopped = False
+        self.thread = threading.Thread(target=self.run, name="proxy-health", daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def run(self):
+        while not self.stopped:
+            asyncio.run(self.check_all())
+            self.wake.wait(self.interval)
+            self.wake.clear()
+
+    async def check_all(self):
+        await asyncio.gather(*(self.check(entry) for entry in self.pool.entries if not entry.retired))
+
+    async def check(self, entry):
+        if self.endpoint and not is_loopback(entry.url):
+            # Without a check URL a remote proxy is left unchecked, a probe of the local endpoint
+            # would fail whatever its health and retire it
+            return
+        try:
+            latency = await probe(entry.url, self.url)
+        except Exception as error:
+            self.pool.record_probe(entry, error=str(error) or type(error).__name__)
+        else:
+            self.pool.record_probe(entry, latency)
+
+    def check_now(self):
+        self.wake.set()
+
+    def stop(self):
+        self.stopped = True
+        self.wake.set()
+        if self.endpoint:
+            self.endpoint.close()
@@ -0,0 +1,93 @@
+import argparse
+import json
+import os
+import sys
+
+from night_report import report_path
+from night_results import CLAIMED, SiteResult
+
+# Renders the HTML and PDF reports of a scan from its NDJSON result stream (night_report.ReportStream).
+# The GUI starts it as a separate process once a username's stream is closed, so the template and
+# xhtml2pdf never run on the GUI thread. It also works on the stream of a scan that was killed:
+#
+#   python night_render.py reports/report_alice.ndjson --html --pdf
+
+def read_stream(path):
+    # A stream cut off mid-write ends in a partial line, everything before it is still good
+    with open(path, encoding="utf-8") as stream_file:
+        for line in stream_file:
+            try:
+                yield SiteResult(**json.loads(line))
+            except (ValueError, TypeError):
+                continue
+
+def found_results(path):
+    # Only the found accounts make it into maigret's report, so only those are kept in memory. The
+    # last result of a site wins, like in the results view.
+    from maigret.result import MaigretCheckResult, MaigretCheckStatus
+    import night_sites
+
+    username = None
+    found = {}
+    checked = set()
+    for result in read_stream(path):
+        username = username or result.username
+        checked.add(result.site)
+        if result.status != CLAIMED:
+            found.pop(result.site, None)
+            continue
+        tags = night_sites.site_tags(result.site)
+        status = MaigretCheckResult(result.username, result.site, result.url, MaigretCheckStatus.CLAIMED,
+                                    ids_data=result.ids or None, tags=tags)
+        found[result.site] = {
+            'status': status,
+            'url_user': result.url,
+            'url_main': night_sites.site_url_main(result.site),
+            'http_status': result.http_code,
+            'found': True,
+        }
+    return username, found, len(checked)
+
+def render(path, html=False, pdf=False, id_type='username', sorting='default'):
+    from maigret import report
+
+    username, results, checked = found_results(path)
+    if username is None:
+        print(f"{path} holds no results, nothing to render.", flush=True)
+        return 1
+    if sorting == 'data':
+        results = report.sort_report_by_data_points(results)
+    context = report.generate_report_context([(username, id_type, results)])
+    status = 0
+    if html:
+        file_path = report_path(username, "_plain.html", os.path.dirname(path) or ".")
+        report.save_html_report(file_path, context)
+        print(f"HTML report saved to {file_path} ({len(results)} accounts, {checked} sites).", flush=True)
+    if pdf:
+        file_path = report_path(username, ".pdf", os.path.dirname(path) or ".")
+        try:
+            report.save_pdf_report(file_path, context)
+            print(f"PDF report saved to {file_path}.", flush=True)
+        except RuntimeError as error:
+            print(f"PDF report failed: {error}", flush=True)
+            status = 1
+    return status
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Renders maigret night HTML and PDF reports from a result stream.")
+    parser.add_argument('stream', help="NDJSON result stream, reports/report_<username>.ndjson")
+    parser.add_argument('--html', action='store_true', help="write report_<username>_plain.html")
+    parser.add_argument('--pdf', action='store_true', help="write report_<username>.pdf")
+    parser.add_argument('--id-type', default='username', help="type of the identifier searched for")
+    parser.add_argument('--sorting', default='default', choices=['default', 'data'],
+                        help="'data' puts the accounts with the most extracted data first")
+    args = parser.parse_args(argv)
+
+    try:
+        return render(args.stream, args.html, args.pdf, args.id_type, args.sorting)
+    except OSError as error:
+        print(f"Could not render {args.stream}: {error}", flush=True)
+        return 1
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,124 @@
+import csv
+import json
+import os
+import time
+
+from night_results import CLAIMED
+
+# maigret's default --folderoutput, relative to the working directory
+REPORTS_DIR = "reports"
+
+def report_path(username, postfix, directory=REPORTS_DIR):
+    os.makedirs(directory, exist_ok=True)
+    username = username.replace("/", "_")
+    return os.path.join(directory, f"report_{username}{postfix}")
+
+# Same columns as maigret's own CSV report
+def write_csv_report(file_path, username, results, url_main=lambda site: ""):
+    with open(file_path, "w", newline="", encoding="utf-8") as csv_file:
+        writer = csv.writer(csv_file)
+        writer.writerow(["username", "name", "url_main", "url_user", "exists", "http_status", "error_reason"])
+        for result in results:
+            writer.writerow([
+                username,
+                result.site,
+                url_main(result.site),
+                result.url or "",
+                result.status,
+                result.http_code or 0,
+                result.error,
+            ])
+
+# Same layout as maigret's own TXT report
+def write_txt_report(file_path, username, results):
+    found = [result for result in results if result.status == CLAIMED]
+    with open(file_path, "w", encoding="utf-8") as txt_file:
+        for result in found:
+            txt_file.write(result.url + "\n")
+        txt_file.write(f"Total Websites Username Detected On : {len(found)}")
+
+# A stream is flushed after every batch of results, so a killed GUI leaves what the OS already has,
+# and fsynced once this many results or seconds have gone by, which also survives a crash of the OS
+FSYNC_EVERY = 200
+FSYNC_INTERVAL = 1.0
+
+# The reports of one username, written as its results arrive instead of when the scan ends. The NDJSON
+# file gets every new or changed result and is what HTML and PDF are rendered from (night_render.py),
+# where the last result of a site wins. CSV and TXT are appended to in the same layout as above with
+# the first result of a site, and rewritten from the last ones on close if any site changed since.
+class ReportStream:
+    def __init__(self, username, settings, url_main=lambda site: "", directory=REPORTS_DIR):
+        self.username = username
+        self.url_main = url_main
+        self.ndjson_path = report_path(username, ".ndjson", directory)
+        self.csv_path = report_path(username, ".csv", directory) if settings.get('csv') else None
+        self.txt_path = report_path(username, ".txt", directory) if settings.get('txt') else None
+        self.files = [open(self.ndjson_path, "w", encoding="utf-8")]
+        self.csv_writer = None
+        if self.csv_path:
+            self.files.append(open(self.csv_path, "w", newline="", encoding="utf-8"))
+            self.csv_writer = csv.writer(self.files[-1])
+            self.csv_writer.writerow(["username", "name", "url_main", "url_user", "exists", "http_status", "error_reason"])
+        self.txt_file = None
+        if self.txt_path:
+            self.txt_file = open(self.txt_path, "w", encoding="utf-8")
+            self.files.append(self.txt_file)
+        self.latest = {}  # site -> last result written, a retried job reports the same ones again
+        self.changed = False  # A site's result changed after CSV and TXT got its first one
+        self.unsynced = 0
+        self.synced_at = time.monotonic()
+
+    @property
+    def count(self):
+        return len(self.latest)
+
+    @property
+    def found(self):
+        return sum(result.status == CLAIMED for result in self.latest.values())
+
+    def add(self, results):
+        ndjson_file = self.files[0]
+        added = 0
+        for result in results:
+            previous = self.latest.get(result.site)
+            # A repeat differs in its timing at most
+            if previous is not None and previous._replace(elapsed=None) == result._replace(elapsed=None):
+                continue
+            self.latest[result.site] = result
+            added += 1
+            ndjson_file.write(json.dumps(result._asdict(), ensure_ascii=False) + "\n")
+            if previous is not None:
+                self.changed = True
+                continue
+            if self.csv_writer:
+                self.csv_writer.writerow([self.username, result.site, self.url_main(result.site), result.url or "",
+                                          result.status, result.http_code or 0, result.error])
+            if result.status == CLAIMED and self.txt_file:
+                self.txt_file.write(result.url + "\n")
+        self.unsynced += added
+        self.sync(force=False)
+
+    def sync(self, force=True):
+        for stream_file in self.files:
+            stream_file.flush()
+        if force or self.unsynced >= FSYNC_EVERY or time.monotonic() - self.synced_at >= FSYNC_INTERVAL:
+            for stream_file in self.files:
+                os.fsync(stream_file.fileno())
+            self.unsynced = 0
+            self.synced_at = time.monotonic()
+
+    def close(self):
+        if self.txt_file and not self.changed:
+            self.txt_file.write(f"Total Websites Username Detected On : {self.found}")
+        self.sync()
+        for stream_file in self.files:
+            stream_file.close()
+        if self.changed:
+            results = list(self.latest.values())
+            if self.csv_path:
+                write_csv_report(self.csv_path, self.username, results, self.url_main)
+            if self.txt_path:
+                write_txt_report(self.txt_path, self.username, results)
+
+    def paths(self):
+        return [path for path in (self.csv_path, self.txt_path) if path]
@@ -0,0 +1,128 @@
+import re
+import time
+from collections import namedtuple
+
+# Status values match maigret's MaigretCheckStatus so CLI and library results compare equal
+CLAIMED = "Claimed"
+AVAILABLE = "Available"
+UNKNOWN = "Unknown"
+ILLEGAL = "Illegal"
+STATUSES = (CLAIMED, AVAILABLE, UNKNOWN, ILLEGAL)
+
+# One site check, however it was obtained (parsed CLI output or the library)
+SiteResult = namedtuple(
+    'SiteResult',
+    ['username', 'site', 'url', 'status', 'http_code', 'ids', 'elapsed', 'error'],
+    defaults=(None, None, None, ''),
+)
+
+ANSI_ESCAPE = re.compile(r"\x1b\[[0-9;?]*[A-Za-z]")
+CHECKING_LINE = re.compile(r"^\[\*\] Checking (\S+) (.+) on:$")
+RESULT_LINE = re.compile(r"^\[(\+\+|\+|\?|-)\] (.+?): (.*)$")
+MIRROR_NAME = re.compile(r"^(.+?) \[.+\]$")
+
+# Turns maigret's console output back into SiteResult objects, one line at a time
+class ResultParser:
+    def __init__(self, username=None):
+        self.username = username
+        self.started = time.monotonic()
+        self.pending = None  # A found account stays open while its extracted ids are printed below it
+        self.last_key = None
+        self.line_status = None  # Status of the result on the line fed last, if it was one
+
+    def feed(self, line):
+        # Returns the results this line completes, usually none or one
+        line = ANSI_ESCAPE.sub("", line).rstrip()
+        self.line_status = None
+
+        if self.pending is not None and self.feed_ids(line):
+            return []
+        completed = self.flush()
+
+        result = self.parse(line.strip())
+        if result is None:
+            return completed
+        self.line_status = result.status
+        if result.status == CLAIMED:
+            self.pending = result
+            self.last_key = None
+        else:
+            completed.append(result)
+        return completed
+
+    def flush(self):
+        # Hands over a found account that is still waiting for more ids, e.g. at the end of the output
+        if self.pending is None:
+            return []
+        result = self.pending
+        self.pending = None
+        return [result]
+
+    def feed_ids(self, line):
+        # Ids are printed as a tree: " ├─key: value", list values continue on deeper " │ ├─ item" lines.
+        # The item lines are told apart by the space after the branch, not by their indentation,
+        # which the output batcher strips.
+        stripped = line.lstrip(" │")
+        if not stripped.startswith(("├─", "└─")):
+            return False
+        content = stripped[2:]
+        ids = dict(self.pending.ids or {})
+        if not content.startswith(" "):
+            key, _, value = content.partition(":")
+            ids[key] = value.strip()
+            self.last_key = key
+        elif self.last_key is not None:
+            values = ids.get(self.last_key)
+            ids[self.last_key] = (values if isinstance(values, list) else []) + [content.strip()]
+        self.pending = self.pending._replace(ids=ids)
+        return True
+
+    def parse(self, line):
+        checking = CHECKING_LINE.match(line)
+        if checking:
+            self.username = checking.group(2)
+            return None
+
+        match = RESULT_LINE.match(line)
+        if not match:
+            return None
+        symbol, name, appendix = match.groups()
+
+        # Banners use the same brackets, only lines shaped like a site check are results
+        if symbol in ("+", "++", "?") and appendix.startswith(("http://", "https://")):
+            status = CLAIMED
+        elif symbol == "?":
+            status = UNKNOWN
+        elif symbol == "-" and appendix.startswith("Not found!"):
+            status = AVAILABLE
+        elif symbol == "-" and appendix.startswith("Illegal Username Format"):
+            status = ILLEGAL
+        else:
+            return None
+
+        url = appendix.split()[0] if status == CLAIMED else None
+        error = appendix if status == UNKNOWN else ''
+        # The CLI doesn't print timings, the time since the run started is the closest it gets
+        elapsed = round(time.monotonic() - self.started, 2)
+        return SiteResult(self.username, site_name(name), url, status, elapsed=elapsed, error=error)
+
+# Mirrors are shown as "name [source site]", results are keyed by the bare name
+def site_name(name):
+    mirror = MIRROR_NAME.match(name)
+    return mirror.group(1) if mirror else name
+
+# The console line maigret itself would print for a result, with extracted ids as a tree below it
+def format_result_lines(result):
+    if result.status == CLAIMED:
+        lines = [f"[+] {result.site}: {result.url}"]
+    elif result.status == AVAILABLE:
+        lines = [f"[-] {result.site}: Not found!"]
+    elif result.status == ILLEGAL:
+        lines = [f"[-] {result.site}: Illegal Username Format For This Site!"]
+    else:
+        lines = [f"[?] {result.site}: {result.error or 'Unknown error'}"]
+    items = list((result.ids or {}).items())
+    for number, (key, value) in enumerate(items):
+        branch = "└─" if number == len(items) - 1 else "├─"
+        lines.append(f" {branch}{key}: {value}")
+    return lines
@@ -0,0 +1,99 @@
+import io
+import queue
+import threading
+import time
+
+# Collects output lines and releases them in chunks once a size or time threshold is hit
+class OutputBatcher:
+    def __init__(self, max_lines=500, max_delay=0.05):
+        self.max_lines = max_lines
+        self.max_delay = max_delay
+        self.pending = []
+        self.pending_since = None
+        self.lines = 0
+        self.batches = 0
+        self.dropped = 0
+
+    def add(self, line):
+        # Progress bars redraw in place with carriage returns, only the last frame is worth showing
+        frames = [frame for frame in line.split('\r') if frame.strip()]
+        if len(frames) > 1:
+            self.dropped += len(frames) - 1
+        line = frames[-1].strip() if frames else ''
+
+        if not self.pending:
+            self.pending_since = time.monotonic()
+        self.pending.append(line)
+        self.lines += 1
+
+    def time_left(self):
+        # How long the caller may wait for more input before a flush is due
+        if not self.pending:
+            return self.max_delay
+        return max(0.0, self.pending_since + self.max_delay - time.monotonic())
+
+    def is_due(self):
+        return len(self.pending) >= self.max_lines or (bool(self.pending) and self.time_left() == 0.0)
+
+    def take(self):
+        chunk = self.pending
+        self.pending = []
+        self.pending_since = None
+        if chunk:
+            self.batches += 1
+        return chunk
+
+    def stats(self):
+        return {
+            'lines': self.lines,
+            'batches': self.batches,
+            'merged': self.lines - self.batches,
+            'dropped': self.dropped,
+        }
+
+def read_output(stream, lines):
+    for line in stream:
+        lines.put(line)
+    lines.put(None)
+
+def pump_output(process, batcher, flush):
+    # Feeds the output of a running maigret process through the batcher, calling flush(final) every
+    # time a chunk is due and once more when the output ends, then waits for the process to exit
+    # Split on newlines only, so carriage-return redraws stay inside their line
+    stream = io.TextIOWrapper(process.stdout, errors='replace', newline='\n')
+
+    # Read on a helper thread so a quiet process can't hold back lines that are already buffered
+    lines = queue.Queue()
+    reader = threading.Thread(target=read_output, args=(stream, lines), daemon=True)
+    reader.start()
+
+    finished = False
+    while not finished:
+        try:
+            line = lines.get(timeout=batcher.time_left())
+        except queue.Empty:
+            line = ''
+        if line is None:
+            finished = True
+        elif line:
+            batcher.add(line.rstrip('\r\n'))
+
+        if finished or batcher.is_due():
+            flush(finished)
+
+    process.wait()
+
+def split_chunk(chunk, parser, batcher, hidden_statuses=(), final=False):
+    # Parses a chunk of output into (lines to show, completed results)
+    lines = []
+    results = []
+    for line in chunk:
+        results.extend(parser.feed(line))
+        # Checks the run only prints for tracking are kept out of the view
+        if parser.line_status in hidden_statuses:
+            batcher.dropped += 1
+            continue
+        lines.append(line)
+    if final:
+        results.extend(parser.flush())
+    return lines, results
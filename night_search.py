@@ -0,0 +1,243 @@
+import array
+import bisect
+import glob
+import os
+import re
+
+from night_log import LOG_DIR, LogSpool
+
+TOKEN = re.compile(r"[0-9a-z]+")
+
+# maigret's line markers, the line's status is indexed as a token of its own ("status:claimed")
+MARKER = re.compile(r"(?:^|\r)\s*\[(\+\+|\+|-|\?|!|\*)\] ")
+MARKER_STATUSES = {"+": "claimed", "++": "claimed", "-": "available", "?": "unknown", "!": "notice", "*": "info"}
+STATUS_NAMES = {
+    "claimed": "claimed", "found": "claimed",
+    "available": "available", "notfound": "available",
+    "unknown": "unknown", "error": "unknown", "errors": "unknown",
+    "notice": "notice", "info": "info",
+}
+
+def line_status(line):
+    match = MARKER.search(line)
+    return MARKER_STATUSES[match.group(1)] if match else None
+
+def regex_literals(pattern):
+    # Letter and digit runs every match of the pattern must contain, to narrow a regex down to the
+    # lines holding them. Alternations, groups and lookarounds are not worth the trouble: none.
+    if "|" in pattern or "(" in pattern:
+        return []
+    runs = []
+    run = ""
+    position = 0
+    while position < len(pattern):
+        character = pattern[position]
+        if character == "\\":
+            runs.append(run)
+            run = ""
+            position += 2
+            continue
+        if character == "[":
+            # Skip the class, a "]" right after "[" or "[^" is part of it
+            runs.append(run)
+            run = ""
+            position += 1
+            if position < len(pattern) and pattern[position] == "^":
+                position += 1
+            if position < len(pattern) and pattern[position] == "]":
+                position += 1
+            while position < len(pattern) and pattern[position] != "]":
+                position += 2 if pattern[position] == "\\" else 1
+        elif character in "?*{":
+            # The quantifier makes the character before it optional, the bounds of {m,n} are no literal
+            runs.append(run[:-1])
+            run = ""
+            if character == "{":
+                end = pattern.find("}", position)
+                position = end if end >= 0 else len(pattern)
+        elif character.isascii() and character.isalnum():
+            run += character.lower()
+        else:
+            runs.append(run)
+            run = ""
+        position += 1
+    runs.append(run)
+    return [run for run in runs if len(run) > 1]
+
+def line_tokens(line):
+    tokens = set(TOKEN.findall(line.lower()))
+    status = line_status(line)
+    if status:
+        tokens.add("status:" + status)
+    return tokens
+
+# Inverted index of one log: token -> ids of the lines holding it, in line order. Lines are only ever
+# appended, so the postings stay sorted and a streaming run updates the index as it goes.
+class LineIndex:
+    def __init__(self):
+        self.postings = {}
+        self.vocabulary = []  # Sorted, for prefix lookups
+        self.count = 0
+
+    def add(self, lines):
+        for line in lines:
+            for token in line_tokens(line):
+                posting = self.postings.get(token)
+                if posting is None:
+                    posting = self.postings[token] = array.array('I')
+                    bisect.insort(self.vocabulary, token)
+                posting.append(self.count)
+            self.count += 1
+
+    def lookup(self, prefix):
+        # Lines with a token starting with `prefix`, so a filter matches while it is being typed
+        start = bisect.bisect_left(self.vocabulary, prefix)
+        end = bisect.bisect_left(self.vocabulary, prefix + "\uffff")
+        if end - start == 1:
+            return set(self.postings[self.vocabulary[start]])
+        lines = set()
+        for token in self.vocabulary[start:end]:
+            lines.update(self.postings[token])
+        return lines
+
+    def containing(self, literal):
+        # Lines with a token holding `literal` anywhere, for the literals of a regex
+        lines = set()
+        for token in self.vocabulary:
+            if literal in token:
+                lines.update(self.postings[token])
+        return lines
+
+    def exact(self, token):
+        return set(self.postings.get(token, ()))
+
+def index_spool(spool):
+    index = LineIndex()
+    index.add(spool.line(number) for number in range(len(spool)))
+    return index
+
+# A filter typed into the output view. Terms are ANDed:
+#   word         lines with a token starting with it; words with punctuation ("github.com") must also
+#                appear as typed
+#   status:name  lines with that status marker: found, available, error, info, notice
+#   /regex/      case-insensitive regex, run only on the lines the other terms and the letters and
+#                digits the regex can't match without left
+class LogQuery:
+    def __init__(self, text):
+        self.text = text.strip()
+        self.words = []
+        self.statuses = []
+        self.regexes = []
+        for term in self.text.split():
+            if len(term) > 1 and term.startswith("/") and term.endswith("/"):
+                try:
+                    self.regexes.append(re.compile(term[1:-1], re.IGNORECASE))
+                except re.error as error:
+                    raise ValueError(f"Bad regex {term}: {error}")
+            elif term.lower().startswith("status:"):
+                name = term[len("status:"):].lower()
+                if name not in STATUS_NAMES:
+                    raise ValueError(f"Unknown status {name}, use one of {', '.join(sorted(STATUS_NAMES))}")
+                self.statuses.append(STATUS_NAMES[name])
+            else:
+                self.words.append(term.lower())
+
+    def __bool__(self):
+        return bool(self.text)
+
+    def word_tokens(self, word):
+        return TOKEN.findall(word)
+
+    def needs_check(self, word):
+        # A word that is one token is answered by the index alone
+        return self.word_tokens(word) != [word]
+
+    def matches(self, line):
+        # The same test as search(), line by line, for lines arriving after the index was queried
+        tokens = line_tokens(line)
+        lowered = line.lower()
+        for word in self.words:
+            for part in self.word_tokens(word):
+                if not any(token.startswith(part) for token in tokens):
+                    return False
+            if self.needs_check(word) and word not in lowered:
+                return False
+        if any("status:" + status not in tokens for status in self.statuses):
+            return False
+        return all(regex.search(line) for regex in self.regexes)
+
+    def search(self, index, line_at):
+        # Sorted ids of the matching lines: postings are intersected, smallest first, and only the
+        # candidates left are read back from the log to check punctuation and regexes
+        sets = []
+        for word in self.words:
+            sets += [index.lookup(part) for part in self.word_tokens(word)]
+        sets += [index.exact("status:" + status) for status in self.statuses]
+        for regex in self.regexes:
+            sets += [index.containing(literal) for literal in regex_literals(regex.pattern)]
+        if sets:
+            sets.sort(key=len)
+            candidates = sets[0].intersection(*sets[1:])
+        else:
+            candidates = range(index.count)
+
+        checked = [word for word in self.words if self.needs_check(word)]
+        if not checked and not self.regexes:
+            return sorted(candidates)
+        result = []
+        for number in sorted(candidates):
+            line = line_at(number)
+            lowered = line.lower()
+            if all(word in lowered for word in checked) and all(regex.search(line) for regex in self.regexes):
+                result.append(number)
+        return result
+
+    def highlight(self):
+        # One pattern for every span worth highlighting in a matching line
+        parts = [re.escape(word) for word in self.words if word] + [regex.pattern for regex in self.regexes]
+        if not parts:
+            return None
+        return re.compile("|".join(f"(?:{part})" for part in parts), re.IGNORECASE)
+
+# Indexes of the finished run logs, kept while the window is open and rebuilt when a log has grown.
+# The logs of running jobs are left out by the caller, and never have their sidecar rewritten here.
+class LogLibrary:
+    def __init__(self, directory=LOG_DIR):
+        self.directory = directory
+        self.logs = {}  # path -> (spool, index)
+
+    def refresh(self, exclude=()):
+        # Runs on a thread of its own, the new set of logs replaces the old one in one assignment so
+        # searches on the GUI thread never see it half built. Replaced spools are left to the garbage
+        # collector, a filtered view may still be reading them. Returns whether anything changed.
+        logs = {}
+        changed = False
+        for path in sorted(glob.glob(os.path.join(self.directory, "*.log"))):
+            if path in exclude:
+                continue
+            known = self.logs.get(path)
+            try:
+                if known and known[0].size == os.path.getsize(path):
+                    logs[path] = known
+                    continue
+                spool = LogSpool.open(path, read_only=True)
+                logs[path] = (spool, index_spool(spool))
+                changed = True
+            except (OSError, ValueError):
+                continue
+        changed = changed or len(logs) != len(self.logs)
+        self.logs = logs
+        return changed
+
+    def search(self, query, exclude=()):
+        # [(spool, line ids)] for every indexed log with a match, oldest log first
+        hits = []
+        logs = self.logs
+        for path in sorted(logs):
+            if path in exclude:
+                continue
+            spool, index = logs[path]
+            numbers = query.search(index, spool.line)
+            if numbers:
+                hits.append((spool, numbers))
+        return hits
@@ -0,0 +1,69 @@
+import json
+import os
+import sys
+
+from night_command import split_sites, split_tags
+
+# maigret scans its top 500 sites when neither --all-sites nor --top-sites is given
+DEFAULT_TOP_SITES = 500
+
+_database = None
+_tags = None
+
+def database_path():
+    import maigret
+
+    try:
+        from maigret.db_updater import resolve_db_path
+        # Same file the CLI would pick, without triggering its auto-update check
+        return resolve_db_path("resources/data.json", no_autoupdate=True)
+    except (ImportError, FileNotFoundError):
+        return os.path.join(os.path.dirname(maigret.__file__), "resources", "data.json")
+
+def load_database():
+    # maigret is only needed here as a library, the site database is parsed once per session
+    global _database
+    if _database is None:
+        from maigret.sites import MaigretDatabase
+        _database = MaigretDatabase().load_from_path(database_path())
+    return _database
+
+def select_sites(settings):
+    # Mirrors the CLI's own site selection, so a sharded run checks exactly what a single run would
+    database = load_database()
+    if settings.get('all_sites'):
+        top = sys.maxsize
+    elif settings.get('top_sites'):
+        top = settings.get('top_sites_count', 10)
+    else:
+        top = DEFAULT_TOP_SITES
+    tags = split_tags(settings.get('tags', ''))
+    sites = database.ranked_sites_dict(
+        top=top,
+        tags=tags.split(",") if tags else [],
+        names=split_sites(settings.get('site', '')),
+        disabled=settings.get('use_disabled_sites', False),
+        id_type=settings.get('id_type', 'username'),
+    )
+    return list(sites)
+
+def site_tags(name):
+    # Read straight from the JSON, much cheaper than building the full database just for tags
+    global _tags
+    if _tags is None:
+        try:
+            with open(database_path(), encoding="utf-8") as data_file:
+                sites = json.load(data_file).get("sites", {})
+            _tags = {site: data.get("tags", []) for site, data in sites.items()}
+        except (ImportError, OSError, ValueError):
+            _tags = {}
+    return _tags.get(name, [])
+
+def site_url_main(name):
+    site = load_database().sites_dict.get(name)
+    return site.url_main if site else ""
+
+def make_shards(sites, count):
+    # Deal sites out round-robin so every shard gets a similar mix of big and small sites
+    count = max(1, min(count, len(sites)))
+    return [sites[number::count] for number in range(count)]
@@ -0,0 +1,60 @@
+import os
+
+import pytest
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+pytest.importorskip('PyQt6')
+
+from maigret_night import BatchQueue
+from night_concurrency import ConcurrencyController
+from night_results import SiteResult, UNKNOWN
+
+# Runs fill() and connection_share() as they are, only no maigret process is started
+class CountingQueue(BatchQueue):
+    def start_job(self, job, proxy=None, agent=None):
+        job.max_connections = self.connection_share()
+        job.status = "Running"
+        self.running.append(job)
+
+    def finish(self, count):
+        for job in self.running[:count]:
+            self.running.remove(job)
+            job.status = "Done"
+        self.fill()
+
+    def in_flight(self):
+        return sum(job.max_connections for job in self.running)
+
+@pytest.mark.parametrize("pool_size, budget", [(8, 4), (3, 10), (4, 10), (2, 1), (5, 17)])
+def test_jobs_joining_later_stay_within_the_budget(pool_size, budget):
+    queue = CountingQueue({'max_connections': budget}, pool_size)
+    queue.add("alice")
+    queue.start()
+    assert queue.in_flight() <= budget
+    # Identities found by the crawl, then retries, join while the first jobs still run
+    for round_number in range(5):
+        for number in range(3):
+            queue.add(f"user{round_number}-{number}")
+        queue.fill()
+        assert queue.in_flight() <= budget
+        assert len(queue.running) <= min(pool_size, budget)
+        queue.finish(1)
+        assert queue.in_flight() <= budget
+    while queue.running:
+        queue.finish(len(queue.running))
+    assert all(job.status == "Done" for job in queue.jobs)
+
+def test_a_shrinking_budget_holds_new_jobs_back():
+    controller = ConcurrencyController(12, 2, 12, min_samples=1)
+    queue = CountingQueue({'max_connections': 12}, 4, controller=controller)
+    for number in range(8):
+        queue.add(f"user{number}")
+    queue.start()
+    assert queue.in_flight() == 12
+    controller.observe([SiteResult("user0", "Site", None, UNKNOWN, error="Request timeout")])
+    queue.finish(1)
+    # The budget is halved to 6, the three jobs still running already use 9 connections
+    assert controller.limit == 6
+    assert len(queue.running) == 3
+    queue.finish(2)
+    assert queue.in_flight() <= 6
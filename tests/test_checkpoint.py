@@ -0,0 +1,42 @@
+import os
+
+from night_checkpoint import Checkpoint, latest_checkpoint
+from night_results import AVAILABLE, CLAIMED, SiteResult
+
+SETTINGS = {'username': "alice bob"}
+
+def result(username, site, status=CLAIMED):
+    return SiteResult(username, site, None, status, None, {}, 0.1, "")
+
+def test_results_survive_a_reopen(tmp_path):
+    checkpoint = Checkpoint.create(SETTINGS, ["GitHub", "VK"], directory=str(tmp_path))
+    checkpoint.add([result("alice", "GitHub"), result("alice", "VK", AVAILABLE)])
+    checkpoint.add([result("bob", "GitHub")])
+    checkpoint.close()
+
+    reopened = Checkpoint.open(latest_checkpoint(str(tmp_path)))
+    assert reopened.settings == SETTINGS
+    assert reopened.sites == ["GitHub", "VK"]
+    assert reopened.results[("alice", "VK")].status == AVAILABLE
+    assert reopened.remaining(["GitHub", "VK", "Reddit"]) == ["VK", "Reddit"]
+    reopened.discard()
+    assert latest_checkpoint(str(tmp_path)) is None
+
+def test_cut_off_line_is_truncated_before_resuming(tmp_path):
+    checkpoint = Checkpoint.create(SETTINGS, directory=str(tmp_path))
+    checkpoint.add([result("alice", "GitHub")])
+    checkpoint.close()
+    intact = os.path.getsize(checkpoint.path)
+    # A crash in the middle of a write leaves half a line behind
+    with open(checkpoint.path, 'a', encoding='utf-8') as checkpoint_file:
+        checkpoint_file.write('{"username": "alice", "site": "V')
+
+    resumed = Checkpoint.open(checkpoint.path)
+    assert os.path.getsize(checkpoint.path) == intact
+    assert list(resumed.results) == [("alice", "GitHub")]
+    resumed.add([result("alice", "VK")])
+    resumed.close()
+
+    reopened = Checkpoint.open(checkpoint.path)
+    assert sorted(reopened.results) == [("alice", "GitHub"), ("alice", "VK")]
+    reopened.close()
@@ -0,0 +1,37 @@
+from night_concurrency import ConcurrencyController, is_congestion
+from night_results import AVAILABLE, CLAIMED, UNKNOWN, SiteResult
+
+def result(status=AVAILABLE, http_code=None, error=""):
+    return SiteResult("alice", "Site", None, status, http_code, {}, 0.1, error)
+
+def test_congestion_errors():
+    assert is_congestion(result(UNKNOWN, error="Request timeout"))
+    assert is_congestion(result(UNKNOWN, error="Connecting failure: cannot connect"))
+    assert is_congestion(result(CLAIMED, http_code=429))
+    assert not is_congestion(result(UNKNOWN, error="Captcha detected"))
+    assert not is_congestion(result(AVAILABLE))
+
+def test_budget_grows_additively_and_shrinks_multiplicatively():
+    controller = ConcurrencyController(10, 2, 14, min_samples=10)
+    controller.observe([result()] * 10)
+    assert controller.adjust() == 12
+    controller.observe([result()] * 10)
+    assert controller.adjust() == 14
+    controller.observe([result()] * 10)
+    assert controller.adjust() == 14  # Capped at the maximum
+
+    controller.observe([result()] * 9 + [result(UNKNOWN, error="Rate limited")])
+    assert controller.adjust() == 7
+    for _ in range(3):
+        controller.observe([result(UNKNOWN, error="Request timeout")] * 10)
+        controller.adjust()
+    assert controller.limit == 2  # Floored at the minimum
+    assert [limit for _, limit, _ in controller.history] == [10, 12, 14, 7, 3, 2]
+
+def test_budget_is_kept_until_enough_checks():
+    controller = ConcurrencyController(10, 2, 20, min_samples=10)
+    controller.observe([result(UNKNOWN, error="Request timeout")] * 9)
+    assert controller.adjust() == 10
+    controller.observe([result()])
+    assert controller.adjust() == 5
+    assert controller.error_rate() == 0.9
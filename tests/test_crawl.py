@@ -0,0 +1,69 @@
+import re
+
+from night_crawl import Crawl, VisitedStore, extract_identities, is_plausible_username
+from night_results import ResultParser
+from night_runner import OutputBatcher, split_chunk
+
+CLI_OUTPUT = """\
+[*] Checking username alice on:
+[+] VK: https://vk.com/alice
+ ├─vk_id: 1234
+ ├─usernames: 
+ │ ├─ alice_v
+ │ ├─ --self-check
+ │ └─ https://not.a/username
+ ├─fullname: Alice Example
+ └─links: 
+   ├─ https://github.com/alice-gh
+   └─ https://unknown.example/page
+[-] GitHub: Not found!
+"""
+
+# Matches profile links the way maigret's database does, for the one site the test knows
+class SiteDatabase:
+    def extract_ids_from_url(self, url):
+        match = re.match(r"https://github\.com/([^/]+)$", url)
+        return {match.group(1): "username"} if match else {}
+
+def parse(output):
+    batcher = OutputBatcher()
+    for line in output.splitlines():
+        batcher.add(line)
+    _, results = split_chunk(batcher.take(), ResultParser(), batcher, final=True)
+    return results
+
+def test_cli_output_feeds_the_crawl():
+    crawl = Crawl(max_depth=2, budget=10, database=SiteDatabase())
+    crawl.add_seed("alice", "username")
+    found = crawl.discover(parse(CLI_OUTPUT), depth=0)
+    assert sorted(found) == [
+        ("1234", "vk_id", "VK"),
+        ("alice-gh", "username", "VK"),
+        ("alice_v", "username", "VK"),
+    ]
+
+def test_flags_and_urls_are_not_identities():
+    assert not is_plausible_username("--self-check")
+    assert not is_plausible_username("-h")
+    assert not is_plausible_username("https://vk.com/alice")
+    assert not is_plausible_username("alice@example.com")
+    assert is_plausible_username("alice-gh")
+    result = parse(CLI_OUTPUT)[0]._replace(ids={'vk_id': '-h', 'username': '--stats'})
+    assert extract_identities(result) == {}
+
+def test_depth_budget_and_repeats():
+    results = parse(CLI_OUTPUT)
+    crawl = Crawl(max_depth=1, budget=2, database=SiteDatabase())
+    assert len(crawl.discover(results, depth=0)) == 2
+    assert crawl.skipped_limits == 1
+    assert crawl.discover(results, depth=0) == []
+    assert Crawl(max_depth=1).discover(results, depth=1) == []
+
+def test_recently_visited_identities_are_skipped(tmp_path):
+    visited = VisitedStore(str(tmp_path / "visited.sqlite"))
+    visited.add("Alice_V", "username")
+    crawl = Crawl(visited=visited, database=SiteDatabase())
+    found = crawl.discover(parse(CLI_OUTPUT), depth=0)
+    assert "alice_v" not in [identifier for identifier, _, _ in found]
+    assert crawl.skipped_visited == 1
+    visited.close()
@@ -0,0 +1,65 @@
+import http.client
+import json
+import threading
+
+import pytest
+
+from night_daemon import JobManager, check_job, make_server
+
+@pytest.fixture
+def daemon(tmp_path):
+    def start(token=None):
+        manager = JobManager(max_jobs=1, directory=str(tmp_path / "jobs"))
+        server = make_server(manager, port=0, token=token)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append((server, manager))
+        return server.server_address[1]
+
+    servers = []
+    yield start
+    for server, manager in servers:
+        server.shutdown()
+        server.server_close()
+        manager.stop()
+
+def request(port, method, path, body=None, headers=None):
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=5)
+    try:
+        connection.request(method, path, body=body, headers=headers or {})
+        response = connection.getresponse()
+        return response.status, json.loads(response.read() or b'{}')
+    finally:
+        connection.close()
+
+def test_flags_in_usernames_and_sites_are_refused():
+    check_job({'username': 'alice bob', 'site': 'GitHub, VK'}, {'sites': ['GitLab']})
+    for settings, overrides in [({'username': 'alice --self-check'}, {}),
+                                ({'username': 'alice', 'site': '-h'}, {}),
+                                ({}, {'username': '--stats'}),
+                                ({}, {'sites': ['GitHub', '--all-sites']}),
+                                ({}, {'sites': 'GitHub'})]:
+        with pytest.raises(ValueError):
+            check_job(settings, overrides)
+
+def test_cross_origin_requests_are_refused(daemon):
+    port = daemon()
+    assert request(port, 'GET', '/health')[0] == 200
+    assert request(port, 'GET', '/health', headers={'Host': 'evil.example'})[0] == 403
+    body = json.dumps({'settings': {'username': 'alice'}})
+    assert request(port, 'POST', '/jobs', body, {'Content-Type': 'text/plain'})[0] == 415
+    assert request(port, 'POST', '/jobs', json.dumps({'settings': {'username': '-h'}}),
+                   {'Content-Type': 'application/json'})[0] == 400
+
+def test_token_is_required_when_set(daemon):
+    port = daemon(token='s3cret')
+    assert request(port, 'GET', '/jobs')[0] == 401
+    assert request(port, 'GET', '/jobs', headers={'Authorization': 'Bearer wrong'})[0] == 401
+    assert request(port, 'GET', '/jobs', headers={'Authorization': 'Bearer s3cret'}) == (200, {'jobs': []})
+
+def test_only_event_logs_are_cleaned_up(tmp_path):
+    directory = tmp_path / "jobs"
+    directory.mkdir()
+    (directory / "0123456789ab.ndjson").write_text("{}\n")
+    (directory / "results.ndjson").write_text("{}\n")
+    JobManager(max_jobs=1, directory=str(directory)).stop()
+    assert sorted(path.name for path in directory.iterdir()) == ["results.ndjson"]
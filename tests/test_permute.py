@@ -0,0 +1,42 @@
+from night_permute import PermutationPlan, PermutationStats, generate_variants, pattern, rank_variants
+from night_results import AVAILABLE, CLAIMED, SiteResult
+
+def result(username, site, status=CLAIMED):
+    return SiteResult(username, site, None, status, None, {}, 0.1, "")
+
+def test_variants_match_maigret_permute():
+    usernames = [variant.username for variant in generate_variants(["john", "doe"])]
+    assert usernames == [
+        "johndoe", "_johndoe", "johndoe_", "john_doe", "john-doe", "john.doe",
+        "doejohn", "_doejohn", "doejohn_", "doe_john", "doe-john", "doe.john",
+    ]
+    assert len(set(usernames)) == len(usernames)
+
+def test_plain_forward_variants_rank_first_without_history():
+    ranked = rank_variants(generate_variants(["john", "doe"]))
+    assert [variant.username for variant in ranked[:4]] == ["johndoe", "john_doe", "john-doe", "john.doe"]
+    assert ranked[-1].username == "doejohn_"
+
+def test_learned_rates_reorder_variants(tmp_path):
+    variants = generate_variants(["john", "doe"])
+    by_name = {variant.username: variant for variant in variants}
+    stats = PermutationStats(str(tmp_path / "permutations.sqlite"))
+    stats.record(by_name["doe.john"], checks=10, hits=5)
+    stats.record(by_name["johndoe"], checks=100, hits=0)
+    rates = stats.rates()
+    stats.close()
+    assert rates[pattern(by_name["doe.john"])] == 6 / 60
+    ranked = rank_variants(variants, rates)
+    assert ranked[0].username == "doe.john"
+    assert ranked[-1].username == "johndoe"
+
+def test_plan_stops_sites_after_k_hits():
+    variants = rank_variants(generate_variants(["john", "doe"]))
+    plan = PermutationPlan(["GitHub", "VK"], variants, stop_after=1)
+    assert plan.sites_for("johndoe") == ["GitHub", "VK"]
+    plan.observe([result("johndoe", "GitHub"), result("johndoe", "VK", AVAILABLE)])
+    assert plan.sites_for("john_doe") == ["VK"]
+    plan.observe([result("john_doe", "VK"), result("someone_else", "VK")])
+    assert plan.sites_for("john-doe") == []
+    assert (plan.planned, plan.skipped) == (3, 1)
+    assert plan.hits == {"GitHub": 1, "VK": 1}
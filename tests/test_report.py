@@ -0,0 +1,40 @@
+import csv
+
+from night_render import read_stream
+from night_report import ReportStream
+from night_results import AVAILABLE, CLAIMED, SiteResult
+
+def result(site, status=CLAIMED, http_code=None, elapsed=0.1):
+    url = f"https://{site.lower()}.example/alice" if status == CLAIMED else None
+    return SiteResult("alice", site, url, status, http_code, {}, elapsed, "")
+
+def last_per_site(path):
+    return {item.site: item for item in read_stream(path)}
+
+def test_repeated_results_are_written_once(tmp_path):
+    stream = ReportStream("alice", {'csv': True, 'txt': True}, directory=str(tmp_path))
+    stream.add([result("GitHub"), result("VK", AVAILABLE)])
+    # A retry on another agent reports the same sites again
+    stream.add([result("GitHub", elapsed=0.5), result("VK", AVAILABLE, elapsed=0.7)])
+    stream.close()
+    assert len(list(read_stream(stream.ndjson_path))) == 2
+    assert (stream.count, stream.found) == (2, 1)
+    with open(stream.csv_path, newline="", encoding="utf-8") as csv_file:
+        assert len(list(csv.reader(csv_file))) == 3
+    with open(stream.txt_path, encoding="utf-8") as txt_file:
+        assert txt_file.read() == "https://github.example/alice\nTotal Websites Username Detected On : 1"
+
+def test_the_last_result_of_a_site_wins(tmp_path):
+    stream = ReportStream("alice", {'csv': True, 'txt': True}, directory=str(tmp_path))
+    stream.add([result("GitHub"), result("VK")])
+    stream.add([result("GitHub", http_code=200), result("VK", AVAILABLE, http_code=404)])
+    stream.close()
+    latest = last_per_site(stream.ndjson_path)
+    assert latest["GitHub"].http_code == 200
+    assert latest["VK"].status == AVAILABLE
+    assert (stream.count, stream.found) == (2, 1)
+    with open(stream.csv_path, newline="", encoding="utf-8") as csv_file:
+        rows = list(csv.reader(csv_file))[1:]
+    assert [(row[1], row[4], row[5]) for row in rows] == [("GitHub", CLAIMED, "200"), ("VK", AVAILABLE, "404")]
+    with open(stream.txt_path, encoding="utf-8") as txt_file:
+        assert txt_file.read() == "https://github.example/alice\nTotal Websites Username Detected On : 1"
@@ -0,0 +1,70 @@
+from night_results import AVAILABLE, CLAIMED, UNKNOWN, ResultParser, format_result_lines
+from night_runner import OutputBatcher, split_chunk
+
+# What maigret 0.6 prints for a found account with extracted ids, list values as nested trees
+CLI_OUTPUT = """\
+[*] Checking username alice on:
+[+] VK: https://vk.com/alice
+ ├─uid: 123
+ ├─usernames: 
+ │ ├─ alice_v
+ │ └─ alice.vk
+ ├─fullname: Alice Example
+ └─links: 
+   ├─ https://x.example/alice
+   └─ https://links.example/x
+[-] GitHub: Not found!
+[?] Reddit: Request timeout
+"""
+
+EXPECTED_IDS = {
+    'uid': '123',
+    'usernames': ['alice_v', 'alice.vk'],
+    'fullname': 'Alice Example',
+    'links': ['https://x.example/alice', 'https://links.example/x'],
+}
+
+def feed_all(parser, lines):
+    results = []
+    for line in lines:
+        results += parser.feed(line)
+    return results + parser.flush()
+
+def test_parses_statuses_and_nested_ids():
+    results = feed_all(ResultParser(), CLI_OUTPUT.splitlines())
+    assert [(result.site, result.status) for result in results] == [
+        ("VK", CLAIMED), ("GitHub", AVAILABLE), ("Reddit", UNKNOWN),
+    ]
+    assert results[0].username == "alice"
+    assert results[0].url == "https://vk.com/alice"
+    assert results[0].ids == EXPECTED_IDS
+    assert results[2].error == "Request timeout"
+
+def test_nested_ids_survive_the_output_batcher():
+    # The batcher strips every line, the last list of the tree loses its indentation
+    batcher = OutputBatcher()
+    for line in CLI_OUTPUT.splitlines():
+        batcher.add(line)
+    lines, results = split_chunk(batcher.take(), ResultParser(), batcher, final=True)
+    assert "└─ https://links.example/x" in lines
+    assert results[0].ids == EXPECTED_IDS
+
+def test_found_account_is_completed_by_the_next_result():
+    parser = ResultParser("bob")
+    assert parser.feed("[+] GitLab: https://gitlab.com/bob") == []
+    assert parser.line_status == CLAIMED
+    completed = parser.feed("[-] GitHub: Not found!")
+    assert [result.site for result in completed] == ["GitLab", "GitHub"]
+
+def test_banners_and_mirrors():
+    parser = ResultParser("bob")
+    assert parser.feed("[+] Using the sites database") == []
+    assert parser.feed("[-] Starting a search on top 500 sites") == []
+    results = feed_all(parser, ["[+] Twitter [Nitter]: https://nitter.net/bob"])
+    assert results[0].site == "Twitter"
+
+def test_format_result_lines_round_trips():
+    results = feed_all(ResultParser(), CLI_OUTPUT.splitlines())
+    lines = format_result_lines(results[0]._replace(ids={'uid': '123', 'fullname': 'Alice Example'}))
+    reparsed = feed_all(ResultParser("alice"), lines)
+    assert reparsed[0].ids == {'uid': '123', 'fullname': 'Alice Example'}
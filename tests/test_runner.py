@@ -0,0 +1,51 @@
+from night_results import AVAILABLE, ResultParser
+from night_runner import OutputBatcher, split_chunk
+
+def test_carriage_return_redraws_keep_the_last_frame():
+    batcher = OutputBatcher()
+    batcher.add("Searching |#   | 1/4\rSearching |##  | 2/4\rSearching |####| 4/4\r")
+    batcher.add("[+] GitHub: https://github.com/bob\n")
+    assert batcher.take() == ["Searching |####| 4/4", "[+] GitHub: https://github.com/bob"]
+    assert batcher.dropped == 2
+
+def test_due_once_full_or_after_the_delay():
+    batcher = OutputBatcher(max_lines=3, max_delay=60)
+    assert not batcher.is_due()
+    batcher.add("a")
+    batcher.add("b")
+    assert not batcher.is_due()
+    batcher.add("c")
+    assert batcher.is_due()
+    batcher.take()
+
+    batcher = OutputBatcher(max_lines=100, max_delay=0)
+    assert not batcher.is_due()
+    batcher.add("a")
+    assert batcher.is_due()
+
+def test_take_resets_the_delay():
+    batcher = OutputBatcher(max_delay=60)
+    batcher.add("a")
+    assert batcher.time_left() <= 60
+    assert batcher.take() == ["a"]
+    assert batcher.take() == []
+    assert batcher.time_left() == 60
+    assert not batcher.is_due()
+
+def test_stats_count_merged_lines():
+    batcher = OutputBatcher()
+    for line in ["a", "b", "c"]:
+        batcher.add(line)
+    batcher.take()
+    batcher.add("d")
+    batcher.take()
+    batcher.take()
+    assert batcher.stats() == {'lines': 4, 'batches': 2, 'merged': 2, 'dropped': 0}
+
+def test_split_chunk_hides_statuses_but_keeps_their_results():
+    batcher = OutputBatcher()
+    chunk = ["[-] GitHub: Not found!", "[-] GitLab: Not found!"]
+    lines, results = split_chunk(chunk, ResultParser("bob"), batcher, hidden_statuses=(AVAILABLE,), final=True)
+    assert lines == []
+    assert [result.site for result in results] == ["GitHub", "GitLab"]
+    assert batcher.dropped == 2